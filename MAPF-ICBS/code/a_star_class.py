@@ -2,7 +2,10 @@ import time as timer
 import heapq
 from itertools import product
 import numpy as np
-import copy
+from functools import lru_cache
+
+from heuristics import compute_all_heuristics, HeuristicTable, UNREACHABLE
+from constraint_index import ConstraintIndex
 
 def move(loc, dir):
     directions = [(0, -1), (1, 0), (0, 1), (-1, 0), (0, 0)]
@@ -18,37 +21,8 @@ def get_sum_of_cost(paths):
     return rst
 
 def compute_heuristics(my_map, goal):
-    # Use Dijkstra to build a shortest-path tree rooted at the goal location
-    open_list = []
-    closed_list = dict()
-    root = {'loc': goal, 'cost': 0}
-    heapq.heappush(open_list, (root['cost'], goal, root))
-    closed_list[goal] = root
-    while len(open_list) > 0:
-        (cost, loc, curr) = heapq.heappop(open_list)
-        for dir in range(4):
-            child_loc = move(loc, dir)
-            child_cost = cost + 1
-            if child_loc[0] < 0 or child_loc[0] >= len(my_map) \
-               or child_loc[1] < 0 or child_loc[1] >= len(my_map[0]):
-               continue
-            if my_map[child_loc[0]][child_loc[1]]:
-                continue
-            child = {'loc': child_loc, 'cost': child_cost}
-            if child_loc in closed_list:
-                existing_node = closed_list[child_loc]
-                if existing_node['cost'] > child_cost:
-                    closed_list[child_loc] = child
-                    heapq.heappush(open_list, (child_cost, child_loc, child))
-            else:
-                closed_list[child_loc] = child
-                heapq.heappush(open_list, (child_cost, child_loc, child))
-
-    # build the heuristics table
-    h_values = dict()
-    for loc, node in closed_list.items():
-        h_values[loc] = node['cost']
-    return h_values
+    # BFS wavefront over the occupancy array; see heuristics.compute_all_heuristics for all goals at once
+    return compute_all_heuristics(my_map, [goal])[0]
 
 def get_location(path, time):
     if time < 0:
@@ -59,15 +33,15 @@ def get_location(path, time):
         return path[-1]  # wait at the goal location
 
 
-def get_path(goal_node,meta_agent):
+def get_path(goal_node,meta_agent,locs):
     path = []
     for i in range(len(meta_agent)):
         path.append([])
     curr = goal_node
     while curr is not None:
         for i in range(len(meta_agent)):
-            path[i].append(curr['loc'][i])
-        curr = curr['parent']
+            path[i].append(locs[curr.cells[i]])
+        curr = curr.parent
     for i in range(len(meta_agent)):
         path[i].reverse()
         assert path[i] is not None
@@ -86,17 +60,59 @@ def get_path(goal_node,meta_agent):
     assert path is not None
     return path
 
+
+@lru_cache(maxsize=None)
+def cell_locs(rows, cols):
+    """flat cell id (row * cols + col) -> (row, col) for every cell of a rows x cols map"""
+    return tuple((r, c) for r in range(rows) for c in range(cols))
+
+
+def flat_heuristic(h_values, rows, cols):
+    """h values indexed by flat cell id, UNREACHABLE (-1) where the goal can't be reached"""
+    if isinstance(h_values, HeuristicTable) and h_values.rows == rows and h_values.cols == cols:
+        return h_values.flat_values()
+    return [h_values.get(loc, UNREACHABLE) for loc in cell_locs(rows, cols)]
+
+
+class Node(object):
+    """joint search node; cells is a tuple of flat cell ids, reached_goal a bitmask over the agents
+
+    moved is only used by operator decomposition (OD_A_Star): the number of agents that already
+    made their move for timestep + 1. Full (standard) nodes have moved == 0.
+    conflicts is the number of conflicts with the conflict avoidance table along the path.
+    """
+    __slots__ = ('cells', 'g_val', 'h_val', 'parent', 'timestep', 'reached_goal', 'moved', 'conflicts')
+
+    def __init__(self, cells, g_val, h_val, parent, timestep, reached_goal, moved=0, conflicts=0):
+        self.cells = cells
+        self.g_val = g_val
+        self.h_val = h_val
+        self.parent = parent
+        self.timestep = timestep
+        self.reached_goal = reached_goal
+        self.moved = moved
+        self.conflicts = conflicts
+
+
 class A_Star(object):
 
-    def __init__(self,my_map,starts,goals,heuristics,agents,contraints):
+    resumable = True # see resume()
+
+    def __init__(self,my_map,starts,goals,heuristics,agents,contraints,cat=None,reservations=None):
         """my_map   - list of lists specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations for CBS
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations for CBS
         agents      - the agent (CBS) or meta-agent of the agent (MA-CBS) involved in collision
         constraints - list of dict constraints generated by a CBS splitter; dict = {agent,loc,timestep,positive}
+        cat         - ConflictAvoidanceTable of the other agents' paths, breaks ties between equal f values
+        reservations - ReservationTable of other agents' paths to keep off (e.g. the higher agents of PBS)
         """            
 
         self.my_map = my_map
+        self.instance = (starts, goals, heuristics, agents) # to build the same search with other constraints
+        self.rows = len(my_map)
+        self.cols = len(my_map[0])
+        self.locs = cell_locs(self.rows, self.cols)
 
 
         self.num_generated = 0
@@ -105,9 +121,14 @@ class A_Star(object):
 
         self.open_list = []
         self.closed_list = dict()
+        self.expanded = [] # nodes whose children were generated
+        self.solution = None # goal node the search stopped at
+        self.resumed = False
 
         
         self.constraints = contraints # to be used to create c_table
+        self.cat = cat if cat else None
+        self.reservations = reservations
 
         self.agents = agents
 
@@ -125,321 +146,325 @@ class A_Star(object):
         self.heuristics = [heuristics[a] for a in self.agents]
         self.goals = [goals[a] for a in self.agents]
 
-        self.c_table = [] # constraint table
+        # same data as flat cell ids for the search itself
+        self.start_cells = tuple(self.cell(loc) for loc in self.starts)
+        self.goal_cells = tuple(self.cell(loc) for loc in self.goals)
+        self.h_flat = [flat_heuristic(h, self.rows, self.cols) for h in self.heuristics]
+        self.all_reached = (1 << len(self.agents)) - 1
+
+        self.neighbours = dict() # cell -> free neighbour cells in move() direction order, filled lazily
+
+        self.c_table = [] # constraint index per agent
         self.max_constraints = np.zeros((len(self.agents),), dtype=int)
 
+    def cell(self, loc):
+        return loc[0] * self.cols + loc[1]
+
+    def get_neighbours(self, cell):
+        neighbours = self.neighbours.get(cell)
+        if neighbours is None:
+            neighbours = []
+            for dir in range(5):
+                r, c = move(self.locs[cell], dir)
+                # agent out of map bounds or collision with map obstacle
+                if r < 0 or r >= self.rows or c < 0 or c >= self.cols or self.my_map[r][c]:
+                    continue
+                neighbours.append(r * self.cols + c)
+            self.neighbours[cell] = neighbours
+        return neighbours
 
     def push_node(self, node):
-        f_value = node['g_val'] + node['h_val']
+        f_value = node.g_val + node.h_val
 
-        heapq.heappush(self.open_list, (f_value, node['h_val'], node['loc'], self.num_generated, node))
+        heapq.heappush(self.open_list, (f_value, node.conflicts, node.h_val, node.cells, self.num_generated, node))
         self.num_generated += 1
         
     def pop_node(self):
-        _,_,_, id, curr = heapq.heappop(self.open_list)
+        _,_,_,_, id, curr = heapq.heappop(self.open_list)
 
         self.num_expanded += 1
         return curr
 
-    # return a table that constains the list of constraints of all agents for each time step. 
+    # compile the constraints of an agent into an O(1) lookup index
     def build_constraint_table(self, agent):
-        # constraint_table = {}
-        constraint_table = dict()
-
-        if not self.constraints:
-            return constraint_table
-        for constraint in self.constraints:
-            timestep = constraint['timestep']
-
-            t_constraint = []
-            if timestep in constraint_table:
-                t_constraint = constraint_table[timestep]
-
-            # positive constraint for agent
-            if constraint['positive'] and constraint['agent'] == agent:
-                t_constraint.append(constraint)
-                constraint_table[timestep] = t_constraint
-            # and negative (external) constraint for agent
-            elif not constraint['positive'] and constraint['agent'] == agent:
-                t_constraint.append(constraint)
-                constraint_table[timestep] = t_constraint
-            # enforce positive constraints from other agents (i.e. create neg constraint)
-            elif constraint['positive']: 
-                neg_constraint = copy.deepcopy(constraint)
-                neg_constraint['agent'] = agent
-                # if edge collision
-                if len(constraint['loc']) == 2:
-                    # switch traversal direction
-                    prev_loc = constraint['loc'][1]
-                    curr_loc = constraint['loc'][0]
-                    neg_constraint['loc'] = [prev_loc, curr_loc]
-                neg_constraint['positive'] = False
-                t_constraint.append(neg_constraint)
-                constraint_table[timestep] = t_constraint
-        
-        return constraint_table
-                
-
-    # returns if a move at timestep violates a "positive" or a "negative" constraint in c_table
-    def constraint_violated(self, curr_loc, next_loc, timestep, c_table_agent, agent):
-
-        # print("the move : {}, {}".format(curr_loc, next_loc))
-
-
-        if timestep not in c_table_agent:
-            return None
-        
-        for constraint in c_table_agent[timestep]:
-            
-            if agent == constraint['agent']:
-                # vertex constraint
-                if len(constraint['loc']) == 1:
-                    # positive constraint
-                    if constraint['positive'] and next_loc != constraint['loc'][0]:
-                        # print("time {} positive constraint : {}".format(timestep, constraint))
-                        return constraint
-                    # negative constraint
-                    elif not constraint['positive'] and next_loc == constraint['loc'][0]:
-                        # print("time {} negative constraint : {}".format(timestep, constraint))
-                        return constraint
-                # edge constraint
-                else:
-                    if constraint['positive'] and constraint['loc'] != [curr_loc, next_loc]:
-                        # print("time {} positive constraint : {}".format(timestep, constraint))
-                        return constraint
-                    if not constraint['positive'] and constraint['loc'] == [curr_loc, next_loc]:
-                        # print("time {} negative constraint : {}".format(timestep, constraint))
-                        return constraint
-
-        return None
-
-    # returns whether an agent at goal node at current timestep will violate a constraint in next timesteps
-    def future_constraint_violated(self, curr_loc, timestep, max_timestep, c_table_agent, agent):
-
-        for t in range(timestep+1, max_timestep+1):
-            if t not in c_table_agent:
-                continue
+        return ConstraintIndex(self.constraints, agent, self.reservations)
+
+    def closed_key(self, node):
+        return (node.cells, node.timestep)
+
+    def count_conflicts(self, i, curr_cell, next_cell, timestep):
+        """conflicts of agent i's move with the conflict avoidance table"""
+        if self.cat is None:
+            return 0
+        return self.cat.count(self.locs[curr_cell], self.locs[next_cell], timestep)
+
+    def goal_reached(self, i, cell, timestep):
+        """whether agent i can stay at its goal from timestep on"""
+        if cell != self.goal_cells[i]:
+            return False
+        if timestep <= self.max_constraints[i]:
+            return not self.c_table[i].must_leave_after(self.locs[cell], timestep)
+        return True
+
+    def get_moves(self, curr):
+        """candidate cells per agent; cells that can't reach the goal can never be part of a solution"""
+        moves = []
+        for i in range(len(self.agents)):
+            h_flat = self.h_flat[i]
+            moves.append([c for c in self.get_neighbours(curr.cells[i]) if h_flat[c] != UNREACHABLE])
+        return moves
+
+    def make_child(self, curr, child_cells, g_value):
+        """child node of curr for the joint move to child_cells, None if the move is invalid"""
+        num_agents = len(self.agents)
+        timestep = curr.timestep + 1
+        locs = self.locs
+
+        if num_agents > 1:
+            # vertex collision; check for duplicates in child_cells
+            if len(set(child_cells)) < num_agents:
+                return None
+
+            # edge collision: check for matching locs in curr_loc and child_loc between two agents
+            for i in range(num_agents):
+                for j in range(i + 1, num_agents):
+                    if child_cells[i] == curr.cells[j] and child_cells[j] == curr.cells[i]:
+                        return None
+
+        # agent is constrained by an external constraint
+        for i in range(num_agents):
+            if self.c_table[i].violates(locs[curr.cells[i]], locs[child_cells[i]], timestep):
+                return None
+
+        # find h_values for current moves
+        h_value = 0
+        reached_goal = 0
+        conflicts = curr.conflicts
+        for i in range(num_agents):
+            h_value += self.h_flat[i][child_cells[i]]
+            if self.goal_reached(i, child_cells[i], timestep):
+                reached_goal |= 1 << i
+            conflicts += self.count_conflicts(i, curr.cells[i], child_cells[i], timestep)
+
+        return Node(child_cells, g_value, h_value, curr, timestep, reached_goal, conflicts=conflicts)
+
+    def move_cost(self, curr):
+        """cost of the new locs: number of agents that have not reached their goal"""
+        return len(self.agents) - bin(curr.reached_goal).count('1')
 
-            for constraint in c_table_agent[t]:
-        
-                if agent == constraint['agent']:
-                    # vertex constraint
-                    if len(constraint['loc']) == 1:
-                        # positive constraint
-                        if constraint['positive'] and curr_loc != constraint['loc'][0]:
-                            # print("future time {} positive constraint : {}".format(t, constraint))
-                            return True
-                        # negative constraint
-                        elif not constraint['positive'] and curr_loc == constraint['loc'][0]:
-                            # print("time {} negative constraint : {}".format(timestep, constraint))
-                            # print("future time {} negative constraint : {}".format(t, constraint))
-                            return True
-
-
-        return False
-
-            
     def generate_child_nodes(self, curr):
         
         children = []
-        ma_dirs = product(list(range(5)), repeat=len(self.agents)) # directions for move() for each agent: 0, 1, 2, 3, 4
-        
-        for dirs in ma_dirs: 
-            # print(dirs)
-            invalid_move = False
-            child_loc = []
-            # move each agent for new timestep & check for (internal) conflicts with each other
-            for i, a in enumerate(self.agents):           
-                    aloc = move(curr['loc'][i], dirs[i])
-                    # vertex collision; check for duplicates in child_loc
-                    if aloc in child_loc:
-                        invalid_move = True
-                        # print("internal conflict")
-                        break
-                    child_loc.append(move(curr['loc'][i], dirs[i]))   
+        g_value = curr.g_val + self.move_cost(curr)
 
+        for child_cells in product(*self.get_moves(curr)): # same order as product(range(5)) over move() directions
+            child = self.make_child(curr, child_cells, g_value)
+            if child is not None:
+                children.append(child)
 
-            if invalid_move:
-                continue
-
+        return children
 
-            for i, a in enumerate(self.agents):   
-                # edge collision: check for matching locs in curr_loc and child_loc between two agents
-                for j, a in enumerate(self.agents):   
-                    if i != j:
-                        # print(ai, aj)
-                        if child_loc[i] == curr['loc'][j] and child_loc[j] == curr['loc'][i]:
-                            invalid_move = True             
-            
-            if invalid_move:
-                continue
+    def compare_nodes(self, n1, n2):
+        """Return true is n1 is better than n2."""
 
-            # check map constraints and external constraints
-            for i, a in enumerate(self.agents):  
-                next_loc= child_loc[i]
-                # agent out of map bounds
-                if next_loc[0]<0 or next_loc[0]>=len(self.my_map) or next_loc[1]<0 or next_loc[1]>=len(self.my_map[0]):
-                    invalid_move = True
-                # agechild_locnt collison with map obstacle
-                elif self.my_map[next_loc[0]][next_loc[1]]:
-                    invalid_move = True
-                # agent is constrained by a negative external constraint
-                elif self.constraint_violated(curr['loc'][i],next_loc,curr['timestep']+1,self.c_table[i], self.agents[i]):
-                    invalid_move = True
-                if invalid_move:
-                    break
+        assert isinstance(n1.g_val + n1.h_val, int)
+        assert isinstance(n2.g_val + n2.h_val, int)
 
-            if invalid_move:
-                continue
+        return n1.g_val + n1.h_val < n2.g_val + n2.h_val
 
-            # find h_values for current moves
-            h_value = 0
-            for i in range(len(self.agents)):
-                    h_value += self.heuristics[i][child_loc[i]]
+    def replaces(self, child, existing):
+        """whether child should replace the node with the same key in the closed list"""
+        # fewer unreached goals == more bits set in reached_goal
+        if (child.g_val + child.h_val < existing.g_val + existing.h_val) and (child.g_val < existing.g_val) \
+                and bin(child.reached_goal).count('1') >= bin(existing.reached_goal).count('1'):
+            return True
+        # same node reached with fewer conflicts with the other agents
+        return child.g_val == existing.g_val and child.reached_goal == existing.reached_goal \
+            and child.conflicts < existing.conflicts
 
-            h_test = sum([self.heuristics[i][child_loc[i]] for i in range(len(self.agents))])
+    def is_solution(self, node):
+        return node.moved == 0 and node.reached_goal == self.all_reached
 
-            assert h_value == h_test
+    def init_search(self):
+        """build the constraint tables and return the root node"""
 
-            # g_value = curr['g_val']+ curr['reached_goal'].count(False)
-            num_moves = curr['reached_goal'].count(False)
-            # print("(edge) cost (curr -> child) in a* tree == ", num_moves)
+        print("> build constraint table")
 
-            g_value = curr['g_val'] + num_moves
+        for i, a in enumerate(self.agents):
+            table_i = self.build_constraint_table(a)
+            self.c_table.append(table_i)
+            self.max_constraints[i] = table_i.max_timestep
 
 
-            reached_goal = [False for i in range(len(self.agents))]
+        h_value = sum([self.heuristics[i][self.starts[i]] for i in range(len(self.agents))])
 
-            for i, a in enumerate(self.agents):
-                
-                if not reached_goal[i] and child_loc[i] == self.goals[i]:
+        root = Node(self.start_cells, 0, h_value, None, 0, 0)
 
-                    if curr['timestep']+1 <= self.max_constraints[i]:
-                        if not self.future_constraint_violated(child_loc[i], curr['timestep']+1, self.max_constraints[i] ,self.c_table[i], self.agents[i]):
-                    # print("agent ", a, 'has found solution at timestep ', curr['timestep'] + 1)
-                    # print ('MAX CONSTRIANT:', self.max_constraints[i])
-                            reached_goal[i] = True
-                            # self.max_constraints[i] differs for each node
-                    else:
-                        reached_goal[i] = True
+        # check if any any agents are already at goal loc
+        for i, a in enumerate(self.agents):
+            if self.goal_reached(i, root.cells[i], root.timestep):
+                root.reached_goal |= 1 << i
 
+                self.max_constraints[i] = 0
 
-            child = {'loc': child_loc,
-                    'g_val': g_value, # number of new locs (cost) added
-                    'h_val': h_value,
-                    'parent': curr,
-                    'timestep': curr['timestep']+1,
-                    'reached_goal': copy.deepcopy(reached_goal)
-                    } 
+        return root
 
-            children.append(child)
+    def start_blocked(self):
+        """whether a constraint keeps an agent off its start at timestep 0 (a range constraint can)"""
+        return any(table.is_forbidden(loc, loc, 0) for table, loc in zip(self.c_table, self.starts))
 
-        return children
+    def resume(self, constraints, cat=None):
+        """A_Star for the same agents with constraints that continues this finished search.
 
-    def compare_nodes(self, n1, n2):
-        """Return true is n1 is better than n2."""
+        Only possible if constraints adds negative constraints to the constraints of this search
+        and none of them is a vertex constraint at a goal (those change the goal test of earlier
+        nodes). With t the earliest new constraint, everything the search did before t still holds:
+        nodes generated at timesteps < t are kept, nodes expanded at t - 1 go back into the open
+        list and all later nodes are dropped. Returns None if the search can't be reused.
+        """
+        if not self.resumable or self.solution is None:
+            return None
 
-        # print(n1['g_val'] + n1['h_val'])
-        # print(n2['g_val'] + n2['h_val'])
+        starts, goals, heuristics, agents = self.instance
+        search = type(self)(self.my_map, starts, goals, heuristics, agents, constraints, cat,
+                            reservations=self.reservations)
+        search.init_search()
+
+        cutoff = None
+        for i in range(len(self.agents)):
+            old_table, new_table = self.c_table[i], search.c_table[i]
+            if old_table.positive != new_table.positive \
+                    or not old_table.neg_vertex <= new_table.neg_vertex or not old_table.neg_edge <= new_table.neg_edge:
+                return None
+            for timestep, loc in new_table.neg_vertex - old_table.neg_vertex:
+                if self.cell(loc) == self.goal_cells[i]:
+                    return None
+                cutoff = timestep if cutoff is None else min(cutoff, timestep)
+            for timestep, _, _ in new_table.neg_edge - old_table.neg_edge:
+                cutoff = timestep if cutoff is None else min(cutoff, timestep)
+
+        if cutoff is None or cutoff <= 0:
+            return None
 
-        assert isinstance(n1['g_val'] + n1['h_val'], int)
-        assert isinstance(n2['g_val'] + n2['h_val'], int)
+        search.closed_list = {key: node for key, node in self.closed_list.items() if node.timestep < cutoff}
+        search.open_list = [entry for entry in self.open_list if entry[-1].timestep < cutoff]
+        heapq.heapify(search.open_list)
+        search.num_generated = self.num_generated # keeps the tie-breaking order of the kept nodes
+        search.expanded = [node for node in self.expanded if node.timestep < cutoff - 1]
+        for node in self.expanded:
+            if node.timestep == cutoff - 1:
+                search.push_node(node)
+        if self.solution.timestep < cutoff:
+            search.push_node(self.solution)
 
-        return n1['g_val'] + n1['h_val'] < n2['g_val'] + n2['h_val']
+        search.resumed = True
+        return search
 
     def find_paths(self):
 
         self.start_time = timer.time()
 
-        print("> build constraint table")
+        if not self.resumed:
+            root = self.init_search()
+            if self.start_blocked():
+                print('no solution')
+                return None
 
-        for i, a in enumerate(self.agents):
-            table_i = self.build_constraint_table(a)
-            print(table_i)
-            self.c_table.append(table_i)
-            if table_i.keys():
-                self.max_constraints[i] = max(table_i.keys())
+            self.push_node(root)
+            self.closed_list[self.closed_key(root)] = root
 
+        while len(self.open_list) > 0:
 
-        h_value = sum([self.heuristics[i][self.starts[i]] for i in range(len(self.agents))])
+            curr = self.pop_node()
 
-        # assert h_value == h_test
+            if self.is_solution(curr):
+                self.solution = curr
+                return get_path(curr,self.agents,self.locs)
 
-        root = {'loc': [self.starts[j] for j in range(len(self.agents))],
-                # 'F_val' : h_value, # only consider children with f_val == F_val
-                'g_val': 0, 
-                'h_val': h_value, 
-                'parent': None,
-                'timestep': 0,
-                'reached_goal': [False for i in range(len(self.agents))]
-                }
 
-        # check if any any agents are already at goal loc
-        for i, a in enumerate(self.agents):
-            if root['loc'][i] == self.goals[i]:
+            children = self.generate_child_nodes(curr)
+            self.expanded.append(curr)
 
-                if root['timestep'] <= self.max_constraints[i]:
-                    if not self.future_constraint_violated(root['loc'][i], root['timestep'], self.max_constraints[i] ,self.c_table[i], self.agents[i]):
-                        root['reached_goal'][i] = True
+            for child in children:
 
-                        self.max_constraints[i] = 0
+                key = self.closed_key(child)
+                existing = self.closed_list.get(key)
+                if existing is not None:
+                    if self.replaces(child, existing):
+                        print("child is better than existing in closed list")
+                        self.closed_list[key] = child
+                        self.push_node(child)
+                else:
+                    self.closed_list[key] = child
+                    self.push_node(child)
 
+        print('no solution')
 
-        self.push_node(root)
-        self.closed_list[(tuple(root['loc']),root['timestep'])] = [root]
+        # print("\nEND OF A*\n") # comment out if needed
+        return None
 
-        while len(self.open_list) > 0:
 
-            # if num_node_generated >= 30:
-            #     return
+class OD_A_Star(A_Star):
+    """A_Star for meta-agents with operator decomposition.
 
-            curr = self.pop_node()
+    Instead of generating all 5^k joint moves at once, agents of the meta-agent move one at a
+    time: an intermediate node has moved agents at their new cells and the rest at their old
+    cells. Partial moves that collide or hit a constraint are pruned right away, so only valid
+    prefixes get expanded. Costs are the same as the joint search, so solutions are still optimal.
+    """
 
-            solution_found = all(curr['reached_goal'][i] for i in range(len(self.agents)))
-            # print(curr['reached_goal'] )
+    resumable = False # intermediate nodes already hold moves of the next timestep
 
-            if solution_found:
-                return get_path(curr,self.agents)
+    def closed_key(self, node):
+        if node.moved == 0:
+            return (node.cells, node.timestep)
+        # collisions and costs of the remaining moves depend on the state the step started from
+        base = node.parent
+        return (node.cells, node.timestep, node.moved, base.cells, base.reached_goal)
 
+    def generate_child_nodes(self, curr):
 
-            children = self.generate_child_nodes(curr)
+        children = []
+        num_agents = len(self.agents)
+        locs = self.locs
 
-            for child in children:
+        i = curr.moved # agent to move next
+        base = curr if i == 0 else curr.parent # full node the current step started from
+        timestep = base.timestep + 1
+        curr_cell = base.cells[i]
+        h_flat = self.h_flat[i]
 
-                f_value = child['g_val'] + child['h_val']
-
-                # if (tuple(child['loc']),child['timestep']) in self.closed_list:
-                #     existing_node = self.closed_list[(tuple(child['loc']),child['timestep'])]
-                #     if self.compare_nodes(child, existing_node):
-                #         self.closed_list[(tuple(child['loc']),child['timestep'])] = child
-                #         self.push_node(child)
-                # else:
-                #     # print('bye child ',child['loc'])
-                #     self.closed_list[(tuple(child['loc']),child['timestep'])] = child
-                #     self.push_node(child)
-
-                if (tuple(child['loc']),child['timestep']) in self.closed_list:
-                    existing = self.closed_list[(tuple(child['loc']),child['timestep'])]
-                    if (child['g_val'] + child['h_val'] < existing['g_val'] + existing['h_val']) and (child['g_val'] < existing['g_val']) and child['reached_goal'].count(False) <= existing['reached_goal'].count(False):
-                        print("child is better than existing in closed list")
-                        self.closed_list[(tuple(child['loc']),child['timestep'])] = child
-                        self.push_node(child)
-                else:
-                    # print('bye child ',child['loc'])
-                    self.closed_list[(tuple(child['loc']),child['timestep'])] = child
-                    self.push_node(child)
+        # agents that already reached their goal don't add to the cost
+        g_value = curr.g_val + (0 if base.reached_goal >> i & 1 else 1)
+        reached_goal = curr.reached_goal if i > 0 else 0
+
+        for next_cell in self.get_neighbours(curr_cell):
+            if h_flat[next_cell] == UNREACHABLE:
+                continue
+
+            # vertex and edge collisions with the agents that already moved
+            invalid_move = False
+            for j in range(i):
+                if next_cell == curr.cells[j] or (next_cell == base.cells[j] and curr.cells[j] == curr_cell):
+                    invalid_move = True
+                    break
+            if invalid_move:
+                continue
 
-                # if (tuple(child['loc']),child['timestep']) not in self.closed_list:
-                #     # existing_node = self.closed_list[(tuple(child['loc']),child['timestep'])]
-                #     # if compare_nodes(child, existing_node):
-                #     self.closed_list[(tuple(child['loc']),child['timestep'])] = child
-                #     # print('bye child ',child['loc'])
-                #     self.push_node(child)
+            # agent is constrained by an external constraint
+            if self.c_table[i].violates(locs[curr_cell], locs[next_cell], timestep):
+                continue
 
-            # if (tuple(curr['loc']),curr['timestep']) not in self.closed_list:
-            #     self.closed_list[(tuple(curr['loc']),curr['timestep'])] = curr
+            cells = curr.cells[:i] + (next_cell,) + curr.cells[i + 1:]
+            h_value = curr.h_val - h_flat[curr_cell] + h_flat[next_cell]
+            child_reached = reached_goal
+            if self.goal_reached(i, next_cell, timestep):
+                child_reached |= 1 << i
+            conflicts = curr.conflicts + self.count_conflicts(i, curr_cell, next_cell, timestep)
 
-        print('no solution')
+            if i + 1 == num_agents:
+                children.append(Node(cells, g_value, h_value, base, timestep, child_reached, conflicts=conflicts))
+            else:
+                children.append(Node(cells, g_value, h_value, base, base.timestep, child_reached, i + 1, conflicts))
 
-        # print("\nEND OF A*\n") # comment out if needed
-        return None        
+        return children
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+import argparse
+import contextlib
+import glob
+import io
+import timeit
+
+from a_star_class import A_Star
+from heuristics import compute_all_heuristics
+from cbs_basic import detect_collision
+from icbs_complete import count_all_collisions_pair
+from collision_table import CollisionTable, batch_first_collisions, batch_count_collisions
+from run_experiments import import_mapf_instance
+
+REPEAT = 20
+
+
+def loop_detect_collisions(paths):
+    # the pairwise loop of detect_collisions before the collision table
+    collisions = []
+    for i in range(len(paths)-1):
+        for j in range(i+1, len(paths)):
+            collision = detect_collision(paths[i], paths[j])
+            if collision is not None:
+                position, t = collision
+                collisions.append((i, j, position, t + 1))
+    return collisions
+
+
+def loop_count_collisions(paths):
+    collisions = 0
+    for i in range(len(paths)-1):
+        for j in range(i+1, len(paths)):
+            collisions += count_all_collisions_pair(paths[i], paths[j])
+    return collisions
+
+
+def independent_paths(my_map, starts, goals):
+    # shortest paths that ignore the other agents, so they collide a lot
+    heuristics = compute_all_heuristics(my_map, goals)
+    paths = []
+    with contextlib.redirect_stdout(io.StringIO()): # the low-level search prints its progress
+        for agent in range(len(starts)):
+            paths.extend(A_Star(my_map, starts, goals, heuristics, [agent], []).find_paths())
+    return paths
+
+
+def time_ms(function, repeat):
+    return 1000 * min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares the collision detection loops with the NumPy kernel')
+    parser.add_argument('--instance', type=str, default='instances/test_*.txt',
+                        help='The name of the instance file(s)')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help='The number of timing runs, the best one is reported (defaults to ' + str(REPEAT) + ')')
+    args = parser.parse_args()
+
+    print('{:<28} {:>6} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'instance', 'agents', 'makespan', 'loop ms', 'batch ms', 'count ms', 'batch ms', 'replan ms'))
+    for file in sorted(glob.glob(args.instance)):
+        my_map, starts, goals = import_mapf_instance(file)
+        paths = independent_paths(my_map, starts, goals)
+
+        # same collisions either way
+        batch = [(a1, a2, loc, t) for (a1, a2), (loc, t) in sorted(batch_first_collisions(paths).items())]
+        assert batch == [(a1, a2, [tuple(l) for l in loc], t) for a1, a2, loc, t in loop_detect_collisions(paths)]
+        assert batch_count_collisions(paths) == loop_count_collisions(paths)
+
+        # incremental update of the collision table for one replanned agent
+        table = CollisionTable(paths)
+        table.get_occupancy()
+        replanned = list(paths)
+        replanned[0] = [paths[0][0]] + paths[0] # wait one timestep at the start
+
+        print('{:<28} {:>6} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+            file.split('/')[-1], len(paths), max(len(path) for path in paths),
+            time_ms(lambda: loop_detect_collisions(paths), args.repeat),
+            time_ms(lambda: batch_first_collisions(paths), args.repeat),
+            time_ms(lambda: loop_count_collisions(paths), args.repeat),
+            time_ms(lambda: batch_count_collisions(paths), args.repeat),
+            time_ms(lambda: table.update(replanned), args.repeat)))
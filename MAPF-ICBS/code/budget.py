@@ -0,0 +1,115 @@
+import os
+import sys
+import time as timer
+
+from prioritized import prioritized_paths
+
+SOLVED = 'solved'
+TIMED_OUT = 'timed out'
+INFEASIBLE = 'infeasible'
+
+
+def memory_usage():
+    """resident memory of this process in MB, None if it can't be measured on this platform"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    # peak instead of current memory; bytes on macOS, kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class Budget(object):
+    """Limits of a high-level search, checked before each CT node expansion; None means no limit."""
+
+    def __init__(self, time_limit=None, node_limit=None, memory_limit=None):
+        """time_limit   - wall-clock seconds from the start of find_solution
+        node_limit      - the search stops once it generated more than this many CT nodes
+        memory_limit    - resident memory of the process in MB (ignored where it can't be measured)
+        """
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.memory_limit = memory_limit
+        self.start_time = None
+        self.reason = None # limit that stopped the search: 'time_limit', 'node_limit' or 'memory_limit'
+
+    def start(self):
+        self.start_time = timer.time()
+        self.reason = None
+
+    def exceeded(self, num_of_generated):
+        """whether the search has to stop; reason tells which limit it ran into"""
+        if self.node_limit is not None and num_of_generated > self.node_limit:
+            self.reason = 'node_limit'
+        elif self.time_limit is not None and timer.time() - self.start_time > self.time_limit:
+            self.reason = 'time_limit'
+        elif self.memory_limit is not None:
+            usage = memory_usage()
+            if usage is not None and usage > self.memory_limit:
+                self.reason = 'memory_limit'
+        if self.reason is not None:
+            print('budget exceeded ({}). Returning...'.format(self.reason))
+        return self.reason is not None
+
+
+class SolverResult(object):
+    """Outcome of solve()."""
+
+    def __init__(self, status, paths, generated, expanded, time, reason=None, fallback=False):
+        """status   - SOLVED, TIMED_OUT or INFEASIBLE
+        paths       - the solution; when TIMED_OUT, the fallback paths or None
+        generated   - CT nodes generated
+        expanded    - CT nodes expanded
+        time        - wall-clock seconds
+        reason      - limit of the budget that ran out (TIMED_OUT only)
+        fallback    - whether paths come from the fallback instead of the search
+        """
+        self.status = status
+        self.paths = paths
+        self.generated = generated
+        self.expanded = expanded
+        self.time = time
+        self.reason = reason
+        self.fallback = fallback
+
+    def __repr__(self):
+        return 'SolverResult(status={!r}, reason={!r}, fallback={}, generated={}, expanded={}, time={:.2f})'.format(
+            self.status, self.reason, self.fallback, self.generated, self.expanded, self.time)
+
+
+def solve(solver, disjoint, fallback=True):
+    """run solver.find_solution(disjoint) within the solver's budget and return a SolverResult
+
+    fallback    - when the budget runs out, plan conflict-free paths one agent at a time
+                  (prioritized_paths) instead of returning none
+    """
+    start_time = timer.time()
+    try:
+        solution = solver.find_solution(disjoint)
+    except BaseException as e:
+        if type(e) is not BaseException:
+            raise
+        # BaseException('No solutions'): an agent has no path at the root
+        solution = None
+
+    if solution is not None:
+        paths, generated, expanded = solution
+        return SolverResult(SOLVED, paths, generated, expanded, timer.time() - start_time)
+
+    generated, expanded = solver.num_of_generated, solver.num_of_expanded
+    if solver.budget.reason is None:
+        # the search ran out of CT nodes
+        return SolverResult(INFEASIBLE, None, generated, expanded, timer.time() - start_time)
+
+    paths = None
+    if fallback:
+        delays = [agent.delay for agent in solver.agents] if hasattr(solver, 'agents') else None
+        paths = prioritized_paths(solver.my_map, solver.starts, solver.goals, solver.heuristics, delays)
+    return SolverResult(TIMED_OUT, paths, generated, expanded, timer.time() - start_time,
+                        reason=solver.budget.reason, fallback=paths is not None)
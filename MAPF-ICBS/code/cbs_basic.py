@@ -2,7 +2,14 @@ import time as timer
 import heapq
 import random
 
-from a_star_class import A_Star, get_location, get_sum_of_cost, compute_heuristics
+from a_star_class import A_Star, get_location, get_sum_of_cost
+from heuristics import compute_all_heuristics
+from conflict_avoidance import ConflictAvoidanceTable
+from incremental_search import IncrementalSearches
+from path_cache import PathCache
+from collision_table import CollisionTable
+from parallel_replans import ParallelReplans
+from budget import Budget
 
 def detect_collision(path1, path2):
     ##############################
@@ -28,21 +35,25 @@ def detect_collision(path1, path2):
     return None
 
 
-def detect_collisions(paths):
+def detect_collisions(paths, collision_table=None):
     ##############################
     # Task 3.1: Return a list of first collisions between all robot pairs.
     #           A collision can be represented as dictionary that contains the id of the two robots, the vertex or edge
     #           causing the collision, and the timestep at which the collision occurred.
     #           You should use your detect_collision function to find a collision between two robots.
+    # collision_table - CollisionTable of paths (kept per CT node and updated for the replanned agents)
+    # with a k-robust table, a collision has an 'end': both agents are at loc within [timestep, end]
+    if collision_table is None:
+        collision_table = CollisionTable(paths)
     collisions =[]
-    for i in range(len(paths)-1):
-        for j in range(i+1,len(paths)):
-            if detect_collision(paths[i],paths[j]) !=None:
-                position,t = detect_collision(paths[i],paths[j])
-                collisions.append({'a1':i,
-                                'a2':j,
-                                'loc':position,
-                                'timestep':t+1})
+    for i, j, position, t in collision_table.collisions():
+        collision = {'a1':i,
+                     'a2':j,
+                     'loc':position,
+                     'timestep':t}
+        if collision_table.k:
+            collision['end'] = t + collision_table.k
+        collisions.append(collision)
     return collisions
 
 
@@ -67,6 +78,10 @@ def standard_splitting(collision):
                             'timestep':collision['timestep'],
                             'positive':False
                             })
+        if 'end' in collision:
+            # k-delay collision: each child keeps its agent off loc for the whole range (range constraint)
+            for constraint in constraints:
+                constraint['end'] = collision['end']
     else:
         constraints.append({'agent':collision['a1'],
                             'loc':[collision['loc'][0],collision['loc'][1]],
@@ -90,6 +105,9 @@ def disjoint_splitting(collision):
     #                          specified timestep, and the second constraint prevents the same agent to traverse the
     #                          specified edge at the specified timestep
     #           Choose the agent randomly
+    if 'end' in collision:
+        # a k-delay collision has no single timestep to enforce; range constraints on both agents
+        return standard_splitting(collision)
     constraints = []
     agent = random.randint(0,1)
     a = 'a'+str(agent +1)
@@ -159,11 +177,30 @@ def apply_delay_constraint(constraints, agent_id, start_loc, delay_time):
 class CBSSolver(object):
     """The high-level search of CBS."""
 
-    def __init__(self, my_map, agents):
+    def __init__(self, my_map, agents, heuristics=None, llsolver=A_Star, use_cat=True, incremental=False,
+                 path_cache_size=4096, workers=0, lookahead=1, budget=None, initial_paths=None, k=0):
         """my_map   - list of lists specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        heuristics  - precomputed heuristic tables, one per goal (e.g. from a heuristic cache); computed if None
+        llsolver    - low-level solver class with the A_Star interface (A_Star, PEA_Star, EPEA_Star, ...)
+        use_cat     - break ties in the low-level search by conflicts with the other agents' paths
+        incremental - continue the parent CT node's low-level search of a replanned agent instead of
+                      starting over (see IncrementalSearches)
+        path_cache_size - entries of the LRU cache of low-level results (0 disables the cache)
+        workers     - run the low-level searches of the children of expanded nodes in a pool of this many
+                      processes (0 searches in this process); the CT is the same either way
+        lookahead   - with workers, also start the child searches of the next lookahead - 1 nodes of the
+                      open list (standard splitting only, disjoint splitting draws its agent at expansion)
+        budget      - time, node and memory limits of find_solution (see budget.solve); no limits if None
+        initial_paths - {agent: path} paths of the root node for some agents instead of their shortest
+                      paths, e.g. the rest of a plan that is being executed (warm start); if they don't
+                      collide with each other, the search only resolves the collisions of the other agents
+        k           - k-robustness: no agent enters a location another agent was at or will be at within k
+                      timesteps, so the paths stay collision-free if agents are delayed by up to k timesteps
         """
+        if workers and incremental:
+            raise ValueError("incremental low-level searches can't run in worker processes")
         self.my_map = my_map
         self.agents = agents  # ✅ Agent 리스트 직접 저장
         self.starts = [agent.start for agent in agents]
@@ -177,9 +214,45 @@ class CBSSolver(object):
         self.open_list = []
 
         # compute heuristics for the low-level search
-        self.heuristics = []
-        for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+        if heuristics is None:
+            heuristics = compute_all_heuristics(my_map, self.goals)
+        self.heuristics = heuristics
+        self.llsolver = llsolver
+        self.use_cat = use_cat
+        self.incremental = IncrementalSearches() if incremental else None
+        self.path_cache = PathCache(path_cache_size) if path_cache_size else None
+        self.workers = workers
+        self.lookahead = lookahead
+        self.budget = budget if budget is not None else Budget()
+        self.initial_paths = initial_paths if initial_paths is not None else dict()
+        self.k = k
+
+    def build_cat(self, paths, exclude):
+        """conflict avoidance table of the paths of all agents except exclude (None if disabled)"""
+        if not self.use_cat:
+            return None
+        return ConflictAvoidanceTable(paths, exclude)
+
+    def low_level(self, AStar, agent, constraints, paths, cat=None, future=None):
+        """path of agent under constraints; paths are the current paths (of the parent CT node)
+
+        future      - the same search running in a worker process (see ParallelReplans), used instead
+        """
+        if self.path_cache is not None:
+            # the same agent is often replanned under the same constraints in other branches
+            return self.path_cache.find_paths(
+                lambda: self.search_paths(AStar, agent, constraints, paths, cat, future), agent, constraints)
+        return self.search_paths(AStar, agent, constraints, paths, cat, future)
+
+    def search_paths(self, AStar, agent, constraints, paths, cat=None, future=None):
+        if future is not None:
+            return future.result()
+        if self.incremental is None:
+            astar = AStar(self.my_map, self.starts, self.goals, self.heuristics, agent, constraints, cat=cat)
+            return astar.find_paths()
+        curr_paths = [paths[agent]] if agent < len(paths) else None
+        return self.incremental.find_paths(AStar, self.my_map, self.starts, self.goals, self.heuristics,
+                                           agent, constraints, curr_paths, cat)
 
     def push_node(self, node):
         heapq.heappush(self.open_list, (node['cost'], len(node['collisions']), self.num_of_generated, node))
@@ -192,6 +265,17 @@ class CBSSolver(object):
         self.num_of_expanded += 1
         return node
 
+    def submit_replans(self, pool, p, splitter):
+        """start the child searches of the expanded node p and of the next nodes of the open list"""
+        nodes = [p]
+        if self.lookahead > 1 and splitter is standard_splitting:
+            # the k smallest entries of a heap are among its first 2^k - 1
+            k = self.lookahead - 1
+            nodes += [node for _, _, _, node in heapq.nsmallest(k, self.open_list[:2 ** k - 1])]
+        for node in nodes:
+            if node['collisions'] and 'replans' not in node:
+                pool.submit(node, splitter)
+
 
     def find_solution(self, disjoint):
         """ Finds paths for all agents from their start locations to their goal locations
@@ -200,6 +284,7 @@ class CBSSolver(object):
         """
 
         self.start_time = timer.time()
+        self.budget.start()
         
         if disjoint:
             splitter = disjoint_splitting
@@ -208,7 +293,7 @@ class CBSSolver(object):
 
         print("USING: ", splitter)
 
-        AStar = A_Star
+        AStar = self.llsolver
 
         # Generate the root node
         # constraints   - list of constraints
@@ -231,22 +316,29 @@ class CBSSolver(object):
             'cost': 0,
             'constraints': initial_constraints,
             'paths': [],
-            'collisions': []
+            'collisions': [],
+            'collision_table': None
         }
 
 
         for i in range(self.num_of_agents):  # Find initial path for each agent
-            astar = AStar(self.my_map, self.starts, self.goals, self.heuristics,i, root['constraints'])
-            path = astar.find_paths()
+            if i in self.initial_paths:
+                root['paths'].append([tuple(loc) for loc in self.initial_paths[i]])
+                continue
+            path = self.low_level(AStar, i, root['constraints'], root['paths'],
+                                  cat=self.build_cat(root['paths'], [i]))
 
             if path is None:
                 raise BaseException('No solutions')
             root['paths'].append(path[0])
 
         root['cost'] = get_sum_of_cost(root['paths'])
-        root['collisions'] = detect_collisions(root['paths'])
+        root['collision_table'] = CollisionTable(root['paths'], k=self.k)
+        root['collisions'] = detect_collisions(root['paths'], root['collision_table'])
         self.push_node(root)
 
+        pool = ParallelReplans(self, self.workers) if self.workers else None
+
 
 
         ##############################
@@ -258,56 +350,72 @@ class CBSSolver(object):
         #                standard_splitting function). Add a new child node to your open list for each constraint
         #           Ensure to create a copy of any objects that your child nodes might inherit
         
-        while len(self.open_list) > 0:
-            # if self.num_of_generated > 50000:
-            #     print('reached maximum number of nodes. Returning...')
-            #     return None
-            p = self.pop_node()
-            if p['collisions'] == []:
-                self.print_results(p)
-                for pa in p['paths']:
-                    print(pa)
-                return p['paths'], self.num_of_generated, self.num_of_expanded # number of nodes generated/expanded for comparing implementations
-            collision = p['collisions'].pop(0)
-            # constraints = standard_splitting(collision)
-            # constraints = disjoint_splitting(collision)
-            constraints = splitter(collision)
-
-            for constraint in constraints:
-                q = {'cost':0,
-                    'constraints': [constraint],
-                    'paths':[],
-                    'collisions':[]
-                }
-                for c in p['constraints']:
-                    if c not in q['constraints']:
-                        q['constraints'].append(c)
-                for pa in p['paths']:
-                    q['paths'].append(pa)
+        try:
+            while len(self.open_list) > 0:
+                if self.budget.exceeded(self.num_of_generated):
+                    return None
+                p = self.pop_node()
+                if p['collisions'] == []:
+                    self.print_results(p)
+                    for pa in p['paths']:
+                        print(pa)
+                    return p['paths'], self.num_of_generated, self.num_of_expanded # number of nodes generated/expanded for comparing implementations
+                if pool is not None:
+                    self.submit_replans(pool, p, splitter)
+                    constraints, futures = p.pop('replans')
+                    p['collisions'].pop(0)
+                else:
+                    collision = p['collisions'].pop(0)
+                    # constraints = standard_splitting(collision)
+                    # constraints = disjoint_splitting(collision)
+                    constraints = splitter(collision)
+                    futures = [None] * len(constraints)
+
+                for constraint, future in zip(constraints, futures):
+                    q = {'cost':0,
+                        'constraints': [constraint],
+                        'paths':[],
+                        'collisions':[],
+                        'collision_table': None
+                    }
+                    for c in p['constraints']:
+                        if c not in q['constraints']:
+                            q['constraints'].append(c)
+                    for pa in p['paths']:
+                        q['paths'].append(pa)
                 
-                ai = constraint['agent']
-                astar = AStar(self.my_map,self.starts, self.goals,self.heuristics,ai,q['constraints'])
-                path = astar.find_paths()
-
-                if path is not None:
-                    q['paths'][ai]= path[0]
-                    # task 4
-                    continue_flag = False
-                    if constraint['positive']:
-                        vol = paths_violate_constraint(constraint,q['paths'])
-                        for v in vol:
-                            astar_v = AStar(self.my_map,self.starts, self.goals,self.heuristics,v,q['constraints'])
-                            path_v = astar_v.find_paths()
-                            if path_v  is None:
-                                continue_flag =True
-                            else:
-                                q['paths'][v] = path_v[0]
-                        if continue_flag:
-                            continue
-                    q['collisions'] = detect_collisions(q['paths'])
-                    q['cost'] = get_sum_of_cost(q['paths'])
-                    self.push_node(q)     
-        return None
+                    ai = constraint['agent']
+                    if future is None:
+                        path = self.low_level(AStar, ai, q['constraints'], q['paths'],
+                                              cat=self.build_cat(q['paths'], [ai]))
+                    else:
+                        path = self.low_level(AStar, ai, q['constraints'], q['paths'], future=future)
+
+                    if path is not None:
+                        q['paths'][ai]= path[0]
+                        # task 4
+                        continue_flag = False
+                        if constraint['positive']:
+                            vol = paths_violate_constraint(constraint,q['paths'])
+                            for v in vol:
+                                path_v = self.low_level(AStar, v, q['constraints'], q['paths'],
+                                                        cat=self.build_cat(q['paths'], [v]))
+                                if path_v  is None:
+                                    continue_flag =True
+                                else:
+                                    q['paths'][v] = path_v[0]
+                            if continue_flag:
+                                continue
+                        # only the pairs of the replanned agents are checked again
+                        q['collision_table'] = p['collision_table'].update(q['paths'])
+                        q['collisions'] = detect_collisions(q['paths'], q['collision_table'])
+                        q['cost'] = get_sum_of_cost(q['paths'])
+                        self.push_node(q)     
+            return None
+        finally:
+            # the workers are stopped however the search ends
+            if pool is not None:
+                pool.shutdown()
 
     def print_results(self, node):
         print("\n Found a solution! \n")
@@ -316,6 +424,8 @@ class CBSSolver(object):
         print("Sum of costs:    {}".format(get_sum_of_cost(node['paths'])))
         print("Expanded nodes:  {}".format(self.num_of_expanded))
         print("Generated nodes: {}".format(self.num_of_generated))
+        if self.path_cache is not None:
+            print("Path cache:      {} hits, {} misses".format(self.path_cache.hits, self.path_cache.misses))
 
         print("Solution:")
         for i in range(len(node['paths'])):
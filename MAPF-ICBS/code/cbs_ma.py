@@ -1,7 +1,9 @@
 import time as timer
 import heapq
 import random
-from multi_agent_planner import ma_star,get_sum_of_cost, compute_heuristics, get_location
+from multi_agent_planner import ma_star, get_sum_of_cost, get_location
+from heuristics import compute_all_heuristics
+from collision_table import CollisionTable, BATCH_MIN_AGENTS, batch_count_collisions
 import copy
 
 import numpy
@@ -53,22 +55,20 @@ def detect_collisions(paths, ma_list, collisions=None):
 
     if collisions is None:
         collisions = []
-    for ai in range(len(paths)-1):
-        for aj in range(ai+1,len(paths)):
-            if detect_collision(paths[ai],paths[aj]) !=None:
-                position,t = detect_collision(paths[ai],paths[aj])
-
-                assert isinstance(ma_list , list)
-                ma_i = get_ma_of_agent(ai, ma_list)
-                assert isinstance(ma_list , list)
-                ma_j = get_ma_of_agent(aj, ma_list)
-
-                # check if internal collision in the same meta-agent
-                if ma_i != ma_j:
-                    collisions.append({'a1':ai, 'ma1':ma_i,
-                                    'a2':aj, 'ma2':ma_j,
-                                    'loc':position,
-                                    'timestep':t+1})
+    # one pass over the space-time occupancy of all paths instead of checking every pair
+    for ai, aj, position, t in CollisionTable(paths).collisions():
+
+        assert isinstance(ma_list , list)
+        ma_i = get_ma_of_agent(ai, ma_list)
+        assert isinstance(ma_list , list)
+        ma_j = get_ma_of_agent(aj, ma_list)
+
+        # check if internal collision in the same meta-agent
+        if ma_i != ma_j:
+            collisions.append({'a1':ai, 'ma1':ma_i,
+                            'a2':aj, 'ma2':ma_j,
+                            'loc':position,
+                            'timestep':t})
     return collisions
 
 def count_all_collisions_pair(path1, path2):
@@ -84,6 +84,8 @@ def count_all_collisions_pair(path1, path2):
     return collisions
 
 def count_all_collisions(paths):
+    if len(paths) >= BATCH_MIN_AGENTS:
+        return batch_count_collisions(paths)
     collisions = 0
     for i in range(len(paths)-1):
         for j in range(i+1,len(paths)):
@@ -301,9 +303,7 @@ class CBSSolver(object):
         self.open_list = []
 
         # compute heuristics for the low-level search
-        self.heuristics = []
-        for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+        self.heuristics = compute_all_heuristics(my_map, self.goals)
 
     def push_node(self, node):
 
@@ -0,0 +1,380 @@
+import numpy as np
+
+# below this many agents (checked together) the NumPy overhead costs more than the python loops,
+# see benchmark_collisions.py
+BATCH_MIN_AGENTS = 8
+
+def first_collision(path1, path2):
+    """first collision of two paths as (loc, timestep), None if there is none
+
+    Same result as detect_collision: loc is [v] for a vertex collision, [v2, u2] for an edge
+    collision where path2 moves from u2 to v2. Agents wait at their goal after their path ends.
+    """
+    last1, last2 = len(path1) - 1, len(path2) - 1
+    for t in range(1, max(len(path1), len(path2)) + 1):
+        loc1, loc2 = path1[min(t, last1)], path2[min(t, last2)]
+        # vertex collision
+        if loc1 == loc2:
+            return [loc1], t
+        # edge collision
+        prev1, prev2 = path1[min(t - 1, last1)], path2[min(t - 1, last2)]
+        if prev1 == loc2 and loc1 == prev2:
+            return [loc2, prev2], t
+    return None
+
+
+def first_k_collision(path1, path2, k):
+    """first k-delay collision of two paths as ([loc], timestep), None if there is none
+
+    The agents collide if one of them is at loc at a timestep and the other one at most k timesteps
+    later (k >= 1); timestep is the earlier of the two, the collision lies in [timestep, timestep + k].
+    An edge collision is a k-delay collision as well: each agent enters the cell the other one just left.
+    Agents wait at their goal after their path ends.
+    """
+    last1, last2 = len(path1) - 1, len(path2) - 1
+    for t in range(max(len(path1), len(path2))):
+        loc1, loc2 = path1[min(t, last1)], path2[min(t, last2)]
+        for delay in range(k + 1):
+            if path2[min(t + delay, last2)] == loc1:
+                return [loc1], t
+            if delay > 0 and path1[min(t + delay, last1)] == loc2:
+                return [loc2], t
+    return None
+
+
+def padded_cells(paths):
+    """paths padded into a (num_agents, makespan + 1) int array of cell ids (row * width + col)
+
+    Agents wait at their last cell after arrival; the extra column makes the last timestep of
+    the longest path comparable with the one before it. Returns the array, the width used for
+    the cell ids and the length of each path.
+    """
+    lens = np.array([len(path) for path in paths], dtype=np.int64)
+    coords = np.empty((len(paths), lens.max() + 1, 2), dtype=np.int64)
+    for agent, path in enumerate(paths):
+        coords[agent, :len(path)] = path
+        coords[agent, len(path):] = path[-1]
+    width = int(coords[:, :, 1].max()) + 1
+    return coords[:, :, 0] * width + coords[:, :, 1], width, lens
+
+
+def equal_key_pairs(keys, agents):
+    """all (agent1, agent2, key) with agent1 < agent2 that share a key; agents must be ascending"""
+    order = np.argsort(keys, kind='stable') # keeps the agents of a key in ascending order
+    keys, agents = keys[order], agents[order]
+    first, second, shared = [], [], []
+    d = 1
+    while d < len(keys):
+        same = np.nonzero(keys[d:] == keys[:-d])[0]
+        if len(same) == 0:
+            break
+        first.append(agents[same])
+        second.append(agents[same + d])
+        shared.append(keys[same])
+        d += 1
+    if not first:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(first), np.concatenate(second), np.concatenate(shared)
+
+
+def collision_events(cells, lens):
+    """every (a1, a2, timestep, is_edge) at which two padded paths collide, for a1 < a2
+
+    A vertex collision at timestep t: both agents are in the same cell at t.
+    An edge collision at t: the agents traverse the same edge between t - 1 and t (the other way,
+    the same way is a vertex collision at t as well). Only timesteps up to the end of the longer
+    of the two paths are returned, as detect_collision checks them.
+    """
+    num_agents, width = cells.shape
+    num_cells = int(cells.max()) + 1
+    times = np.arange(1, width, dtype=np.int64)
+    agents = np.repeat(np.arange(num_agents, dtype=np.int64), width - 1)
+
+    # vertex collisions: same (timestep, cell)
+    keys = (times[None, :] * num_cells + cells[:, 1:]).ravel()
+    v1, v2, v_keys = equal_key_pairs(keys, agents)
+    v_times = v_keys // num_cells
+
+    # edge collisions: same (timestep, undirected edge)
+    prev, curr = cells[:, :-1], cells[:, 1:]
+    moved = (prev != curr).ravel()
+    keys = ((times[None, :] * num_cells + np.minimum(prev, curr)) * num_cells + np.maximum(prev, curr)).ravel()
+    e1, e2, e_keys = equal_key_pairs(keys[moved], agents[moved])
+    e_times = e_keys // (num_cells * num_cells)
+
+    a1 = np.concatenate((v1, e1))
+    a2 = np.concatenate((v2, e2))
+    t = np.concatenate((v_times, e_times))
+    is_edge = np.concatenate((np.zeros(len(v1), dtype=bool), np.ones(len(e1), dtype=bool)))
+    keep = t <= np.maximum(lens[a1], lens[a2])
+    return a1[keep], a2[keep], t[keep], is_edge[keep]
+
+
+def batch_first_collisions(paths):
+    """first collision of every pair of paths, vectorized: {(a1, a2): (loc, timestep)} for a1 < a2
+
+    Same collisions as first_collision for every pair.
+    """
+    if len(paths) < 2:
+        return dict()
+    cells, width, lens = padded_cells(paths)
+    a1, a2, t, is_edge = collision_events(cells, lens)
+
+    # earliest event of each pair, a vertex collision before an edge collision at the same timestep
+    order = np.lexsort((is_edge, t, a2, a1))
+    a1, a2, t, is_edge = a1[order], a2[order], t[order], is_edge[order]
+    first = np.ones(len(a1), dtype=bool)
+    first[1:] = (a1[1:] != a1[:-1]) | (a2[1:] != a2[:-1])
+
+    pairs = dict()
+    for i, j, timestep, edge in zip(a1[first].tolist(), a2[first].tolist(), t[first].tolist(), is_edge[first].tolist()):
+        if edge:
+            cell_ids = (cells[j, timestep], cells[j, timestep - 1])
+        else:
+            cell_ids = (cells[i, timestep],)
+        pairs[(i, j)] = ([(int(cell) // width, int(cell) % width) for cell in cell_ids], timestep)
+    return pairs
+
+
+def batch_count_collisions(paths):
+    """number of (pair, timestep) with a vertex or edge collision, as count_all_collisions counts them"""
+    if len(paths) < 2:
+        return 0
+    cells, _, lens = padded_cells(paths)
+    a1, a2, t, _ = collision_events(cells, lens)
+    num_agents = len(paths)
+    return len(np.unique((t * num_agents + a1) * num_agents + a2))
+
+
+class Occupancy(object):
+    """Space-time occupancy hash of a set of paths."""
+
+    def __init__(self):
+        self.vertex = dict() # (timestep, loc) -> agents
+        self.edge = dict() # (timestep, from_loc, to_loc) -> agents
+        self.goal = dict() # loc -> ((timestep from which the agent waits there, agent), ...)
+
+    def copy(self):
+        occupancy = Occupancy()
+        # the values are tuples, so the copies can share them
+        occupancy.vertex = self.vertex.copy()
+        occupancy.edge = self.edge.copy()
+        occupancy.goal = self.goal.copy()
+        return occupancy
+
+    def add(self, agent, path):
+        vertex, edge = self.vertex, self.edge
+        for t, loc in enumerate(path):
+            vertex[(t, loc)] = vertex.get((t, loc), ()) + (agent,)
+            if t > 0 and path[t - 1] != loc:
+                edge[(t, path[t - 1], loc)] = edge.get((t, path[t - 1], loc), ()) + (agent,)
+        self.goal[path[-1]] = self.goal.get(path[-1], ()) + ((len(path), agent),)
+
+    def remove(self, agent, path):
+        def without(table, key, item):
+            rest = tuple(x for x in table[key] if x != item)
+            if rest:
+                table[key] = rest
+            else:
+                del table[key]
+
+        for t, loc in enumerate(path):
+            without(self.vertex, (t, loc), agent)
+            if t > 0 and path[t - 1] != loc:
+                without(self.edge, (t, path[t - 1], loc), agent)
+        without(self.goal, path[-1], (len(path), agent))
+
+    def first_collisions(self, agent, path, horizon, skip=()):
+        """first collision of path with each occupying agent: {other: (loc, timestep)}
+
+        horizon     - length of the longest path of all agents (path included)
+        skip        - agents to leave out
+        loc is ordered the way first_collision(path of lower agent, path of higher agent) returns it
+        """
+        found = dict()
+        last = len(path) - 1
+        for t in range(1, horizon + 1):
+            loc = path[min(t, last)]
+            # vertex collisions, on the other path or at the other agent's goal
+            for other in self.vertex.get((t, loc), ()):
+                if other not in found and other not in skip:
+                    found[other] = ([loc], t)
+            for arrival, other in self.goal.get(loc, ()):
+                if t >= arrival and other not in found and other not in skip:
+                    found[other] = ([loc], t)
+            # edge collisions: the other agent traverses the same edge the other way
+            prev = path[min(t - 1, last)]
+            if prev != loc:
+                for other in self.edge.get((t, loc, prev), ()):
+                    if other not in found and other not in skip:
+                        found[other] = ([prev, loc] if agent < other else [loc, prev], t)
+        return found
+
+
+class ReservationTable(object):
+    """Space-time cells of other agents' paths that a low-level search has to keep off (e.g. the
+    higher agents of PBS), looked up by ConstraintIndex next to the search's own constraints.
+
+    Agents wait at their goal after their path ends; the goal stays reserved up to horizon. A path
+    takes one entry per timestep and its goal a single one, where negative constraints would take
+    one per timestep up to horizon.
+    """
+
+    def __init__(self, horizon):
+        """horizon - last reserved timestep; a search may use every cell after it"""
+        self.horizon = horizon
+        self.vertex = set() # (timestep, loc)
+        self.edge = set() # (timestep, from_loc, to_loc) of the moves that swap with a reserved path
+        self.goal = dict() # loc -> first timestep an agent waits there (until horizon)
+        self.last_vertex = dict() # loc -> last timestep a path is at loc (before its goal wait)
+        self.last_arrival = dict() # loc -> last timestep of a reserved vertex or swapping move into loc
+        self.last_timestep = 0
+
+    def add(self, path):
+        path = [tuple(loc) for loc in path]
+        last = min(len(path) - 1, self.horizon)
+        for t in range(last + 1):
+            loc = path[t]
+            self.vertex.add((t, loc))
+            self.last_vertex[loc] = max(self.last_vertex.get(loc, -1), t)
+            self.last_arrival[loc] = max(self.last_arrival.get(loc, -1), t)
+            if t > 0:
+                # moving the other way along the path's edge
+                self.edge.add((t, loc, path[t - 1]))
+                self.last_arrival[path[t - 1]] = max(self.last_arrival.get(path[t - 1], -1), t)
+        if len(path) - 1 <= self.horizon:
+            self.goal[path[-1]] = min(self.goal.get(path[-1], len(path) - 1), len(path) - 1)
+            last = self.horizon
+        self.last_timestep = max(self.last_timestep, last)
+
+    def blocks(self, curr_loc, next_loc, timestep):
+        """whether moving curr_loc -> next_loc arriving at timestep collides with a reserved path"""
+        if timestep > self.horizon:
+            return False
+        if (timestep, next_loc) in self.vertex or (timestep, curr_loc, next_loc) in self.edge:
+            return True
+        arrival = self.goal.get(next_loc)
+        return arrival is not None and arrival <= timestep
+
+    def vertex_reserved_after(self, loc, timestep):
+        """whether loc is reserved at some timestep after timestep"""
+        return self.last_vertex.get(loc, -1) > timestep or (loc in self.goal and self.horizon > timestep)
+
+    def arrival_reserved_after(self, loc, timestep):
+        """whether loc is reserved, or a move into it swaps with a path, at some timestep after timestep"""
+        return self.last_arrival.get(loc, -1) > timestep or (loc in self.goal and self.horizon > timestep)
+
+
+class CollisionTable(object):
+    """First collision of every pair of agents in the paths of a CT node.
+
+    A child CT node only replans a few agents, so its table is derived from the parent's: the
+    pairs of unchanged agents are inherited and only the pairs involving replanned agents are
+    recomputed, by looking their new paths up in the parent's space-time occupancy hash. That is
+    O(n * T) for one replanned agent instead of O(n^2 * T) for checking every pair again.
+    The occupancy hash of a node is only built (from the parent's) when the node gets children.
+    When many agents are checked at once (the root node, large meta-agents) all pairs are found
+    with the vectorized kernel instead.
+
+    With k > 0 the table holds k-delay collisions (see first_k_collision), which are checked pair
+    by pair; the pairs of unchanged agents are still inherited.
+    """
+
+    def __init__(self, paths, pairs=None, parent=None, changed=(), locs=None, k=0):
+        """paths    - list of paths, one for each agent
+        pairs       - {(a1, a2): (loc, timestep)} for a1 < a2, computed from paths if None
+        parent      - table of the parent node, with changed the agents whose paths differ from it
+        locs        - paths as tuples of hashable locations, converted from paths if None
+        k           - k-robustness: agents collide if they are at the same location at most k timesteps
+                      apart (the collision of a pair lies in [timestep, timestep + k])
+        """
+        self.paths = list(paths) # to recognize unchanged paths by identity
+        self.locs = [tuple(tuple(loc) for loc in path) for path in paths] if locs is None else locs
+        self.parent = parent
+        self.changed = changed
+        self.occupancy = None
+        self.k = k
+
+        if pairs is None:
+            if k > 0:
+                pairs = dict()
+                for a1 in range(len(self.locs)):
+                    for a2 in range(a1 + 1, len(self.locs)):
+                        collision = first_k_collision(self.locs[a1], self.locs[a2], k)
+                        if collision is not None:
+                            pairs[(a1, a2)] = collision
+            elif len(self.locs) >= BATCH_MIN_AGENTS:
+                pairs = batch_first_collisions(self.locs)
+            else:
+                pairs = dict()
+                self.occupancy = Occupancy()
+                horizon = max((len(path) for path in self.locs), default=0)
+                for agent, path in enumerate(self.locs):
+                    for other, collision in self.occupancy.first_collisions(agent, path, horizon).items():
+                        pairs[(other, agent)] = collision
+                    self.occupancy.add(agent, path)
+        self.pairs = pairs
+
+    def get_occupancy(self):
+        if self.occupancy is None:
+            if self.parent is None:
+                occupancy = Occupancy()
+                for agent, path in enumerate(self.locs):
+                    occupancy.add(agent, path)
+            else:
+                occupancy = self.parent.get_occupancy().copy()
+                for agent in self.changed:
+                    occupancy.remove(agent, self.parent.locs[agent])
+                    occupancy.add(agent, self.locs[agent])
+            self.occupancy = occupancy
+            self.parent = None # no longer needed, don't keep the ancestors alive
+        return self.occupancy
+
+    def update(self, paths):
+        """table of paths, which differ from the paths of this table only in the replanned agents"""
+        locs = list(self.locs)
+        changed = []
+        for agent, path in enumerate(paths):
+            if path is self.paths[agent]:
+                continue
+            path = tuple(tuple(loc) for loc in path)
+            if path != self.locs[agent]:
+                locs[agent] = path
+                changed.append(agent)
+        if not changed:
+            return self
+        if self.k > 0:
+            pairs = {pair: collision for pair, collision in self.pairs.items()
+                     if pair[0] not in changed and pair[1] not in changed}
+            for agent in changed:
+                for other in range(len(locs)):
+                    if other == agent or (other in changed and other < agent):
+                        continue # the pair of two replanned agents is checked once
+                    a1, a2 = min(agent, other), max(agent, other)
+                    collision = first_k_collision(locs[a1], locs[a2], self.k)
+                    if collision is not None:
+                        pairs[(a1, a2)] = collision
+            return CollisionTable(paths, pairs, None, tuple(changed), locs, self.k)
+        if len(changed) >= BATCH_MIN_AGENTS:
+            # e.g. a large meta-agent: checking all pairs at once is cheaper
+            return CollisionTable(paths, batch_first_collisions(locs), self, tuple(changed), locs)
+
+        pairs = {pair: collision for pair, collision in self.pairs.items()
+                 if pair[0] not in changed and pair[1] not in changed}
+        occupancy = self.get_occupancy()
+        horizon = max(len(path) for path in locs)
+        for i, agent in enumerate(changed):
+            for other, collision in occupancy.first_collisions(agent, locs[agent], horizon, changed).items():
+                pairs[(min(agent, other), max(agent, other))] = collision
+            # pairs of two replanned agents
+            for other in changed[i + 1:]:
+                collision = first_collision(locs[agent], locs[other])
+                if collision is not None:
+                    pairs[(agent, other)] = collision
+
+        return CollisionTable(paths, pairs, self, tuple(changed), locs)
+
+    def collisions(self):
+        """[(a1, a2, loc, timestep), ...] ordered by (a1, a2), as the pairwise loop finds them"""
+        return [(a1, a2, list(loc), timestep) for (a1, a2), (loc, timestep) in sorted(self.pairs.items())]
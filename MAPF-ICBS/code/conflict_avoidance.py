@@ -0,0 +1,39 @@
+class ConflictAvoidanceTable(object):
+    """Locations used by the current paths of the other agents (CAT).
+
+    Used by the low-level search as a tie-breaker: among nodes with the same f value the one whose
+    path has fewer conflicts with the other agents is expanded first, so the high level has fewer
+    collisions to branch on. Agents stay at their goal after the end of their path.
+    """
+
+    def __init__(self, paths, exclude=()):
+        """paths    - list of paths, one for each agent (agents without a path yet can be None or missing)
+        exclude     - agents that are being replanned, their paths are not added
+        """
+        self.vertex = dict()  # (timestep, loc) -> number of agents
+        self.edge = dict()  # (timestep, from_loc, to_loc) -> number of agents
+        self.goal = dict()  # loc -> [timestep from which an agent waits there forever, ...]
+
+        for agent, path in enumerate(paths):
+            if agent in exclude or not path:
+                continue
+            path = [tuple(loc) for loc in path]
+            for t, loc in enumerate(path):
+                self.vertex[(t, loc)] = self.vertex.get((t, loc), 0) + 1
+                if t > 0 and path[t - 1] != loc:
+                    self.edge[(t, path[t - 1], loc)] = self.edge.get((t, path[t - 1], loc), 0) + 1
+            self.goal.setdefault(path[-1], []).append(len(path))
+
+    def __bool__(self):
+        return bool(self.vertex)
+
+    def count(self, curr_loc, next_loc, timestep):
+        """number of conflicts of the move curr_loc -> next_loc arriving at timestep"""
+        conflicts = self.vertex.get((timestep, next_loc), 0)
+        for t in self.goal.get(next_loc, ()):
+            if timestep >= t:
+                conflicts += 1
+        # edge conflict: another agent traverses the same edge the other way
+        if curr_loc != next_loc:
+            conflicts += self.edge.get((timestep, next_loc, curr_loc), 0)
+        return conflicts
@@ -0,0 +1,139 @@
+class ConstraintIndex(object):
+    """Constraints of one agent compiled into hashed lookups for the low-level search.
+
+    Negative vertex constraints are stored as (timestep, loc) and negative edge constraints as
+    (timestep, from, to) in sets. Positive constraints go into a list indexed by timestep.
+    Positive constraints of other agents are turned into negative constraints for this agent,
+    the same way the old per-timestep constraint tables did.
+    A negative vertex constraint with an 'end' (range constraint, from k-robust splitting) blocks its
+    location at every timestep in [timestep, end].
+    Paths of other agents can be reserved in a ReservationTable instead of as negative constraints;
+    the lookups below check it as well.
+    """
+
+    def __init__(self, constraints, agent, reservations=None):
+        """constraints - list of dict constraints generated by a CBS splitter; dict = {agent,loc,timestep,positive}
+        agent       - the (simple) agent the index is compiled for
+        reservations - ReservationTable of paths the agent has to keep off, None if there are none
+        """
+        self.agent = agent
+        self.reservations = reservations
+        self.neg_vertex = set()  # {(timestep, loc)}
+        self.neg_edge = set()  # {(timestep, from_loc, to_loc)}
+        self.positive = []  # timestep -> tuple of (from_loc, to_loc); from_loc is None for vertex constraints
+
+        # latest timestep at which a negative constraint blocks a location (for goal tests)
+        self.last_neg_vertex = dict()  # loc -> timestep
+        self.last_neg_arrival = dict()  # loc -> timestep, vertex constraints and edges ending at loc,
+                                       # and destinations of other agents' positive edges
+
+        self.max_timestep = 0
+
+        positive = dict()
+        for constraint in constraints or []:
+            timestep = constraint['timestep']
+            loc = [tuple(l) for l in constraint['loc']]
+            if constraint['agent'] == agent:
+                if constraint['positive']:
+                    if len(loc) == 1:
+                        positive.setdefault(timestep, []).append((None, loc[0]))
+                    else:
+                        positive.setdefault(timestep, []).append((loc[0], loc[1]))
+                else:
+                    for t in range(timestep, constraint.get('end', timestep) + 1):
+                        self.add_negative(loc, t)
+                    timestep = constraint.get('end', timestep)
+            # enforce positive constraints from other agents (i.e. create neg constraint)
+            elif constraint['positive']:
+                if len(loc) == 2:
+                    # the other agent arrives at loc[1], so waiting there is blocked as well
+                    self.block_arrival(loc[1], timestep)
+                    # switch traversal direction
+                    loc = [loc[1], loc[0]]
+                self.add_negative(loc, timestep)
+            else:
+                continue
+            self.max_timestep = max(self.max_timestep, timestep)
+
+        if reservations is not None:
+            self.max_timestep = max(self.max_timestep, reservations.last_timestep)
+
+        if positive:
+            self.positive = [()] * (max(positive) + 1)
+            for timestep, moves in positive.items():
+                self.positive[timestep] = tuple(moves)
+
+        # locations of positive vertex constraints strictly after each timestep
+        self._pos_vertex_after = [()] * len(self.positive)
+        later = ()
+        for t in range(len(self.positive) - 1, -1, -1):
+            self._pos_vertex_after[t] = later
+            later = later + tuple(to_loc for from_loc, to_loc in self.positive[t] if from_loc is None)
+        self._pos_vertex_from = later  # all positive vertex locations (timestep >= 0)
+
+    def add_negative(self, loc, timestep):
+        if len(loc) == 1:
+            self.neg_vertex.add((timestep, loc[0]))
+            if self.last_neg_vertex.get(loc[0], -1) < timestep:
+                self.last_neg_vertex[loc[0]] = timestep
+        else:
+            self.neg_edge.add((timestep, loc[0], loc[1]))
+        self.block_arrival(loc[-1], timestep)
+
+    def block_arrival(self, loc, timestep):
+        if self.last_neg_arrival.get(loc, -1) < timestep:
+            self.last_neg_arrival[loc] = timestep
+
+    def is_forbidden(self, curr_loc, next_loc, timestep):
+        """whether moving curr_loc -> next_loc arriving at timestep hits a negative constraint or a reservation"""
+        return (timestep, next_loc) in self.neg_vertex or (timestep, curr_loc, next_loc) in self.neg_edge \
+            or (self.reservations is not None and self.reservations.blocks(curr_loc, next_loc, timestep))
+
+    def positive_at(self, timestep):
+        """positive constraints at timestep as (from_loc, to_loc); from_loc is None for vertex constraints"""
+        if timestep < len(self.positive):
+            return self.positive[timestep]
+        return ()
+
+    def is_required(self, curr_loc, next_loc, timestep):
+        """whether the move matches a positive constraint at timestep"""
+        for from_loc, to_loc in self.positive_at(timestep):
+            if to_loc == next_loc and (from_loc is None or from_loc == curr_loc):
+                return True
+        return False
+
+    def violates_positive(self, curr_loc, next_loc, timestep):
+        """whether the move fails to meet a positive constraint at timestep"""
+        for from_loc, to_loc in self.positive_at(timestep):
+            if to_loc != next_loc or (from_loc is not None and from_loc != curr_loc):
+                return True
+        return False
+
+    def violates(self, curr_loc, next_loc, timestep):
+        return self.is_forbidden(curr_loc, next_loc, timestep) \
+            or self.violates_positive(curr_loc, next_loc, timestep)
+
+    def vertex_blocked_after(self, loc, timestep):
+        """whether a negative vertex constraint or a reservation forbids loc at some later timestep"""
+        return self.last_neg_vertex.get(loc, -1) > timestep \
+            or (self.reservations is not None and self.reservations.vertex_reserved_after(loc, timestep))
+
+    def arrival_blocked_after(self, loc, timestep):
+        """whether a negative vertex or edge constraint (or reservation) into loc exists at some later timestep"""
+        return self.last_neg_arrival.get(loc, -1) > timestep \
+            or (self.reservations is not None and self.reservations.arrival_reserved_after(loc, timestep))
+
+    def must_leave_after(self, loc, timestep):
+        """whether staying at loc forever from timestep violates a vertex constraint"""
+        if self.vertex_blocked_after(loc, timestep):
+            return True
+        if timestep < 0:
+            later = self._pos_vertex_from
+        elif timestep < len(self._pos_vertex_after):
+            later = self._pos_vertex_after[timestep]
+        else:
+            return False
+        for pos_loc in later:
+            if pos_loc != loc:
+                return True
+        return False
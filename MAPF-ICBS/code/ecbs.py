@@ -0,0 +1,180 @@
+import time as timer
+import heapq
+
+from cbs_basic import CBSSolver, detect_collisions, standard_splitting, disjoint_splitting, \
+    paths_violate_constraint, apply_delay_constraint
+from a_star_class import get_sum_of_cost
+from focal_a_star_class import Focal_A_Star
+from collision_table import CollisionTable
+
+SUBOPTIMALITY = 1.5
+
+
+class ECBSSolver(CBSSolver):
+    """Enhanced CBS (ECBS): bounded-suboptimal CBS with focal search at both levels.
+
+    The low level is Focal_A_Star, which returns a path of at most w times the optimal cost that
+    collides little with the other agents, and a lower bound on the optimal cost. The bound of a
+    CT node (lb) is the sum of the lower bounds of its agents. The high level expands nodes from
+    its focal list: the open nodes with cost <= w * (smallest lb in the open list), fewest
+    collisions first. The solution costs at most w times the optimal sum of costs.
+    """
+
+    def __init__(self, my_map, agents, w=SUBOPTIMALITY, heuristics=None, budget=None):
+        """my_map   - list of lists specifying obstacle positions
+        agents      - agents with id, start, goal and delay
+        w           - suboptimality factor (>= 1); w = 1 finds optimal solutions
+        heuristics  - precomputed heuristic tables, one per goal (e.g. from a heuristic cache); computed if None
+        budget      - time, node and memory limits of find_solution (see budget.solve); no limits if None
+        """
+        # focal paths depend on the other agents' paths (through the conflict avoidance table) and
+        # have to come with their lower bound, so low-level results are not cached
+        super().__init__(my_map, agents, heuristics=heuristics, llsolver=Focal_A_Star, use_cat=True,
+                         path_cache_size=0, budget=budget)
+        if w < 1:
+            raise ValueError("suboptimality factor w must be at least 1, got {}".format(w))
+        self.w = w
+        self.pending = [] # open nodes that are not in the focal list yet, by cost
+        self.focal_list = []
+        self.popped = set() # ids of expanded nodes, they are removed from the open list lazily
+
+    def focal_search(self, agent, constraints, paths):
+        """path of agent under constraints and the lower bound of its cost; paths are the current paths"""
+        search = Focal_A_Star(self.my_map, self.starts, self.goals, self.heuristics, agent, constraints,
+                              cat=self.build_cat(paths, [agent]), w=self.w)
+        path = search.find_paths()
+        return path, search.lower_bound
+
+    def push_node(self, node):
+        heapq.heappush(self.open_list, (node['lb'], self.num_of_generated, node))
+        heapq.heappush(self.pending, (node['cost'], self.num_of_generated, node))
+        self.num_of_generated += 1
+
+    def update_focal(self):
+        """move the open nodes within w * lb_min into the focal list, False if the open list is empty"""
+        while self.open_list and self.open_list[0][1] in self.popped:
+            heapq.heappop(self.open_list)
+        if not self.open_list:
+            return False
+
+        # a child's lb is never below its parent's, so lb_min never decreases
+        lb_min = self.open_list[0][0]
+        while self.pending and self.pending[0][0] <= self.w * lb_min:
+            cost, id, node = heapq.heappop(self.pending)
+            heapq.heappush(self.focal_list, (len(node['collisions']), cost, id, node))
+        return True
+
+    def pop_node(self):
+        _, _, id, node = heapq.heappop(self.focal_list)
+        print("Expand node {}".format(id))
+        self.popped.add(id)
+        self.num_of_expanded += 1
+        return node
+
+    def replan(self, node, agent):
+        """replan agent in node, False if it has no path under the node's constraints"""
+        path, lower_bound = self.focal_search(agent, node['constraints'], node['paths'])
+        if path is None:
+            return False
+        node['paths'][agent] = path[0]
+        # the parent's bound still holds for the child, which only has more constraints
+        node['lbs'][agent] = max(node['lbs'][agent], lower_bound)
+        return True
+
+    def find_solution(self, disjoint):
+        """ Finds paths for all agents from their start locations to their goal locations
+
+        disjoint         - use disjoint splitting or not
+        """
+
+        self.start_time = timer.time()
+        self.budget.start()
+
+        if disjoint:
+            splitter = disjoint_splitting
+        else:
+            splitter = standard_splitting
+
+        print("USING: ", splitter)
+
+        # Generate the root node
+        # constraints   - list of constraints
+        # paths         - list of paths, one for each agent
+        # lbs           - lower bound of the cost of each agent's path, lb is their sum
+        # collisions     - list of collisions in paths
+        initial_constraints = []
+
+        for agent in self.agents:
+            if agent.delay > 0:
+                apply_delay_constraint(
+                    initial_constraints,
+                    agent_id=agent.id,
+                    start_loc=agent.start,
+                    delay_time=agent.delay
+                )
+
+        root = {
+            'cost': 0,
+            'lb': 0,
+            'constraints': initial_constraints,
+            'paths': [],
+            'lbs': [],
+            'collisions': [],
+            'collision_table': None
+        }
+
+        for i in range(self.num_of_agents):  # Find initial path for each agent
+            path, lower_bound = self.focal_search(i, root['constraints'], root['paths'])
+
+            if path is None:
+                raise BaseException('No solutions')
+            root['paths'].append(path[0])
+            root['lbs'].append(lower_bound)
+
+        root['cost'] = get_sum_of_cost(root['paths'])
+        root['lb'] = sum(root['lbs'])
+        root['collision_table'] = CollisionTable(root['paths'])
+        root['collisions'] = detect_collisions(root['paths'], root['collision_table'])
+        self.push_node(root)
+
+        while self.update_focal():
+            if self.budget.exceeded(self.num_of_generated):
+                return None
+            p = self.pop_node()
+            if p['collisions'] == []:
+                self.print_results(p)
+                return p['paths'], self.num_of_generated, self.num_of_expanded
+
+            collision = p['collisions'][0]
+            constraints = splitter(collision)
+
+            for constraint in constraints:
+                q = {'cost': 0,
+                     'lb': 0,
+                     'constraints': [constraint],
+                     'paths': list(p['paths']),
+                     'lbs': list(p['lbs']),
+                     'collisions': [],
+                     'collision_table': None
+                     }
+                for c in p['constraints']:
+                    if c not in q['constraints']:
+                        q['constraints'].append(c)
+
+                if not self.replan(q, constraint['agent']):
+                    continue
+                if constraint['positive']:
+                    # agents that violate the positive constraint have to move out of the way
+                    if not all(self.replan(q, v) for v in paths_violate_constraint(constraint, q['paths'])):
+                        continue
+
+                q['collision_table'] = p['collision_table'].update(q['paths'])
+                q['collisions'] = detect_collisions(q['paths'], q['collision_table'])
+                q['cost'] = get_sum_of_cost(q['paths'])
+                q['lb'] = sum(q['lbs'])
+                self.push_node(q)
+        return None
+
+    def print_results(self, node):
+        super().print_results(node)
+        print("Lower bound:     {} (w = {})".format(node['lb'], self.w))
@@ -0,0 +1,73 @@
+from itertools import product
+
+from pea_star_class import PEA_Star
+
+
+class EPEA_Star(PEA_Star):
+    """Enhanced Partial Expansion A* (EPEA*).
+
+    Same search as PEA_Star, but children with f != F are never generated. The operator
+    selection function (OSF) works per agent: each move of agent i changes f by
+    delta_i = cost_i + h_i(next) - h_i(curr), so only the combinations of per-agent moves whose
+    deltas add up to F - f(curr) are built. The next F value comes from the possible delta sums
+    without generating any child.
+    """
+
+    def operator_table(self, curr):
+        """per agent: {delta f: [next cells]} for the moves of the agent from curr"""
+        table = []
+        for i, moves in enumerate(self.get_moves(curr)):
+            h_flat = self.h_flat[i]
+            curr_h = h_flat[curr.cells[i]]
+            # agents that already reached their goal don't add to the cost
+            cost = 0 if curr.reached_goal >> i & 1 else 1
+            ops = dict()
+            for next_cell in moves:
+                ops.setdefault(cost + h_flat[next_cell] - curr_h, []).append(next_cell)
+            table.append(ops)
+        return table
+
+    def select_operator(self, curr, F_val):
+        """ the Operator Selection Function - OSF for EPEA*
+
+        returns the per-agent move lists of every delta combination that reaches F_val and
+        the next F value of curr (None if no combination is left)
+        """
+        table = self.operator_table(curr)
+        target = F_val - (curr.g_val + curr.h_val)
+
+        # delta sums reachable by agents i..k-1
+        reachable = [{0}]
+        for ops in reversed(table):
+            reachable.append({s + d for s in reachable[-1] for d in ops})
+        reachable.reverse()
+
+        next_deltas = [s for s in reachable[0] if s > target]
+        next_F = F_val + min(next_deltas) - target if next_deltas else None
+
+        operators = []
+        if target in reachable[0]:
+            stack = [(0, target, [])]
+            while stack:
+                i, remaining, chosen = stack.pop()
+                if i == len(table):
+                    operators.append(chosen)
+                    continue
+                for delta in sorted(table[i], reverse=True):
+                    if remaining - delta in reachable[i + 1]:
+                        stack.append((i + 1, remaining - delta, chosen + [table[i][delta]]))
+
+        return operators, next_F
+
+    def select_children(self, curr, F_val):
+        operators, next_F = self.select_operator(curr, F_val)
+        g_value = curr.g_val + self.move_cost(curr)
+
+        children_with_F = []
+        for moves in operators:
+            for child_cells in product(*moves):
+                child = self.make_child(curr, child_cells, g_value)
+                if child is not None:
+                    children_with_F.append(child)
+
+        return children_with_F, next_F
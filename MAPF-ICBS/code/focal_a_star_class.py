@@ -0,0 +1,95 @@
+import heapq
+import time as timer
+
+from a_star_class import A_Star, get_path
+
+
+class Focal_A_Star(A_Star):
+    """Focal search with the same interface as A_Star, the low level of ECBS.
+
+    The open list is ordered by f as usual. The focal list holds the open nodes with
+    f <= w * f_min and is ordered by the number of conflicts with the conflict avoidance table,
+    so the search prefers paths that collide less with the other agents. The path found costs at
+    most w times the optimal one; lower_bound (f_min when the goal was expanded) is a lower bound
+    on the cost of an optimal path, the high level of ECBS adds them up into the bound of a CT node.
+    """
+
+    resumable = False # nodes are not expanded in f order
+
+    def __init__(self,my_map,starts,goals,heuristics,agents,contraints,cat=None,w=1.0):
+        """w    - suboptimality factor (>= 1) of the path, other arguments as A_Star"""
+        super().__init__(my_map,starts,goals,heuristics,agents,contraints,cat)
+        assert w >= 1
+        self.w = w
+        self.pending = [] # open nodes that are not in the focal list yet, by f
+        self.focal_list = []
+        self.popped = set() # ids of expanded nodes, they are removed from the open list lazily
+        self.f_min = None
+        self.lower_bound = None
+
+    def push_node(self, node):
+        f_value = node.g_val + node.h_val
+
+        heapq.heappush(self.open_list, (f_value, self.num_generated, node))
+        heapq.heappush(self.pending, (f_value, self.num_generated, node))
+        self.num_generated += 1
+
+    def update_focal(self):
+        """move the open nodes within w * f_min into the focal list, False if the open list is empty"""
+        while self.open_list and self.open_list[0][1] in self.popped:
+            heapq.heappop(self.open_list)
+        if not self.open_list:
+            return False
+
+        # f_min never decreases (consistent heuristics), so nodes never have to leave the focal list
+        self.f_min = self.open_list[0][0]
+        while self.pending and self.pending[0][0] <= self.w * self.f_min:
+            f_value, id, node = heapq.heappop(self.pending)
+            heapq.heappush(self.focal_list, (node.conflicts, f_value, node.h_val, node.cells, id, node))
+        return True
+
+    def pop_node(self):
+        _,_,_,_, id, curr = heapq.heappop(self.focal_list)
+        self.popped.add(id)
+
+        self.num_expanded += 1
+        return curr
+
+    def find_paths(self):
+
+        self.start_time = timer.time()
+
+        root = self.init_search()
+        if self.start_blocked():
+            print('no solution')
+            return None
+
+        self.push_node(root)
+        self.closed_list[self.closed_key(root)] = root
+
+        while self.update_focal():
+
+            curr = self.pop_node()
+
+            if self.is_solution(curr):
+                self.solution = curr
+                self.lower_bound = self.f_min
+                return get_path(curr,self.agents,self.locs)
+
+            children = self.generate_child_nodes(curr)
+            self.expanded.append(curr)
+
+            for child in children:
+
+                key = self.closed_key(child)
+                existing = self.closed_list.get(key)
+                if existing is not None:
+                    if self.replaces(child, existing):
+                        self.closed_list[key] = child
+                        self.push_node(child)
+                else:
+                    self.closed_list[key] = child
+                    self.push_node(child)
+
+        print('no solution')
+        return None
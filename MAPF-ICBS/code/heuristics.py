@@ -0,0 +1,97 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+UNREACHABLE = -1
+
+
+def occupancy_array(my_map):
+    """my_map   - list of lists (or 2D array) specifying obstacle positions
+    returns a (rows, cols) boolean array, True for obstacles
+    """
+    return np.asarray(my_map, dtype=bool)
+
+
+def compute_heuristic_tables(my_map, goals):
+    """ BFS wavefront from every goal at once over the occupancy array.
+
+    my_map      - list of lists (or 2D array) specifying obstacle positions
+    goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+    returns a (len(goals), rows, cols) int32 array of shortest path lengths to each goal,
+    UNREACHABLE for cells that cannot reach the goal (obstacles included)
+    """
+    free = ~occupancy_array(my_map)
+    rows, cols = free.shape
+
+    tables = np.full((len(goals), rows, cols), UNREACHABLE, dtype=np.int32)
+    frontier = np.zeros((len(goals), rows, cols), dtype=bool)
+    for k, goal in enumerate(goals):
+        tables[k, goal[0], goal[1]] = 0
+        frontier[k, goal[0], goal[1]] = True
+
+    # every goal layer expands one ring per step; all layers share the same shifts
+    step = 0
+    while frontier.any():
+        step += 1
+        reached = np.zeros_like(frontier)
+        reached[:, 1:, :] |= frontier[:, :-1, :]
+        reached[:, :-1, :] |= frontier[:, 1:, :]
+        reached[:, :, 1:] |= frontier[:, :, :-1]
+        reached[:, :, :-1] |= frontier[:, :, 1:]
+        reached &= free
+        reached &= tables == UNREACHABLE
+        tables[reached] = step
+        frontier = reached
+
+    return tables
+
+
+class HeuristicTable(Mapping):
+    """Read-only {loc: h_value} view over one dense heuristic table.
+
+    Behaves like the dict returned by the old Dijkstra compute_heuristics:
+    h_values[loc] for reachable cells, KeyError for unreachable or out of map cells.
+    """
+
+    def __init__(self, table):
+        self.array = table
+        self.rows, self.cols = table.shape
+        # nested python lists are much faster than numpy scalar indexing in the low-level search
+        self._values = table.tolist()
+        self._flat = None
+
+    def flat_values(self):
+        """h values indexed by flat cell id (row * cols + col), UNREACHABLE for unreachable cells"""
+        if self._flat is None:
+            self._flat = np.asarray(self.array).ravel().tolist()
+        return self._flat
+
+    def __getitem__(self, loc):
+        r, c = loc
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            h = self._values[r][c]
+            if h != UNREACHABLE:
+                return h
+        raise KeyError(loc)
+
+    def __contains__(self, loc):
+        try:
+            self[loc]
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def __iter__(self):
+        for r, c in zip(*np.nonzero(self.array != UNREACHABLE)):
+            yield (int(r), int(c))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.array != UNREACHABLE))
+
+
+def compute_all_heuristics(my_map, goals):
+    """Heuristics for every goal in one batched pass, one HeuristicTable per goal."""
+    if not goals:
+        return []
+    tables = compute_heuristic_tables(my_map, goals)
+    return [HeuristicTable(tables[k]) for k in range(len(goals))]
@@ -0,0 +1,192 @@
+import heapq
+
+from a_star_class import get_sum_of_cost
+from path_cache import PathCache
+from collision_table import first_collision
+from cbs_basic import standard_splitting
+
+HL_HEURISTICS = ('none', 'cg', 'dg', 'wdg')
+
+# CT nodes the CBS of a pair may expand; past it the pair gets the lowest cost still open (a lower bound)
+PAIR_NODE_LIMIT = 64
+
+
+def min_vertex_cover(edges):
+    """size of a minimum vertex cover of the graph given by edges [(u, v), ...]"""
+    edges = {frozenset(edge) for edge in edges}
+    if not edges:
+        return 0
+
+    # branch on the vertex with the highest degree: either it is in the cover or all its neighbours are
+    neighbours = dict()
+    for u, v in edges:
+        neighbours.setdefault(u, set()).add(v)
+        neighbours.setdefault(v, set()).add(u)
+    vertex = max(neighbours, key=lambda u: (len(neighbours[u]), u))
+    if len(neighbours[vertex]) == 1:
+        # a vertex of degree 1 everywhere: taking its neighbour is never worse
+        (other,) = neighbours[vertex]
+        return 1 + min_vertex_cover([edge for edge in edges if other not in edge])
+
+    with_vertex = 1 + min_vertex_cover([edge for edge in edges if vertex not in edge])
+    without_vertex = len(neighbours[vertex]) + min_vertex_cover(
+        [edge for edge in edges if not (edge & neighbours[vertex])])
+    return min(with_vertex, without_vertex)
+
+
+def min_weighted_vertex_cover(weights):
+    """smallest sum of non-negative integers x_v with x_u + x_v >= w for every edge
+
+    weights     - {(u, v): w} edge weights
+    """
+    weights = {edge: w for edge, w in weights.items() if w > 0}
+    if not weights:
+        return 0
+
+    neighbours = dict()
+    for (u, v), w in weights.items():
+        neighbours.setdefault(u, dict())[v] = max(w, neighbours.get(u, dict()).get(v, 0))
+        neighbours.setdefault(v, dict())[u] = max(w, neighbours.get(v, dict()).get(u, 0))
+
+    # the cover of each connected component can be found on its own
+    total = 0
+    unvisited = set(neighbours)
+    while unvisited:
+        component = []
+        stack = [min(unvisited)]
+        unvisited.discard(stack[0])
+        while stack:
+            u = stack.pop()
+            component.append(u)
+            for v in neighbours[u]:
+                if v in unvisited:
+                    unvisited.discard(v)
+                    stack.append(v)
+        total += weighted_cover_of_component(sorted(component), neighbours)
+    return total
+
+
+def weighted_cover_of_component(vertices, neighbours):
+    # branch and bound over the values of the vertices in order; a value above the largest
+    # weight of a vertex's edges never helps
+    best = [sum(max(neighbours[u].values()) for u in vertices)]
+    values = dict()
+
+    def assign(i, total):
+        if total >= best[0]:
+            return
+        if i == len(vertices):
+            best[0] = total
+            return
+        u = vertices[i]
+        lowest = max([w - values[v] for v, w in neighbours[u].items() if v in values] + [0])
+        for value in range(lowest, max(neighbours[u].values()) + 1):
+            values[u] = value
+            assign(i + 1, total + value)
+        del values[u]
+
+    assign(0, 0)
+    return best[0]
+
+
+def first_collision_among(agents, paths):
+    """first collision between the paths {agent: path} of agents as a collision of cbs_basic, None if there is none"""
+    for i, a1 in enumerate(agents):
+        for a2 in agents[i + 1:]:
+            collision = first_collision(paths[a1], paths[a2])
+            if collision is not None:
+                return {'a1': a1, 'a2': a2, 'loc': collision[0], 'timestep': collision[1]}
+    return None
+
+
+def pair_cost(solver, AStar, agents, constraints, node_limit=PAIR_NODE_LIMIT):
+    """sum of costs of the optimal collision-free paths of agents under constraints, None if there are none
+
+    CBS over the simple agents, each planned on its own with solver.low_level. The joint search of a
+    meta-agent can't be used here: it doesn't charge the timesteps an agent waits at its goal before
+    leaving it again, so its cost can be too high for an admissible heuristic.
+    If node_limit CT nodes are expanded first, the lowest cost left open is returned instead.
+    """
+    constraints = list(constraints)
+    paths = dict()
+    for agent in agents:
+        path = solver.low_level(AStar, [agent], constraints)
+        if path is None:
+            return None
+        paths[agent] = path[0]
+
+    open_list = [(get_sum_of_cost(paths.values()), 0, constraints, paths)]
+    num_generated = 1
+    for _ in range(node_limit):
+        if not open_list:
+            return None
+        cost, _, node_constraints, node_paths = heapq.heappop(open_list)
+        collision = first_collision_among(agents, node_paths)
+        if collision is None:
+            return cost
+        for constraint in standard_splitting(collision):
+            child_constraints = node_constraints + [constraint]
+            path = solver.low_level(AStar, [constraint['agent']], child_constraints)
+            if path is None:
+                continue
+            child_paths = dict(node_paths)
+            child_paths[constraint['agent']] = path[0]
+            heapq.heappush(open_list, (get_sum_of_cost(child_paths.values()), num_generated, child_constraints,
+                                       child_paths))
+            num_generated += 1
+    return open_list[0][0] if open_list else None
+
+
+class HighLevelHeuristic(object):
+    """Admissible heuristics for the CT nodes of ICBS_Solver (as in CBSH).
+
+    All of them are a vertex cover of a graph over the (meta-)agents of a node, with an edge
+    for each pair in a collision whose resolution costs at least one more:
+        cg      - conflict graph: edges are cardinal collisions
+        dg      - dependency graph: edges are pairs whose optimal joint solution under the node's
+                  constraints costs more than their current paths
+        wdg     - weighted dependency graph: dg with the extra cost as edge weight
+    The joint solutions come from pair_cost and are memoized by (agents, constraint signature).
+    """
+
+    def __init__(self, name):
+        if name not in HL_HEURISTICS:
+            raise ValueError("Unknown high-level heuristic: {} (one of: {})".format(name, ', '.join(HL_HEURISTICS)))
+        self.name = name
+        self.joint_costs = dict() # (agents, constraint signature) -> pair_cost of the agents
+
+    def compute(self, solver, AStar, node):
+        """h value of node; solver is the ICBS_Solver the node belongs to"""
+        if self.name == 'none' or not node['ma_collisions']:
+            return 0
+
+        if self.name == 'cg':
+            edges = set()
+            for collision in node['ma_collisions']:
+                pair = (collision['ma1'], collision['ma2'])
+                if pair not in edges and solver.detect_cardinal_conflict(AStar, node, collision) == 'cardinal':
+                    edges.add(pair)
+            return min_vertex_cover(edges)
+
+        weights = dict()
+        for collision in node['ma_collisions']:
+            pair = (collision['ma1'], collision['ma2'])
+            if pair not in weights:
+                weights[pair] = self.extra_cost(solver, AStar, node, collision['ma1'], collision['ma2'])
+        if self.name == 'dg':
+            return min_vertex_cover([pair for pair, w in weights.items() if w > 0])
+        return min_weighted_vertex_cover(weights)
+
+    def extra_cost(self, solver, AStar, node, ma1, ma2):
+        """how much more the optimal joint paths of ma1 and ma2 cost than their current paths"""
+        agents = sorted(ma1 | ma2)
+        key = PathCache.key(agents, node['constraints'])
+        if key not in self.joint_costs:
+            self.joint_costs[key] = pair_cost(solver, AStar, agents, node['constraints'])
+        joint_cost = self.joint_costs[key]
+
+        curr_cost = get_sum_of_cost([node['paths'][a] for a in agents])
+        if joint_cost is None:
+            # the pair can't be solved at all below this node; 1 is still a lower bound
+            return 1
+        return max(joint_cost - curr_cost, 0)
@@ -1,11 +1,19 @@
 import time as timer
 import heapq
 import random
-from single_agent_planner import  a_star, compute_heuristics, get_location, get_sum_of_cost
+from single_agent_planner import a_star, get_location, get_sum_of_cost
+from heuristics import compute_all_heuristics
+from path_cache import PathCache
+from collision_table import CollisionTable, BATCH_MIN_AGENTS, batch_count_collisions
+from mdd import SingleAgentPlannerMDD, inherit_mdds
+from budget import Budget
 import math
 import copy
 import numpy
 
+# generated CT nodes after which find_solution gives up unless a budget is given
+MAX_NODES = 50000
+
 '''
 # Developer's cNOTE regarding Python's mutable default arguments:
 #       The responsibiliy of preserving mutable values of passed arguments and 
@@ -44,22 +52,22 @@ def detect_collision(path1, path2, pos=None):
     return None
 
 
-def detect_collisions(paths, collisions=None):
+def detect_collisions(paths, collisions=None, collision_table=None):
     ##############################
     # Task 3.1: Return a list of first collisions between all robot pairs.
     #           A collision can be represented as dictionary that contains the id of the two robots, the vertex or edge
     #           causing the collision, and the timestep at which the collision occurred.
     #           You should use your detect_collision function to find a collision between two robots.
+    # collision_table - CollisionTable of paths (kept per CT node and updated for the replanned agents)
     if collisions is None:
         collisions = []
-    for i in range(len(paths)-1):
-        for j in range(i+1,len(paths)):
-            if detect_collision(paths[i],paths[j]) !=None:
-                position,t = detect_collision(paths[i],paths[j])
-                collisions.append({'a1':i,
-                                'a2':j,
-                                'loc':position,
-                                'timestep':t+1})
+    if collision_table is None:
+        collision_table = CollisionTable(paths)
+    for i, j, position, t in collision_table.collisions():
+        collisions.append({'a1':i,
+                        'a2':j,
+                        'loc':position,
+                        'timestep':t})
     return collisions
 
 def count_all_collisions_pair(path1, path2):
@@ -75,6 +83,8 @@ def count_all_collisions_pair(path1, path2):
     return collisions
 
 def count_all_collisions(paths):
+    if len(paths) >= BATCH_MIN_AGENTS:
+        return batch_count_collisions(paths)
     collisions = 0
     for i in range(len(paths)-1):
         for j in range(i+1,len(paths)):
@@ -214,10 +224,14 @@ def combined_constraints(constraints, new_constraints, updated_constraints=None)
 class ICBS_CB_Solver(object):
     """The high-level search of CBS."""
 
-    def __init__(self, my_map, starts, goals):
+    def __init__(self, my_map, starts, goals, heuristics=None, path_cache_size=4096, budget=None):
         """my_map   - list of lists specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        heuristics  - precomputed heuristic tables, one per goal (e.g. from a heuristic cache); computed if None
+        path_cache_size - entries of the LRU cache of low-level results (0 disables the cache)
+        budget      - time, node and memory limits of find_solution (see budget.solve); at most MAX_NODES
+                      generated nodes if None
         """
 
         self.my_map = my_map
@@ -231,9 +245,41 @@ class ICBS_CB_Solver(object):
         self.open_list = []
 
         # compute heuristics for the low-level search
-        self.heuristics = []
-        for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+        if heuristics is None:
+            heuristics = compute_all_heuristics(my_map, self.goals)
+        self.heuristics = heuristics
+        self.path_cache = PathCache(path_cache_size) if path_cache_size else None
+        self.budget = budget if budget is not None else Budget(node_limit=MAX_NODES)
+
+    def low_level(self, agent, constraints):
+        """path of agent under constraints (single_agent_planner.a_star), cached across the CT"""
+        def search():
+            path = a_star(self.my_map, self.starts[agent], self.goals[agent], self.heuristics[agent], agent, constraints)
+            return None if path is None else [path]
+
+        if self.path_cache is None:
+            paths = search()
+        else:
+            paths = self.path_cache.find_paths(search, agent, constraints)
+        return None if paths is None else paths[0]
+
+    def get_mdd(self, node, agent):
+        """MDD of agent for the cost of its path in node; kept in the node, its children inherit it"""
+        cost = len(node['paths'][agent]) - 1
+        mdd = node['mdds'].get(agent)
+        if mdd is None or mdd.cost != cost:
+            mdd = SingleAgentPlannerMDD(self.my_map, self.starts[agent], self.goals[agent], self.heuristics[agent],
+                                        node['constraints'], agent, cost)
+            node['mdds'][agent] = mdd
+        return mdd
+
+    def cost_increases(self, p, agent, constraint):
+        """whether the path of agent in node p gets longer (or doesn't exist) under the negative constraint"""
+        mdd = self.get_mdd(p, agent)
+        if mdd.decides(constraint):
+            return mdd.blocked_by(constraint)
+        alt_path = self.low_level(agent, combined_constraints(p['constraints'], constraint))
+        return not alt_path or len(alt_path) > len(p['paths'][agent])
 
     def push_node(self, node):
         heapq.heappush(self.open_list, (node['cost'], len(node['collisions']), self.num_of_generated, node))
@@ -254,6 +300,7 @@ class ICBS_CB_Solver(object):
         """
 
         self.start_time = timer.time()
+        self.budget.start()
         
         if disjoint:
             splitter = disjoint_splitting
@@ -269,16 +316,18 @@ class ICBS_CB_Solver(object):
         root = {'cost': 0,
                 'constraints': [],
                 'paths': [],
-                'collisions': []}
+                'collisions': [],
+                'collision_table': None,
+                'mdds': dict()} # agent -> MDD of its path, built when needed
         for i in range(self.num_of_agents):  # Find initial path for each agent
-            path = a_star(self.my_map, self.starts[i], self.goals[i], self.heuristics[i],
-                          i, root['constraints'])
+            path = self.low_level(i, root['constraints'])
             if path is None:
                 raise BaseException('No solutions')
             root['paths'].append(path)
 
         root['cost'] = get_sum_of_cost(root['paths'])
-        root['collisions'] = detect_collisions(root['paths'])
+        root['collision_table'] = CollisionTable(root['paths'])
+        root['collisions'] = detect_collisions(root['paths'], collision_table=root['collision_table'])
         self.push_node(root)
 
         # # Task 3.1: Testing
@@ -304,6 +353,7 @@ class ICBS_CB_Solver(object):
         # as 'non-cardinal' or 'semi-cardinal' or 'cardinal'
 
         # method a: use standard splitting to detect a 'cardinal collision'
+        #   a constraint raises the cost of an agent iff all paths in its MDD violate it (see cost_increases)
         def detect_cardinal_conflict(self, p, collision):
             cardinality = 'non-cardinal'
 
@@ -314,22 +364,14 @@ class ICBS_CB_Solver(object):
             for nc in temp_constraints:
                 print(nc)
 
-            for c in p['constraints']:
-                if c not in temp_constraints:
-                    temp_constraints.append(c)
-                        
             a1 = collision['a1'] #agent a1
-            alt_path1 = a_star(self.my_map,self.starts[a1], self.goals[a1],self.heuristics[a1],a1,temp_constraints)
-            print(alt_path1)
-            if not alt_path1 or len(alt_path1) > len(p['paths'][a1]):
+            if self.cost_increases(p, a1, temp_constraints[0]):
                 cardinality = 'semi-cardinal'
                 
                 print('alt_path1 takes longer or is empty. at least semi-cardinal.')
                 
             a2 = collision['a2'] #agent a2
-            alt_path2 = a_star(self.my_map,self.starts[a2], self.goals[a2],self.heuristics[a2],a2,temp_constraints)
-            print(alt_path2)
-            if not alt_path2 or len(alt_path2) > len(p['paths'][a2]):
+            if self.cost_increases(p, a2, temp_constraints[1]):
                 if cardinality == 'semi-cardinal':
                     cardinality = 'cardinal'
                     
@@ -373,7 +415,7 @@ class ICBS_CB_Solver(object):
                 ###########
                 # Find cardinality for positive constraint
                 # search for path for agent with positive constraint
-                alt_path_chosen = a_star(self.my_map,self.starts[chosen_agent],self.goals[chosen_agent],self.heuristics[chosen_agent],chosen_agent,all_constraints_pos)
+                alt_path_chosen = self.low_level(chosen_agent, all_constraints_pos)
                 
                 # constraint can be met by chosen agent (must traverse conflict location/edge)                
                 assert alt_path_chosen and len(alt_path_chosen) == len(p['paths'][chosen_agent]) # if the collision occured, path which caused it likely exists
@@ -390,7 +432,7 @@ class ICBS_CB_Solver(object):
 
                 
                 for v in alt_path_vols:
-                    path_v = a_star(self.my_map,self.starts[v], self.goals[v],self.heuristics[v],v,all_constraints_pos)
+                    path_v = self.low_level(v, all_constraints_pos)
                     if path_v  is None :
                         path_failed = True
                         break
@@ -417,7 +459,7 @@ class ICBS_CB_Solver(object):
 
                 # negative constraint
                 print('neg constraint ', new_constraints[1])
-                alt_path_chosen = a_star(self.my_map,self.starts[chosen_agent], self.goals[chosen_agent],self.heuristics[chosen_agent],chosen_agent,all_constraints_neg)
+                alt_path_chosen = self.low_level(chosen_agent, all_constraints_neg)
                 # new_paths = copy.deepcopy(p['paths'])
                 # new_paths[chosen_agent] = copy.deepcopy(alt_path_chosen)
 
@@ -449,8 +491,7 @@ class ICBS_CB_Solver(object):
 
         # normal CBS with disjoint and standard splitting
         while len(self.open_list) > 0:
-            if self.num_of_generated > 50000:
-                print('reached maximum number of nodes. Returning...')
+            if self.budget.exceeded(self.num_of_generated):
                 return None
             print('\n')
             p = self.pop_node()
@@ -535,7 +576,9 @@ class ICBS_CB_Solver(object):
                 q = {'cost':0,
                     'constraints': [constraint],
                     'paths':[],
-                    'collisions':[]
+                    'collisions':[],
+                    'collision_table': None,
+                    'mdds': inherit_mdds(p['mdds'], constraint)
                 }
                 for c in p['constraints']:
                     if c not in q['constraints']:
@@ -544,7 +587,9 @@ class ICBS_CB_Solver(object):
                     q['paths'].append(pa)
                 
                 ai = constraint['agent']
-                path = a_star(self.my_map,self.starts[ai], self.goals[ai],self.heuristics[ai],ai,q['constraints'])
+                # a bypass keeps the cost, which ai can't if every path in its MDD violates the constraint
+                keeps_cost = constraint['positive'] or not self.cost_increases(p, ai, constraint)
+                path = self.low_level(ai, q['constraints'])
                 
                 if path is not None:
                     q['paths'][ai]= path
@@ -553,7 +598,7 @@ class ICBS_CB_Solver(object):
                     if constraint['positive']:
                         vol = paths_violate_constraint(constraint,q['paths'])
                         for v in vol:
-                            path_v = a_star(self.my_map,self.starts[v], self.goals[v],self.heuristics[v],v,q['constraints'])
+                            path_v = self.low_level(v, q['constraints'])
                             if path_v  is None:
                                 continue_flag = True
                             else:
@@ -561,7 +606,9 @@ class ICBS_CB_Solver(object):
                         if continue_flag:
                             continue
                     
-                    q['collisions'] = detect_collisions(q['paths'])
+                    # only the pairs of the replanned agents are checked again
+                    q['collision_table'] = p['collision_table'].update(q['paths'])
+                    q['collisions'] = detect_collisions(q['paths'], collision_table=q['collision_table'])
                     q['cost'] = get_sum_of_cost(q['paths'])
                     # CHECK BYPASS HERE.......
                     #     if q['cost'] == p['cost'] \
@@ -569,18 +616,18 @@ class ICBS_CB_Solver(object):
 
                     # if bypass is found, push only the current child and exit loop
 
-                    # assert that bypass is not possible if cardinal
-                    if collision_type == 'cardinal':
+                    # assert that bypass is not possible if cardinal (for both agents) or ai's cost goes up
+                    if collision_type == 'cardinal' or not keeps_cost:
                         assert bypass_found(p['cost'], q['cost'], len(p['collisions']), len(q['collisions'])) == False
 
-                    if collision_type != 'cardinal' \
+                    if collision_type != 'cardinal' and keeps_cost \
                             and bypass_found(p['cost'], q['cost'], len(p['collisions']), len(q['collisions'])):
                         print('bypass found')
                         self.push_node(q)
                         
                         bypass_successful = True
                         break
-                    child_nodes.append(copy.deepcopy(q))
+                    child_nodes.append(q) # q shares its collision table with p, no deepcopy
 
             if bypass_successful:
                 continue # start of while loop
@@ -607,6 +654,8 @@ class ICBS_CB_Solver(object):
 
         print("Expanded nodes:  {}".format(self.num_of_expanded))
         print("Generated nodes: {}".format(self.num_of_generated))
+        if self.path_cache is not None:
+            print("Path cache:      {} hits, {} misses".format(self.path_cache.hits, self.path_cache.misses))
 
         print("Solution:")
         for i in range(len(node['paths'])):
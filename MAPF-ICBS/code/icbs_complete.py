@@ -4,12 +4,20 @@ import random
 # from single_agent_planner import compute_heuristics, a_star, get_location
 # from multi_agent_planner import ll_solver, get_sum_of_cost, compute_heuristics, get_location
 
-from a_star_class import A_Star, get_sum_of_cost, compute_heuristics, get_location
-
-import copy
+from a_star_class import A_Star, OD_A_Star, get_sum_of_cost, get_location
+from incremental_search import IncrementalSearches
+from path_cache import PathCache
+from collision_table import CollisionTable, BATCH_MIN_AGENTS, batch_count_collisions
+from heuristics import compute_all_heuristics
+from hl_heuristics import HighLevelHeuristic
+from mdd import MDD, inherit_mdds
+from budget import Budget
 
 import numpy
 
+# generated CT nodes after which find_solution gives up unless a budget is given
+MAX_NODES = 50000
+
 '''
    ## Reference to class
 '''
@@ -22,22 +30,74 @@ import numpy
 #       PEP 505 - None-aware operators: https://www.python.org/dev/peps/pep-0505/#syntax-and-semantics
 '''
 
-def generate_child(constraints, paths, agent_collisions, ma_list):
+class ConstraintChain(object):
+    """Immutable constraints of a CT node: the constraints added at the node linked to its parent's chain.
+
+    Children share the constraints of their ancestors instead of copying them, so a child only stores
+    what its split added. Iterates newest first, the same order combined_constraints used to build.
+    """
+
+    __slots__ = ('constraints', 'parent', 'size')
+
+    def __init__(self, constraints=(), parent=None):
+        self.constraints = tuple(constraints)
+        self.parent = parent
+        self.size = len(self.constraints) + (len(parent) if parent is not None else 0)
+
+    def __iter__(self):
+        chain = self
+        while chain is not None:
+            yield from chain.constraints
+            chain = chain.parent
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return repr(list(self))
 
-    assert isinstance(ma_list , list)
+    def extend(self, new_constraints):
+        """chain with the new constraints that aren't in this one yet"""
+        added = []
+        for c in new_constraints:
+            if c not in added and c not in self:
+                added.append(c)
+        return ConstraintChain(added, self)
 
-    collisions = detect_collisions(paths, ma_list)
+
+def generate_child(constraints, paths, agent_collisions, ma_list, collision_table, mdds):
+    """CT node sharing everything with its parent that it doesn't replace.
+
+    constraints     - ConstraintChain of the node
+    paths           - copied shallowly; replanned agents get new path lists, the others keep the parent's
+    agent_collisions - shared with the parent until one of them counts a collision (copy on write)
+    ma_list         - tuple of frozensets, never modified
+    collision_table - CollisionTable of the parent, updated for the agents whose paths differ
+    mdds            - MDDs of the parent that still hold for the child (see inherit_mdds)
+    """
+
+    assert isinstance(ma_list , tuple)
+
+    collision_table = collision_table.update(paths)
+    collisions = detect_collisions(paths, ma_list, collision_table=collision_table)
     cost = get_sum_of_cost(paths)
     child_node = {
         'cost':cost,
-        'constraints': copy.deepcopy(constraints),
-        'paths': copy.deepcopy(paths), # {0: {'path':[..path...]}, ... , n: {'path':[..path...]} # not sure if other keys are needed
+        'constraints': constraints,
+        'paths': list(paths), # [path of agent 0, ..., path of agent n]
         'ma_collisions': collisions,
-        'agent_collisions':copy.deepcopy(agent_collisions), # matrix of collisions in history between pairs of simple agents
-        'ma_list': copy.deepcopy(ma_list) # [{a1,a2}, ... ]
+        'agent_collisions':agent_collisions, # matrix of collisions in history between pairs of simple agents
+        'ma_list': ma_list, # (frozenset({a1,a2}), ... )
+        'collision_table': collision_table, # first collision of every pair of simple agents
+        'mdds': mdds # simple agent -> MDD of its path, built when needed
     }
     return child_node
 
+def count_agent_collision(node, a1, a2):
+    """count a collision of a1 < a2 in the history of node; the matrix may be shared with other nodes"""
+    node['agent_collisions'] = node['agent_collisions'].copy()
+    node['agent_collisions'][a1][a2] += 1
+
 def detect_collision(path1, path2, pos=None):
     ##############################
     # Task 3.1: Return the first collision that occurs between two robot paths (or None if there is no collision)
@@ -68,32 +128,36 @@ def detect_collision(path1, path2, pos=None):
     return None
 
 
-def detect_collisions(paths, ma_list, collisions=None):
+def detect_collisions(paths, ma_list, collisions=None, collision_table=None):
     ##############################
     # Task 3.1: Return a list of first collisions between all robot pairs.
     #           A collision can be represented as dictionary that contains the id of the two robots, the vertex or edge
     #           causing the collision, and the timestep at which the collision occurred.
     #           You should use your detect_collision function to find a collision between two robots.
+    # collision_table - CollisionTable of paths (kept per CT node and updated for the replanned agents)
 
     if collisions is None:
         collisions = []
-    for ai in range(len(paths)-1):
-        for aj in range(ai+1,len(paths)):
-            if detect_collision(paths[ai],paths[aj]) !=None:
-                position,t = detect_collision(paths[ai],paths[aj])
-
-                # find meta-agents of agents in collision 
-                assert isinstance(ma_list , list)
-                ma_i = get_ma_of_agent(ai, ma_list)
-                assert isinstance(ma_list , list)
-                ma_j = get_ma_of_agent(aj, ma_list)
-
-                # check if internal collision in the same meta-agent
-                if ma_i != ma_j:
-                    collisions.append({'a1':ai, 'ma1':ma_i,
-                                    'a2':aj, 'ma2':ma_j,
-                                    'loc':position,
-                                    'timestep':t+1})
+    if collision_table is None:
+        collision_table = CollisionTable(paths)
+    # with a k-robust table, a collision has an 'end': both agents are at loc within [timestep, end]
+    for ai, aj, position, t in collision_table.collisions():
+
+        # find meta-agents of agents in collision 
+        assert isinstance(ma_list , tuple)
+        ma_i = get_ma_of_agent(ai, ma_list)
+        assert isinstance(ma_list , tuple)
+        ma_j = get_ma_of_agent(aj, ma_list)
+
+        # check if internal collision in the same meta-agent
+        if ma_i != ma_j:
+            collision = {'a1':ai, 'ma1':ma_i,
+                         'a2':aj, 'ma2':ma_j,
+                         'loc':position,
+                         'timestep':t}
+            if collision_table.k:
+                collision['end'] = t + collision_table.k
+            collisions.append(collision)
     return collisions
 
 def count_all_collisions_pair(path1, path2):
@@ -109,6 +173,8 @@ def count_all_collisions_pair(path1, path2):
     return collisions
 
 def count_all_collisions(paths):
+    if len(paths) >= BATCH_MIN_AGENTS:
+        return batch_count_collisions(paths)
     collisions = 0
     for i in range(len(paths)-1):
         for j in range(i+1,len(paths)):
@@ -144,6 +210,10 @@ def standard_splitting(collision, constraints=None):
                             'timestep':collision['timestep'],
                             'positive':False
                             })
+        if 'end' in collision:
+            # k-delay collision: each child keeps its agent off loc for the whole range (range constraint)
+            for constraint in constraints[-2:]:
+                constraint['end'] = collision['end']
     else:
         constraints.append({'agent':collision['a1'],
                             'meta_agent': collision['ma1'],
@@ -172,6 +242,9 @@ def disjoint_splitting(collision, constraints=None):
     #                          specified timestep, and the second constraint prevents the same agent to traverse the
     #                          specified edge at the specified timestep
     #           Choose the agent randomly
+    if 'end' in collision:
+        # a k-delay collision has no single timestep to enforce; range constraints on both agents
+        return standard_splitting(collision, constraints)
     if constraints is None:
         constraints = []
 
@@ -227,7 +300,7 @@ def disjoint_splitting(collision, constraints=None):
 # do NOT use for constraints, use key 'meta-agent' in constraint
 def get_ma_of_agent(agent, ma_list):
 
-    assert isinstance(ma_list , list)
+    assert isinstance(ma_list , tuple)
     for ma in ma_list:
         # print(ma, ma_list)
         if agent in ma:
@@ -286,18 +359,16 @@ def paths_violate_constraint(constraint, paths, rst=None):
 def combined_constraints(constraints, new_constraints, updated_constraints=None):
     assert updated_constraints is None
 
-    if isinstance(new_constraints, list):
-        updated_constraints = copy.deepcopy(new_constraints)
-    else:
-        updated_constraints = [new_constraints]
+    if not isinstance(new_constraints, list):
+        new_constraints = [new_constraints]
+    if not isinstance(constraints, ConstraintChain):
+        constraints = ConstraintChain(constraints)
 
     # print('combining constraints:')
     # print('const1: ', constraints)
-    # print('const2: ', updated_constraints)
+    # print('const2: ', new_constraints)
 
-    for c in constraints:
-        if c not in updated_constraints:
-            updated_constraints.append(c)
+    updated_constraints = constraints.extend(new_constraints)
 
     assert len(updated_constraints) <= len(constraints) + len(new_constraints)
     return updated_constraints
@@ -316,7 +387,7 @@ def should_merge(collision, p, N=0):
     if a1 > a2:
         a1, a2 = a2, a1
     assert a1 < a2
-    p['agent_collisions'][a1][a2] += 1
+    count_agent_collision(p, a1, a2)
 
     if p['agent_collisions'][a1][a2] > N:
         return True
@@ -334,10 +405,24 @@ def should_merge(collision, p, N=0):
 class ICBS_Solver(object):
     """The high-level search of CBS."""
 
-    def __init__(self, my_map, starts, goals):
+    def __init__(self, my_map, starts, goals, heuristics=None, operator_decomposition=False, llsolver=A_Star,
+                 incremental=False, path_cache_size=4096, hl_heuristic='none', budget=None, k=0):
         """my_map   - list of lists specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        heuristics  - precomputed heuristic tables, one per goal (e.g. from a heuristic cache); computed if None
+        operator_decomposition - plan merged meta-agents with operator decomposition (OD_A_Star)
+                      instead of enumerating every joint move; overrides llsolver
+        llsolver    - low-level solver class with the A_Star interface (A_Star, PEA_Star, EPEA_Star, ...)
+        incremental - continue the parent CT node's low-level search of a replanned meta-agent instead of
+                      starting over (see IncrementalSearches)
+        path_cache_size - entries of the LRU cache of low-level results (0 disables the cache)
+        hl_heuristic - admissible heuristic added to the cost of CT nodes: 'none', 'cg' (conflict graph),
+                      'dg' (dependency graph) or 'wdg' (weighted dependency graph), see HighLevelHeuristic
+        budget      - time, node and memory limits of find_solution (see budget.solve); at most MAX_NODES
+                      generated nodes if None
+        k           - k-robustness: no agent enters a location another agent was at or will be at within k
+                      timesteps; meta-agents are planned without it, so agents are never merged if k > 0
         """
 
         self.my_map = my_map
@@ -351,13 +436,24 @@ class ICBS_Solver(object):
         self.open_list = []
 
         # compute heuristics for the low-level search
-        self.heuristics = []
-        for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+        if heuristics is None:
+            heuristics = compute_all_heuristics(my_map, self.goals)
+        self.heuristics = heuristics
+        self.operator_decomposition = operator_decomposition
+        self.llsolver = llsolver
+        self.incremental = IncrementalSearches() if incremental else None
+        self.path_cache = PathCache(path_cache_size) if path_cache_size else None
+        self.hl_heuristic = HighLevelHeuristic(hl_heuristic)
+        self.budget = budget if budget is not None else Budget(node_limit=MAX_NODES)
+        self.k = k
+
+    def get_llsolver(self):
+        return OD_A_Star if self.operator_decomposition else self.llsolver
 
     def push_node(self, node):
-        heapq.heappush(self.open_list, (node['cost'], len(node['ma_collisions']), self.num_of_generated, node))
-        print("> Generate node {} with cost {}".format(self.num_of_generated, node['cost']))
+        node['h'] = self.hl_heuristic.compute(self, self.get_llsolver(), node)
+        heapq.heappush(self.open_list, (node['cost'] + node['h'], len(node['ma_collisions']), self.num_of_generated, node))
+        print("> Generate node {} with cost {} (h = {})".format(self.num_of_generated, node['cost'], node['h']))
         self.num_of_generated += 1
         
 
@@ -367,51 +463,79 @@ class ICBS_Solver(object):
         self.num_of_expanded += 1
         return node
 
+    def low_level(self, AStar, ma, constraints, paths=None):
+        """paths of meta-agent ma (a list) under constraints; paths are the current paths (of the parent CT node)"""
+        if self.path_cache is not None:
+            # the same meta-agent is often replanned under the same constraints in other branches
+            return self.path_cache.find_paths(
+                lambda: self.search_paths(AStar, ma, constraints, paths), ma, constraints)
+        return self.search_paths(AStar, ma, constraints, paths)
+
+    def search_paths(self, AStar, ma, constraints, paths=None):
+        if self.incremental is None:
+            astar = AStar(self.my_map, self.starts, self.goals, self.heuristics, ma, constraints)
+            return astar.find_paths()
+        curr_paths = [paths[a] for a in ma] if paths else None
+        return self.incremental.find_paths(AStar, self.my_map, self.starts, self.goals, self.heuristics,
+                                           ma, constraints, curr_paths)
+
     def empty_tree(self):
         self.open_list.clear()
 
-    # algorithm for detecting cardinality
-    # as 'non-cardinal' or 'semi-cardinal' or 'cardinal'
-    # using standard splitting
-    def detect_cardinal_conflict(self, AStar, p, collision):
-        cardinality = 'non-cardinal'
-
-        # temporary constraints (standard splitting) for detecting cardinal collision purposes
-        temp_constraints = standard_splitting(collision)
-
-
-        ma1 = collision['ma1'] #agent a1
-
-        # print('Sending ma1 in collision {} to A* '.format(ma1))
-
-        assert temp_constraints[0]['meta_agent'] == ma1
-        path1_constraints = combined_constraints(p['constraints'], temp_constraints[0])
-        astar_ma1 = AStar(self.my_map,self.starts, self.goals,self.heuristics,list(ma1),path1_constraints)
-        alt_paths1 = astar_ma1.find_paths()
+    def get_mdd(self, node, agent):
+        """MDD of simple agent for the cost of its path in node; kept in the node, its children inherit it"""
+        cost = len(node['paths'][agent]) - 1
+        mdd = node['mdds'].get(agent)
+        if mdd is None or mdd.cost != cost:
+            mdd = MDD(self.my_map, self.starts[agent], self.goals[agent], self.heuristics[agent],
+                      node['constraints'], agent, cost)
+            node['mdds'][agent] = mdd
+        return mdd
+
+    def cost_increases(self, AStar, p, ma, constraint):
+        """whether the optimal paths of meta-agent ma in node p cost more (or don't exist) under constraint"""
+        if len(ma) == 1:
+            # the MDD of a simple agent answers it without a search
+            return self.get_mdd(p, constraint['agent']).blocked_by(constraint)
+
+        path_constraints = combined_constraints(p['constraints'], constraint)
+        alt_paths = self.low_level(AStar, list(ma), path_constraints, p['paths'])
 
         # get current paths of meta-agent
         curr_paths = []
-        for a1 in ma1:
+        for a in ma:
 
-            not_nested_list = p['paths'][a1]
+            not_nested_list = p['paths'][a]
             assert any(isinstance(i, list) for i in not_nested_list) == False
 
 
-            curr_paths.append(p['paths'][a1])
-
-        # print(curr_paths)
-        # print(alt_paths1)
+            curr_paths.append(p['paths'][a])
 
         # get costs for the meta agent
         curr_cost = get_sum_of_cost(curr_paths)
-        
+
         alt_cost = 0 # write inline if later
-        if alt_paths1:
-            alt_cost = get_sum_of_cost(alt_paths1)
+        if alt_paths:
+            alt_cost = get_sum_of_cost(alt_paths)
 
         # print('\t oldcost:{} newcost:{}'.format(curr_cost, alt_cost))
 
-        if not alt_paths1 or alt_cost > curr_cost:
+        return not alt_paths or alt_cost > curr_cost
+
+    # algorithm for detecting cardinality
+    # as 'non-cardinal' or 'semi-cardinal' or 'cardinal'
+    # using standard splitting
+    def detect_cardinal_conflict(self, AStar, p, collision):
+        cardinality = 'non-cardinal'
+
+        # temporary constraints (standard splitting) for detecting cardinal collision purposes
+        temp_constraints = standard_splitting(collision)
+
+
+        ma1 = collision['ma1'] #agent a1
+
+        assert temp_constraints[0]['meta_agent'] == ma1
+        if self.cost_increases(AStar, p, ma1, temp_constraints[0]):
             cardinality = 'semi-cardinal'
             
             print('alt_path1 takes longer or is empty. at least semi-cardinal.')
@@ -419,34 +543,8 @@ class ICBS_Solver(object):
             
         ma2 = collision['ma2'] #agent a2
 
-        # print('Sending ma2 in collision {} to A* '.format(ma2))
-
         assert temp_constraints[1]['meta_agent'] == ma2
-        path2_constraints = combined_constraints(p['constraints'], temp_constraints[1])
-        astar_ma2 = AStar(self.my_map,self.starts, self.goals,self.heuristics,list(ma2),path2_constraints)
-        alt_paths2 = astar_ma2.find_paths()
-
-        # if not alt_path2 or bigger:
-        curr_paths = []
-        for a2 in ma2:    
-            not_nested_list = p['paths'][a2]
-            assert any(isinstance(i, list) for i in not_nested_list) == False
-
-            curr_paths.append(p['paths'][a2])
-            
-        # print(curr_paths)
-        # print(alt_paths2)
-
-        # get costs for the meta agent
-        curr_cost = get_sum_of_cost(curr_paths)
-        
-        alt_cost = 0 # write inline if later
-        if alt_paths2:
-            alt_cost = get_sum_of_cost(alt_paths2)
-
-        # print('\t oldcost:{} newcost:{}'.format(curr_cost, alt_cost))
-
-        if not alt_paths2 or alt_cost > curr_cost:
+        if self.cost_increases(AStar, p, ma2, temp_constraints[1]):
             # cardinality = 'semi-cardinal'
             if cardinality == 'semi-cardinal':
                 cardinality = 'cardinal'
@@ -472,15 +570,13 @@ class ICBS_Solver(object):
         ma1 = collision['ma1']
         ma2 = collision['ma2']
 
-        meta_agent = set.union(ma1, ma2)
+        meta_agent = ma1 | ma2
 
         print('new merged meta_agent ', meta_agent)
 
         assert meta_agent not in ma_list
 
-        ma_list.remove(ma1)
-        ma_list.remove(ma2)
-        ma_list.append(meta_agent)
+        ma_list = tuple(ma for ma in ma_list if ma != ma1 and ma != ma2) + (meta_agent,)
 
         return meta_agent, ma_list
 
@@ -492,13 +588,14 @@ class ICBS_Solver(object):
         """
 
         self.start_time = timer.time()
+        self.budget.start()
         
         if disjoint:
             splitter = disjoint_splitting
         else:
             splitter = standard_splitting
 
-        AStar = A_Star
+        AStar = self.get_llsolver()
 
         # Generate the root node
         # constraints   - list of constraints
@@ -507,27 +604,29 @@ class ICBS_Solver(object):
         # collisions     - list of collisions in paths
         root = {
             'cost':0,
-            'constraints': [],
+            'constraints': ConstraintChain(),
             'paths': [],
             'ma_collisions': [],
             'agent_collisions': None, # matrix of collisions in history between pairs of (meta-)agents
-            'ma_list': [] # [{a1,a2}, ... ]
+            'ma_list': (), # (frozenset({a1,a2}), ... )
+            'collision_table': None, # first collision of every pair of simple agents
+            'mdds': dict() # simple agent -> MDD of its path, built when needed
         }       
         
         for i in range(self.num_of_agents):  # Find initial path for each agent
-            astar = AStar(self.my_map, self.starts, self.goals, self.heuristics, [i], root['constraints'])
-            path = astar.find_paths()
+            path = self.low_level(AStar, [i], root['constraints'])
 
 
             if path is None:
                 raise BaseException('No solutions')
-            root['ma_list'].append({i})
+            root['ma_list'] += (frozenset({i}),)
             root['paths'].extend(path)
 
 
 
         root['cost'] = get_sum_of_cost(root['paths'])
-        root['ma_collisions'] = detect_collisions(root['paths'], root['ma_list'])
+        root['collision_table'] = CollisionTable(root['paths'], k=self.k)
+        root['ma_collisions'] = detect_collisions(root['paths'], root['ma_list'], collision_table=root['collision_table'])
         root['agent_collisions'] = numpy.zeros((self.num_of_agents, self.num_of_agents))
         self.push_node(root)
 
@@ -536,8 +635,7 @@ class ICBS_Solver(object):
         # ATTENTION: THE CBS LOOOOOOOOOOOOP ============@#￥#%#@￥@#%##@￥======  STARTS ---#￥%------   HERE  ---- @
         # normal CBS with disjoint and standard splitting
         while len(self.open_list) > 0:
-            if self.num_of_generated > 50000:
-                print('reached maximum number of nodes. Returning...')
+            if self.budget.exceeded(self.num_of_generated):
                 return None 
             print('\n')  
             p = self.pop_node()
@@ -598,7 +696,7 @@ class ICBS_Solver(object):
             if chosen_a1 > chosen_a2:
                 # swap to only fill half of the matrix
                 chosen_a1, chosen_a2 = chosen_a2, chosen_a1
-            p['agent_collisions'][chosen_a1][chosen_a2] += 1
+            count_agent_collision(p, chosen_a1, chosen_a2)
 
 
             new_constraints = splitter(chosen_collision)
@@ -617,11 +715,12 @@ class ICBS_Solver(object):
                 print(constraint)
                 
                 updated_constraints = combined_constraints(p['constraints'], constraint)
-                q = generate_child(updated_constraints, p['paths'], p['agent_collisions'], p['ma_list'])
+                q = generate_child(updated_constraints, p['paths'], p['agent_collisions'], p['ma_list'],
+                                   p['collision_table'], inherit_mdds(p['mdds'], constraint))
 
 
-                assert isinstance(p['ma_list'] , list)
-                assert isinstance(q['ma_list'] , list)
+                assert isinstance(p['ma_list'] , tuple)
+                assert isinstance(q['ma_list'] , tuple)
 
                 ma = constraint['meta_agent']
 
@@ -631,8 +730,7 @@ class ICBS_Solver(object):
                 for a in ma:
                     print (q['paths'][a])
 
-                astar = AStar(self.my_map,self.starts, self.goals,self.heuristics,list(ma),q['constraints'])
-                paths = astar.find_paths()
+                paths = self.low_level(AStar, list(ma), q['constraints'], p['paths'])
 
                 if paths is not None:
                     
@@ -662,8 +760,7 @@ class ICBS_Solver(object):
 
 
                             v_ma_list = list(v_ma) # should use same list for all uses
-                            astar_v_ma = AStar(self.my_map,self.starts,self.goals,self.heuristics,v_ma_list,q['constraints'])
-                            paths_v_ma = astar_v_ma.find_paths()
+                            paths_v_ma = self.low_level(AStar, v_ma_list, q['constraints'], q['paths'])
 
 
 
@@ -691,7 +788,9 @@ class ICBS_Solver(object):
                         if no_solution:
                             continue # move on to the next constraint
 
-                    q['ma_collisions'] = detect_collisions(q['paths'],q['ma_list'])
+                    # only the pairs of the replanned agents are checked again
+                    q['collision_table'] = q['collision_table'].update(q['paths'])
+                    q['ma_collisions'] = detect_collisions(q['paths'],q['ma_list'], collision_table=q['collision_table'])
 
                     if chosen_collision in q['ma_collisions']:
                         print(q['paths'])
@@ -716,25 +815,25 @@ class ICBS_Solver(object):
                         bypass_successful = True
                         break # break out of constraint loop
                     assert not bypass_successful
-                    child_nodes.append(copy.deepcopy(q))
+                    child_nodes.append(q)
 
             if bypass_successful:
                 continue # start of while loop
 
             assert not bypass_successful
 
-            # MA-CBS
-            if should_merge(collision, p, 7):
+            # MA-CBS (the joint search of a meta-agent only avoids collisions at the same timestep)
+            if should_merge(collision, p, 7) and self.k == 0:
                 print('> Merge meta-agents into a new')
                 # returns meta_agent, ma_list
                 meta_agent, updated_ma_list = self.merge_agents(collision, p['ma_list'])
 
 
                 # updated constraints
-                updated_constraints = copy.deepcopy(p['constraints'])
-                for c in updated_constraints:
-                    if c['meta_agent'].issubset(meta_agent):
-                        c['meta_agent'] = meta_agent
+                # constraints of the merged meta-agents are copied, the parent's constraints stay as they are
+                updated_constraints = ConstraintChain(
+                    dict(c, meta_agent=meta_agent) if c['meta_agent'].issubset(meta_agent) else c
+                    for c in p['constraints'])
 
                 print('Sending newly merged meta_agent {} to A* '.format(meta_agent))
                 print('\twith constraints ', updated_constraints)
@@ -744,8 +843,7 @@ class ICBS_Solver(object):
 
 
                 # Update paths
-                ma_astar = AStar(self.my_map,self.starts, self.goals,self.heuristics,list(meta_agent), updated_constraints)
-                ma_paths = ma_astar.find_paths()
+                ma_paths = self.low_level(AStar, list(meta_agent), updated_constraints)
 
 
                 # if can be 
@@ -754,7 +852,7 @@ class ICBS_Solver(object):
                     for i in range(len(meta_agent)):
                         print (ma_paths[i])
                                         
-                    updated_paths = copy.deepcopy(p['paths'])
+                    updated_paths = list(p['paths'])
 
                     for i, agent in enumerate(meta_agent):
                         
@@ -772,7 +870,9 @@ class ICBS_Solver(object):
                     #     print (updated_paths[a])
 
                     # Update collisions, cost
-                    updated_node = generate_child(updated_constraints, updated_paths, p['agent_collisions'], updated_ma_list) 
+                    # the constraints of each simple agent stay the same, so do their MDDs
+                    updated_node = generate_child(updated_constraints, updated_paths, p['agent_collisions'], updated_ma_list,
+                                                  p['collision_table'], dict(p['mdds'])) 
 
 
                     # print('agents {}, {} merged into agent {}'.format(collision['a1'], a2, meta_agent))
@@ -809,6 +909,10 @@ class ICBS_Solver(object):
 
         print("Expanded nodes:  {}".format(self.num_of_expanded))
         print("Generated nodes: {}".format(self.num_of_generated))
+        if self.path_cache is not None:
+            print("Path cache:      {} hits, {} misses".format(self.path_cache.hits, self.path_cache.misses))
+        if self.hl_heuristic.name != 'none':
+            print("HL heuristic:    {}".format(self.hl_heuristic.name))
 
 
         print("Solution:")
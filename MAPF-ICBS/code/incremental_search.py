@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+def search_key(agents, paths):
+    if not isinstance(agents, list):
+        agents = [agents]
+    return frozenset(agents), tuple(tuple(tuple(loc) for loc in path) for path in paths)
+
+
+class IncrementalSearches(object):
+    """Finished low-level searches of a high-level search, by (meta-)agent and the paths they returned.
+
+    A CT child only adds constraints to its parent, so the search that produced the parent's path
+    of the replanned agent can usually be continued (A_Star.resume) instead of restarting at t=0.
+    Searches are looked up by the current paths of the agents; resume() itself checks that the
+    new constraints extend the ones of the stored search and falls back to a new search otherwise.
+    A search keeps its open and closed lists, so only the maxsize most recently used ones are kept
+    (bounded LRU, like PathCache); an evicted one is simply started over.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self.searches = OrderedDict() # (agents, paths) -> finished low-level search
+        self.resumed = 0
+        self.restarted = 0
+
+    def find_paths(self, AStar, my_map, starts, goals, heuristics, agents, constraints, curr_paths=None, cat=None):
+        """curr_paths  - current paths of agents (in the order of agents), None if there are none yet"""
+        astar = None
+        if curr_paths is not None:
+            key = search_key(agents, curr_paths)
+            search = self.searches.get(key)
+            if search is not None:
+                self.searches.move_to_end(key)
+                astar = search.resume(constraints, cat)
+        if astar is None:
+            astar = AStar(my_map, starts, goals, heuristics, agents, constraints, cat)
+            self.restarted += 1
+        else:
+            self.resumed += 1
+
+        paths = astar.find_paths()
+        if paths is not None:
+            key = search_key(agents, paths)
+            self.searches[key] = astar
+            self.searches.move_to_end(key)
+            while len(self.searches) > self.maxsize:
+                self.searches.popitem(last=False)
+        return paths
+
+    def clear(self):
+        self.searches.clear()
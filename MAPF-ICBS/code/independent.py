@@ -1,5 +1,6 @@
 import time as timer
-from single_agent_planner import compute_heuristics, a_star, get_sum_of_cost
+from single_agent_planner import a_star, get_sum_of_cost
+from heuristics import compute_all_heuristics
 
 
 class IndependentSolver(object):
@@ -19,9 +20,7 @@ class IndependentSolver(object):
         self.CPU_time = 0
 
         # compute heuristics for the low-level search
-        self.heuristics = []
-        for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+        self.heuristics = compute_all_heuristics(my_map, self.goals)
 
     def find_solution(self):
         """ Finds paths for all agents from their start locations to their goal locations."""
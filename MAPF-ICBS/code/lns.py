@@ -0,0 +1,206 @@
+import random
+import time as timer
+
+from prioritized import Reservations, space_time_a_star
+from single_agent_planner import get_sum_of_cost, move
+from heuristics import compute_all_heuristics
+
+NEIGHBORHOODS = ('random', 'agent', 'intersection')
+
+# weight of the last improvement in the adaptive choice of the neighborhood
+REACTION_FACTOR = 0.01
+
+
+class LNS(object):
+    """Large neighborhood search (MAPF-LNS) that improves the sum of costs of a collision-free solution.
+
+    Each iteration removes the paths of a neighborhood of agents and replans them one after another
+    with prioritized planning (space_time_a_star) around the paths of all other agents, in a random
+    order. The new paths are kept if their sum of costs is smaller. Every intermediate solution is
+    collision-free, so the search can stop at any time.
+    """
+
+    def __init__(self, my_map, starts, goals, paths, heuristics=None, delays=None, neighborhood_size=8,
+                 neighborhood='adaptive', seed=None):
+        """my_map           - list of lists specifying obstacle positions
+        starts              - [(x1, y1), (x2, y2), ...] list of start locations
+        goals               - [(x1, y1), (x2, y2), ...] list of goal locations
+        paths               - initial collision-free paths (e.g. from CBS)
+        heuristics          - heuristic tables, one per goal; computed if None
+        delays              - timesteps each agent stays at its start (the paths include them)
+        neighborhood_size   - agents replanned per iteration
+        neighborhood        - 'random', 'agent' (agents in the way of the most delayed agent),
+                              'intersection' (agents passing intersections close to each other) or
+                              'adaptive' (all three, picked by the improvements they brought so far)
+        seed                - seed of the random choices, for repeatable runs
+        """
+        if neighborhood != 'adaptive' and neighborhood not in NEIGHBORHOODS:
+            raise ValueError("unknown neighborhood: {}".format(neighborhood))
+        self.my_map = my_map
+        self.starts = [tuple(start) for start in starts]
+        self.goals = [tuple(goal) for goal in goals]
+        self.num_of_agents = len(goals)
+        self.heuristics = heuristics if heuristics is not None else compute_all_heuristics(my_map, self.goals)
+        self.delays = delays if delays is not None else [0] * self.num_of_agents
+        self.paths = [[tuple(loc) for loc in path] for path in paths]
+        self.neighborhood_size = min(neighborhood_size, self.num_of_agents)
+        self.neighborhoods = NEIGHBORHOODS if neighborhood == 'adaptive' else (neighborhood,)
+        self.weights = {name: 1.0 for name in self.neighborhoods}
+        self.random = random.Random(seed)
+        self.tabu = set() # delayed agents already used by the agent-based neighborhood
+        self.intersections = [(r, c) for r in range(len(my_map)) for c in range(len(my_map[0]))
+                              if self.is_free((r, c)) and len(self.free_neighbors((r, c))) > 2]
+
+        self.num_of_iterations = 0
+        self.num_of_improvements = 0
+
+    def is_free(self, loc):
+        return 0 <= loc[0] < len(self.my_map) and 0 <= loc[1] < len(self.my_map[0]) \
+            and not self.my_map[loc[0]][loc[1]]
+
+    def free_neighbors(self, loc):
+        return [next_loc for next_loc in (move(loc, dir) for dir in range(4)) if self.is_free(next_loc)]
+
+    def lower_bound(self, agent):
+        """cost of the agent's path without other agents: its delay at the start, then a shortest path"""
+        return max(self.delays[agent] - 1, 0) + self.heuristics[agent][self.starts[agent]]
+
+    def delay(self, agent):
+        """how much longer the agent's path is than its lower bound"""
+        return len(self.paths[agent]) - 1 - self.lower_bound(agent)
+
+    def random_neighborhood(self):
+        return set(self.random.sample(range(self.num_of_agents), self.neighborhood_size))
+
+    def agent_neighborhood(self):
+        """the most delayed agent (not in the tabu list) and the agents in its way
+
+        Random walks from the agent's path that could still make it shorter collect the agents that
+        occupy the cells they step on.
+        """
+        candidates = [agent for agent in range(self.num_of_agents) if agent not in self.tabu and self.delay(agent) > 0]
+        if not candidates:
+            self.tabu.clear()
+            candidates = [agent for agent in range(self.num_of_agents) if self.delay(agent) > 0]
+            if not candidates:
+                return set()
+        agent = max(candidates, key=lambda a: (self.delay(a), self.random.random()))
+        self.tabu.add(agent)
+
+        occupants = dict() # (timestep, loc) -> agents
+        parked = dict() # goal -> (agent, timestep it arrives there)
+        for other, path in enumerate(self.paths):
+            for t, loc in enumerate(path):
+                occupants.setdefault((t, loc), []).append(other)
+            parked[path[-1]] = (other, len(path) - 1)
+
+        path = self.paths[agent]
+        cost = len(path) - 1
+        h_values = self.heuristics[agent]
+        neighborhood = {agent}
+        for _ in range(10 * self.neighborhood_size):
+            if len(neighborhood) >= self.neighborhood_size:
+                break
+            t = self.random.randrange(max(self.delays[agent] - 1, 0), cost)
+            loc = path[t]
+            while len(neighborhood) < self.neighborhood_size:
+                # moves that still allow a path shorter than the current one
+                moves = [next_loc for next_loc in self.free_neighbors(loc) + [loc]
+                         if h_values.get(next_loc) is not None and t + 1 + h_values[next_loc] < cost]
+                if not moves:
+                    break
+                loc = self.random.choice(moves)
+                t += 1
+                neighborhood.update(occupants.get((t, loc), ()))
+                if loc in parked and t >= parked[loc][1]:
+                    neighborhood.add(parked[loc][0])
+        return set(self.random.sample(sorted(neighborhood - {agent}),
+                                      min(len(neighborhood) - 1, self.neighborhood_size - 1))) | {agent}
+
+    def intersection_neighborhood(self):
+        """agents passing a random intersection and the intersections closest to it"""
+        if not self.intersections:
+            return set()
+        visitors = dict() # loc -> agents whose paths pass it
+        for agent, path in enumerate(self.paths):
+            for loc in path:
+                visitors.setdefault(loc, set()).add(agent)
+
+        neighborhood = set()
+        start = self.random.choice(self.intersections)
+        visited = {start}
+        queue = [start]
+        for loc in queue: # breadth-first over the free cells
+            if len(neighborhood) >= self.neighborhood_size:
+                break
+            if len(self.free_neighbors(loc)) > 2:
+                agents = sorted(visitors.get(loc, set()) - neighborhood)
+                self.random.shuffle(agents)
+                neighborhood.update(agents[:self.neighborhood_size - len(neighborhood)])
+            for next_loc in self.free_neighbors(loc):
+                if next_loc not in visited:
+                    visited.add(next_loc)
+                    queue.append(next_loc)
+        return neighborhood
+
+    def replan(self, neighborhood):
+        """new paths of the neighborhood around the other agents' paths, None if an agent gets stuck"""
+        reservations = Reservations()
+        for agent, path in enumerate(self.paths):
+            if agent not in neighborhood:
+                reservations.add(path)
+        order = sorted(neighborhood)
+        self.random.shuffle(order)
+        num_cells = len(self.my_map) * len(self.my_map[0])
+        new_paths = dict()
+        for agent in order:
+            path = space_time_a_star(self.my_map, self.starts[agent], self.goals[agent], self.heuristics[agent],
+                                     reservations, reservations.makespan + num_cells, self.delays[agent])
+            if path is None:
+                return None
+            reservations.add(path)
+            new_paths[agent] = path
+        return new_paths
+
+    def iterate(self):
+        """one destroy-and-repair step; returns whether the sum of costs went down"""
+        self.num_of_iterations += 1
+        name = self.random.choices(self.neighborhoods, [self.weights[n] for n in self.neighborhoods])[0]
+        neighborhood = getattr(self, name + '_neighborhood')()
+        if len(neighborhood) < 2 and self.num_of_agents > 1:
+            neighborhood = self.random_neighborhood()
+
+        old_cost = sum(len(self.paths[agent]) - 1 for agent in neighborhood)
+        new_paths = self.replan(neighborhood)
+        new_cost = sum(len(path) - 1 for path in new_paths.values()) if new_paths is not None else old_cost
+        self.weights[name] = (1 - REACTION_FACTOR) * self.weights[name] + REACTION_FACTOR * max(old_cost - new_cost, 0)
+        if new_cost >= old_cost:
+            return False
+        for agent, path in new_paths.items():
+            self.paths[agent] = path
+        self.num_of_improvements += 1
+        return True
+
+    def improve(self, time_limit=None, max_iterations=None, max_stalls=None):
+        """Generator of improving solutions: yields (paths, sum of costs, seconds since the start) after
+        every improvement, until time_limit or max_iterations runs out, max_stalls iterations in a row
+        bring no improvement or every agent takes a path of its lower bound. Without limits it only
+        ends at that bound, so a caller can stop at any time.
+        """
+        start_time = timer.time()
+        lower_bound = sum(self.lower_bound(agent) for agent in range(self.num_of_agents))
+        iterations = 0
+        stalls = 0
+        while get_sum_of_cost(self.paths) > lower_bound:
+            if time_limit is not None and timer.time() - start_time >= time_limit:
+                break
+            if max_iterations is not None and iterations >= max_iterations:
+                break
+            if max_stalls is not None and stalls >= max_stalls:
+                break
+            iterations += 1
+            if self.iterate():
+                stalls = 0
+                yield [list(path) for path in self.paths], get_sum_of_cost(self.paths), timer.time() - start_time
+            else:
+                stalls += 1
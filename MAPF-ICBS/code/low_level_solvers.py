@@ -0,0 +1,21 @@
+from a_star_class import A_Star, OD_A_Star
+from pea_star_class import PEA_Star
+from epea_star_class import EPEA_Star
+from sipp import SIPP
+from rotation_a_star import Rotation_A_Star
+
+# low-level solvers for CBSSolver / ICBS_Solver, all with the A_Star interface
+LLSOLVERS = {
+    'a_star': A_Star,
+    'od_a_star': OD_A_Star,
+    'pea_star': PEA_Star,
+    'epea_star': EPEA_Star,
+    'sipp': SIPP, # single agents only, meta-agents fall back to A_Star
+    'rotation_a_star': Rotation_A_Star, # turns take time; all agents start north (see rotation_llsolver)
+}
+
+
+def get_llsolver(name):
+    if name not in LLSOLVERS:
+        raise ValueError("Unknown low-level solver: {} (one of: {})".format(name, ','.join(LLSOLVERS)))
+    return LLSOLVERS[name]
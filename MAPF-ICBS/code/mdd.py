@@ -0,0 +1,120 @@
+from a_star_class import move
+from constraint_index import ConstraintIndex
+from single_agent_planner import is_constrained
+
+
+class MDD(object):
+    """Multi-valued decision diagram of one agent: the locations of all its paths of a given cost under
+    the constraints of a CT node, per timestep (as in ICBS).
+
+    Built for the cost of the agent's current (optimal) path, the MDD tells without a search whether
+    a new negative constraint raises that cost: it does iff every path in the MDD violates it, i.e. the
+    MDD has width 1 at the constrained location and timestep. Moves and goal tests follow A_Star.
+    """
+
+    def __init__(self, my_map, start, goal, h_values, constraints, agent, cost):
+        """my_map   - list of lists specifying obstacle positions
+        h_values    - heuristic table of the agent's goal
+        constraints - constraints of the CT node
+        agent       - the (simple) agent
+        cost        - cost of the agent's path, the MDD holds the paths of exactly this cost
+        """
+        self.my_map = my_map
+        self.cost = cost
+
+        self.index = index = ConstraintIndex(constraints, agent)
+
+        # forward: locations reachable at each timestep that can still get to the goal in time
+        levels = [{start}]
+        for t in range(1, cost + 1):
+            level = set()
+            for loc in levels[-1]:
+                for next_loc in self.moves(index, loc, t):
+                    h_value = h_values.get(next_loc)
+                    if h_value is not None and t + h_value <= cost:
+                        level.add(next_loc)
+            levels.append(level)
+
+        # backward: keep the locations that lead to the goal at the cost
+        levels[cost] = {goal} if goal in levels[cost] and self.can_stay(index, goal, cost) else set()
+        for t in range(cost - 1, -1, -1):
+            levels[t] = {loc for loc in levels[t]
+                         if any(next_loc in levels[t + 1] for next_loc in self.moves(index, loc, t + 1))}
+        self.levels = [frozenset(level) for level in levels]
+
+    def is_free(self, loc):
+        return 0 <= loc[0] < len(self.my_map) and 0 <= loc[1] < len(self.my_map[0]) \
+            and not self.my_map[loc[0]][loc[1]]
+
+    def moves(self, index, loc, timestep):
+        """locations the agent can move to from loc, arriving at timestep"""
+        return [next_loc for next_loc in (move(loc, dir) for dir in range(5))
+                if self.is_free(next_loc) and not index.violates(loc, next_loc, timestep)]
+
+    def can_stay(self, index, goal, timestep):
+        """whether the agent can stay at its goal from timestep on"""
+        return not index.must_leave_after(goal, timestep)
+
+    def level(self, timestep):
+        """locations of the agent at timestep on paths of the MDD; it waits at its goal after the cost"""
+        return self.levels[min(timestep, self.cost)]
+
+    def width(self, timestep):
+        return len(self.level(timestep))
+
+    def decides(self, constraint):
+        """whether blocked_by answers for constraint; the paths under it are always paths of the MDD here"""
+        return True
+
+    def blocked_by(self, constraint):
+        """whether every path of the MDD violates the negative constraint, so the agent's cost goes up"""
+        assert not constraint['positive']
+        loc = [tuple(l) for l in constraint['loc']]
+        timestep = constraint['timestep']
+        end = constraint.get('end', timestep)
+        if len(loc) == 1 and end > timestep:
+            return not self.avoids(loc[0], timestep, end)
+        if len(loc) == 1:
+            return self.level(timestep) == {loc[0]}
+        return self.level(timestep - 1) == {loc[0]} and self.level(timestep) == {loc[1]}
+
+    def avoids(self, loc, start, end):
+        """whether a path of the MDD stays off loc at every timestep in [start, end]"""
+        if end >= self.cost and self.level(self.cost) == {loc}:
+            return False # every path waits at the goal from the cost on
+        reached = self.levels[0] - {loc} if start <= 0 else self.levels[0]
+        for t in range(1, self.cost + 1):
+            reached = {next_loc for curr in reached for next_loc in self.moves(self.index, curr, t)
+                       if next_loc in self.levels[t]}
+            if start <= t <= end:
+                reached.discard(loc)
+        return bool(reached)
+
+
+class SingleAgentPlannerMDD(MDD):
+    """MDD for the moves and goal test of single_agent_planner.a_star"""
+
+    def moves(self, index, loc, timestep):
+        # a_star takes the first move required by a positive constraint if there is one
+        for dir in range(5):
+            next_loc = move(loc, dir)
+            if is_constrained(loc, next_loc, timestep, index) == 1 and self.is_free(next_loc):
+                return [next_loc]
+        return [next_loc for next_loc in (move(loc, dir) for dir in range(5))
+                if self.is_free(next_loc) and is_constrained(loc, next_loc, timestep, index) != 0]
+
+    def can_stay(self, index, goal, timestep):
+        return not index.vertex_blocked_after(goal, timestep)
+
+    def decides(self, constraint):
+        # a negative constraint on a move required by a positive one makes a_star drop the positive
+        # constraint, so the agent gets moves the MDD doesn't have
+        return not self.index.positive_at(constraint['timestep'])
+
+
+def inherit_mdds(mdds, constraint):
+    """the MDDs of a CT node that still hold in its child with the new constraint"""
+    if constraint['positive']:
+        # a positive constraint is a negative one for every other agent
+        return dict()
+    return {agent: mdd for agent, mdd in mdds.items() if agent != constraint['agent']}
@@ -2,7 +2,9 @@ import heapq
 from itertools import product
 import numpy
 import copy
-import collections
+
+from heuristics import compute_all_heuristics
+from constraint_index import ConstraintIndex
 
 def move(loc, dir):
     directions = [(0, -1), (1, 0), (0, 1), (-1, 0), (0, 0)]
@@ -20,69 +22,12 @@ def get_sum_of_cost(paths):
 
 
 def compute_heuristics(my_map, goal):
-    # Use Dijkstra to build a shortest-path tree rooted at the goal location
-    open_list = []
-    closed_list = dict()
-    root = {'loc': goal, 'cost': 0}
-    heapq.heappush(open_list, (root['cost'], goal, root))
-    closed_list[goal] = root
-    while len(open_list) > 0:
-        (cost, loc, curr) = heapq.heappop(open_list)
-        for dir in range(4):
-            child_loc = move(loc, dir)
-            child_cost = cost + 1
-            if child_loc[0] < 0 or child_loc[0] >= len(my_map) \
-               or child_loc[1] < 0 or child_loc[1] >= len(my_map[0]):
-               continue
-            if my_map[child_loc[0]][child_loc[1]]:
-                continue
-            child = {'loc': child_loc, 'cost': child_cost}
-            if child_loc in closed_list:
-                existing_node = closed_list[child_loc]
-                if existing_node['cost'] > child_cost:
-                    closed_list[child_loc] = child
-                    # open_list.delete((existing_node['cost'], existing_node['loc'], existing_node))
-                    heapq.heappush(open_list, (child_cost, child_loc, child))
-            else:
-                closed_list[child_loc] = child
-                heapq.heappush(open_list, (child_cost, child_loc, child))
+    # BFS wavefront over the occupancy array; see heuristics.compute_all_heuristics for all goals at once
+    return compute_all_heuristics(my_map, [goal])[0]
 
-    # build the heuristics table
-    h_values = dict()
-    for loc, node in closed_list.items():
-        h_values[loc] = node['cost']
-    return h_values
-
-# return a table that constains the list of constraints of all agents for each time step. 
+# return the compiled constraint index of every agent in the meta-agent
 def build_constraint_table(constraints, meta_agent):
-    # constraint_table = {}
-    constraint_table = collections.defaultdict(list) # dictionary of lists
-
-    if not constraints:
-        return constraint_table
-    for constraint in constraints:
-        timestep = constraint['timestep']
-        for agent in meta_agent:
-            # positive and negative constraint for agent
-            if (constraint['agent'] == agent):
-                constraint_table[timestep].append(constraint)
-            # enforce positive constraints from other agents (i.e. create neg constraint)
-            elif constraint['positive']: 
-                neg_constraint = copy.deepcopy(constraint)
-                neg_constraint['agent'] = agent
-                neg_constraint['meta_agent'] = meta_agent
-                # if edge collision
-                if len(constraint['loc']) == 2:
-                    # switch traversal direction
-                    prev_loc = constraint['loc'][1]
-                    curr_loc = constraint['loc'][0]
-                    neg_constraint['loc'] = [prev_loc, curr_loc]
-                neg_constraint['positive'] = False
-                constraint_table[timestep].append(neg_constraint)
-    
-    return constraint_table
-                
-
+    return {agent: ConstraintIndex(constraints, agent) for agent in meta_agent}
 
 
 def get_location(path, time):
@@ -120,68 +65,19 @@ def get_path(goal_node,meta_agent):
 
 # returns whether if a move at timestep violates any external (negative) constraint
 def is_constrained(curr_loc, next_loc, timestep, constraint_table, agent):
-
-    if timestep not in constraint_table:
-        return False
-    
-    for constraint in constraint_table[timestep]:
-        if agent == constraint['agent'] and constraint['positive'] == False:
-            # vertex constraint
-            if len(constraint['loc']) == 1:
-                if next_loc == constraint['loc'][0]:
-                    return True
-            # edge constraint
-            else:
-                if constraint['loc'] == [curr_loc, next_loc]:
-                    return True
-
-    return False
+    return constraint_table[agent].is_forbidden(curr_loc, next_loc, timestep)
 
 # returns whether agent violates its positive constraint
 def violates_pos_constraint(curr_loc, next_loc, timestep, constraint_table, agent, meta_agent):
-    if timestep not in constraint_table:
-        return False
-    for constraint in constraint_table[timestep]:
-        if agent == constraint['agent'] and constraint['positive']:
-            # vertex constraint
-            if len(constraint['loc']) == 1:
-                if next_loc != constraint['loc'][0]:
-                    print('agent {} must follow positive constraint at timestep {}: {}'.format(agent, timestep, constraint['loc']))
-                    return True
-            # edge constraint
-            else:
-                if constraint['loc'] != [curr_loc, next_loc]:
-                    print('agent {} must follow positive constraint at timestep {}: {}'.format(agent, timestep, constraint['loc']))
-                    return True
+    if constraint_table[agent].violates_positive(curr_loc, next_loc, timestep):
+        print('agent {} must follow positive constraint at timestep {}: {}'.format(agent, timestep, constraint_table[agent].positive_at(timestep)))
+        return True
     return False
     
 
 # future external constraints
 def future_constraint_exists(agent, meta_agent, agent_loc, timestep, constraint_table):
-    for t in constraint_table:
-        # if t is a future timestep which exists in constraint table
-        if t > timestep:
-            # all constraints for timestep t in table 
-            # print("future constraints at timestep {}", t)
-
-
-            for constraint in constraint_table[t]:
-                # print(constraint)
-                # last loc in vertex/edge constraint
-
-                if constraint['loc'][-1] == agent_loc:
-
-                    if agent == 2:
-                        print('current timestep: {}, const timestep: {}'.format(timestep, constraint['timestep']))
-                        print('agent 2 loc: ', agent_loc)
-                        print('constraint loc:', constraint['loc'][-1])
-
-                    if(agent == constraint['agent'] and not constraint['positive']):
-                        return True
-                    if(agent != constraint['agent'] and constraint['positive']):
-                        return True
-                
-    return False
+    return constraint_table[agent].arrival_blocked_after(agent_loc, timestep)
 
 
 
@@ -223,8 +119,6 @@ def ma_star(my_map, start_locs, goal_loc, h_values, meta_agent, constraints):
 
     table = build_constraint_table(constraints, meta_agent)
 
-    print("> build constraint table")
-    print(table)
 
     # combined h value for agents in meta-agent
     for agent in meta_agent:
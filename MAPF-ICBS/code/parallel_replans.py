@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from conflict_avoidance import ConflictAvoidanceTable
+from path_cache import PathCache
+
+# instance data of the high-level search, set once in each worker process by init_worker
+worker_instance = None
+
+
+def init_worker(my_map, starts, goals, heuristics, llsolver, use_cat):
+    global worker_instance
+    worker_instance = (my_map, starts, goals, heuristics, llsolver, use_cat)
+
+
+def search_paths(agent, constraints, paths):
+    """low-level search of a worker process, as CBSSolver.search_paths; paths are the current paths"""
+    my_map, starts, goals, heuristics, llsolver, use_cat = worker_instance
+    cat = ConflictAvoidanceTable(paths, [agent]) if use_cat else None
+    astar = llsolver(my_map, starts, goals, heuristics, agent, constraints, cat=cat)
+    return astar.find_paths()
+
+
+class ParallelReplans(object):
+    """Process pool for the low-level searches of the children of CBSSolver's CT nodes.
+
+    The map, heuristics and the rest of the instance go to each worker once, when it starts; a task
+    only carries the agent, its constraints and the current paths. The high-level search still takes
+    the results in the order it would compute them itself (through the path cache), so the CT is
+    the same as in a serial run.
+    """
+
+    def __init__(self, solver, workers):
+        """solver   - the CBSSolver
+        workers     - number of worker processes
+        """
+        self.path_cache = solver.path_cache
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker,
+            initargs=(solver.my_map, solver.starts, solver.goals, solver.heuristics, solver.llsolver, solver.use_cat))
+
+    def submit(self, node, splitter):
+        """start the searches of node's children for its first collision
+
+        Stores (constraints, futures) in node['replans'], one future per constraint for the search of
+        the constrained agent; None if the result is in the path cache already.
+        """
+        constraints = splitter(node['collisions'][0])
+        futures = []
+        for constraint in constraints:
+            agent = constraint['agent']
+            child_constraints = [constraint] + list(node['constraints'])
+            if self.path_cache is not None and PathCache.key(agent, child_constraints) in self.path_cache:
+                futures.append(None)
+            else:
+                futures.append(self.executor.submit(search_paths, agent, child_constraints, node['paths']))
+        node['replans'] = (constraints, futures)
+
+    def shutdown(self):
+        # running searches finish, the ones not started yet are dropped
+        self.executor.shutdown(cancel_futures=True)
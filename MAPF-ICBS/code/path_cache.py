@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+
+def constraint_signature(agents, constraints):
+    """Canonical frozen set of the constraints that apply to agents.
+
+    Same view as ConstraintIndex: the agent's own constraints, plus the positive constraints of
+    other agents. The latter are tagged 'other_pos' rather than stored as reversed negative
+    edges, since ConstraintIndex also blocks arrival at their destination. Everything else
+    can't change the low-level result, so it is left out of the key.
+    """
+    if not isinstance(agents, list):
+        agents = [agents]
+    signature = set()
+    for constraint in constraints or []:
+        loc = tuple(tuple(l) for l in constraint['loc'])
+        for agent in agents:
+            if constraint['agent'] == agent:
+                # a range constraint is the same as one constraint per timestep
+                for timestep in range(constraint['timestep'], constraint.get('end', constraint['timestep']) + 1):
+                    signature.add((agent, constraint['positive'], loc, timestep))
+            elif constraint['positive']:
+                signature.add((agent, 'other_pos', loc, constraint['timestep']))
+    return frozenset(signature)
+
+
+class PathCache(object):
+    """Bounded LRU cache of low-level results shared by one high-level search.
+
+    Keyed by (agents, constraint signature). Failed searches are cached too (as None).
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.paths = OrderedDict() # (agents, signature) -> list of paths or None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(agents, constraints):
+        agent_key = tuple(agents) if isinstance(agents, list) else (agents,)
+        return agent_key, constraint_signature(agents, constraints)
+
+    def get(self, key):
+        """(True, paths) on a hit, (False, None) on a miss"""
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            paths = self.paths[key]
+            return True, (None if paths is None else [list(path) for path in paths])
+        self.misses += 1
+        return False, None
+
+    def put(self, key, paths):
+        self.paths[key] = None if paths is None else [list(path) for path in paths]
+        self.paths.move_to_end(key)
+        while len(self.paths) > self.maxsize:
+            self.paths.popitem(last=False)
+
+    def find_paths(self, search, agents, constraints):
+        """cached result for agents under constraints, search() runs the low-level search on a miss"""
+        key = self.key(agents, constraints)
+        found, paths = self.get(key)
+        if not found:
+            paths = search()
+            self.put(key, paths)
+        return paths
+
+    def __contains__(self, key):
+        # no hit or LRU update, just whether get(key) would hit
+        return key in self.paths
+
+    def __len__(self):
+        return len(self.paths)
@@ -0,0 +1,228 @@
+import time as timer
+
+from a_star_class import A_Star, get_sum_of_cost
+from heuristics import compute_all_heuristics
+from conflict_avoidance import ConflictAvoidanceTable
+from collision_table import CollisionTable, ReservationTable, first_collision
+from cbs_basic import detect_collisions, apply_delay_constraint
+from budget import Budget
+
+
+def collides(path1, path2, window=None):
+    """whether the paths collide, only counting collisions up to window if it is given"""
+    collision = first_collision(path1, path2)
+    return collision is not None and (window is None or collision[1] <= window)
+
+
+def higher_agents(priorities, agent):
+    """agents with a higher priority than agent, directly or through other agents"""
+    higher = set()
+    stack = [agent]
+    while stack:
+        curr = stack.pop()
+        for high, low in priorities:
+            if low == curr and high not in higher:
+                higher.add(high)
+                stack.append(high)
+    return higher
+
+
+def lower_agents(priorities, agent):
+    """agents with a lower priority than agent, directly or through other agents"""
+    lower = set()
+    stack = [agent]
+    while stack:
+        curr = stack.pop()
+        for high, low in priorities:
+            if high == curr and low not in lower:
+                lower.add(low)
+                stack.append(low)
+    return lower
+
+
+def topological_order(priorities, agents):
+    """agents sorted so that every agent comes after the agents of higher priority among them"""
+    order = []
+    remaining = set(agents)
+    while remaining:
+        ready = sorted(agent for agent in remaining
+                       if not any(low == agent and high in remaining for high, low in priorities))
+        order.extend(ready)
+        remaining.difference_update(ready)
+    return order
+
+
+class PBSSolver(object):
+    """Priority-based search (PBS).
+
+    The high level is a depth-first search over partial priority orderings instead of constraints:
+    a collision between a1 and a2 branches into a1 before a2 and a2 before a1. In each child the
+    lower agent and every agent below it that now collides with a higher one are replanned, in
+    topological order, around the paths of all their higher agents. Much faster than CBS on crowded
+    instances, but neither optimal nor complete.
+
+    With a window, only collisions in the first window timesteps are resolved (windowed PBS, as in
+    rolling-horizon collision resolution); the paths go on to the goals without regard to each other.
+    """
+
+    def __init__(self, my_map, agents, heuristics=None, llsolver=A_Star, use_cat=True, budget=None, window=None):
+        """my_map   - list of lists specifying obstacle positions
+        agents      - agents with id, start, goal and delay
+        heuristics  - precomputed heuristic tables, one per goal (e.g. from a heuristic cache); computed if None
+        llsolver    - low-level search class with the A_Star interface
+        use_cat     - break ties in the low-level search by conflicts with the other agents' paths
+        budget      - time, node and memory limits of find_solution (see budget.solve); no limits if None
+        window      - resolve collisions up to this timestep only; all of them if None
+        """
+        self.start_time = 0
+        self.my_map = my_map
+        self.agents = agents
+        self.starts = [agent.start for agent in agents]
+        self.goals = [agent.goal for agent in agents]
+        self.num_of_agents = len(self.goals)
+
+        self.num_of_generated = 0
+        self.num_of_expanded = 0
+        self.CPU_time = 0
+
+        self.stack = []
+
+        if heuristics is None:
+            heuristics = compute_all_heuristics(my_map, self.goals)
+        self.heuristics = heuristics
+        self.llsolver = llsolver
+        self.use_cat = use_cat
+        self.budget = budget if budget is not None else Budget()
+        self.window = window
+
+        # the paths of higher agents are obstacles up to here; beyond it an agent may cross the goal of
+        # a higher agent, which the collision check after the replan rejects
+        self.horizon = len(my_map) * len(my_map[0])
+
+        self.delay_constraints = []
+        for agent in agents:
+            if agent.delay > 0:
+                apply_delay_constraint(self.delay_constraints, agent_id=agent.id, start_loc=agent.start,
+                                       delay_time=agent.delay)
+
+    def low_level(self, agent, paths, higher):
+        """path of agent around the paths of the higher agents, None if there is none"""
+        if self.window is not None:
+            horizon = self.window
+        else:
+            horizon = self.horizon + max((len(paths[high]) for high in higher), default=0)
+        # the higher agents' paths (and their goals until horizon) are reserved in one table
+        reservations = ReservationTable(horizon)
+        for high in sorted(higher):
+            reservations.add(paths[high])
+        constraints = [dict(constraint) for constraint in self.delay_constraints]
+        cat = ConflictAvoidanceTable(paths, [agent]) if self.use_cat else None
+        astar = self.llsolver(self.my_map, self.starts, self.goals, self.heuristics, agent, constraints, cat=cat,
+                              reservations=reservations)
+        path = astar.find_paths()
+        if path is None:
+            return None
+        path = path[0]
+        if any(collides(path, paths[high], self.window) for high in higher):
+            return None
+        return path
+
+    def update_plan(self, node, agent):
+        """replan agent and the agents below it that collide with a higher agent; False if one can't be"""
+        priorities = node['priorities']
+        paths = node['paths']
+        for curr in topological_order(priorities, {agent} | lower_agents(priorities, agent)):
+            higher = higher_agents(priorities, curr)
+            if curr != agent and not any(collides(paths[curr], paths[high], self.window) for high in higher):
+                continue
+            path = self.low_level(curr, paths, higher)
+            if path is None:
+                return False
+            paths[curr] = path
+        return True
+
+    def detect_collisions(self, paths, collision_table):
+        collisions = detect_collisions(paths, collision_table)
+        if self.window is None:
+            return collisions
+        # first collisions of the pairs: a pair whose first collision is later has none in the window
+        return [collision for collision in collisions if collision['timestep'] <= self.window]
+
+    def push_node(self, node):
+        self.stack.append(node)
+        # print("Generate node {}".format(self.num_of_generated))
+        self.num_of_generated += 1
+
+    def pop_node(self):
+        node = self.stack.pop()
+        print("Expand node {}".format(self.num_of_expanded))
+        self.num_of_expanded += 1
+        return node
+
+    def find_solution(self, disjoint=False):
+        """ Finds paths for all agents from their start locations to their goal locations
+
+        disjoint         - not used: PBS branches on priorities, not on constraints (same interface as CBS)
+        """
+
+        self.start_time = timer.time()
+        self.budget.start()
+
+        root = {
+            'cost': 0,
+            'priorities': frozenset(),
+            'paths': [],
+            'collisions': [],
+            'collision_table': None
+        }
+        for i in range(self.num_of_agents):  # Find initial path for each agent
+            path = self.low_level(i, root['paths'] + [None] * (self.num_of_agents - i), set())
+            if path is None:
+                raise BaseException('No solutions')
+            root['paths'].append(path)
+
+        root['cost'] = get_sum_of_cost(root['paths'])
+        root['collision_table'] = CollisionTable(root['paths'])
+        root['collisions'] = self.detect_collisions(root['paths'], root['collision_table'])
+        self.push_node(root)
+
+        while len(self.stack) > 0:
+            if self.budget.exceeded(self.num_of_generated):
+                return None
+            p = self.pop_node()
+            if p['collisions'] == []:
+                self.print_results(p)
+                return p['paths'], self.num_of_generated, self.num_of_expanded
+
+            collision = p['collisions'][0]
+            children = []
+            for high, low in ((collision['a1'], collision['a2']), (collision['a2'], collision['a1'])):
+                if low in higher_agents(p['priorities'], high):
+                    continue # the opposite order is already fixed
+                q = {'cost': 0,
+                     'priorities': p['priorities'] | {(high, low)},
+                     'paths': list(p['paths']),
+                     'collisions': [],
+                     'collision_table': None
+                }
+                if not self.update_plan(q, low):
+                    continue
+                # only the pairs of the replanned agents are checked again
+                q['collision_table'] = p['collision_table'].update(q['paths'])
+                q['collisions'] = self.detect_collisions(q['paths'], q['collision_table'])
+                q['cost'] = get_sum_of_cost(q['paths'])
+                children.append(q)
+
+            # depth-first: the cheaper child is expanded next
+            for q in sorted(children, key=lambda node: (node['cost'], len(node['collisions'])), reverse=True):
+                self.push_node(q)
+
+        return None
+
+    def print_results(self, node):
+        print("\n Found a solution! \n")
+        CPU_time = timer.time() - self.start_time
+        print("CPU time (s):    {:.2f}".format(CPU_time))
+        print("Sum of costs:    {}".format(get_sum_of_cost(node['paths'])))
+        print("Expanded nodes:  {}".format(self.num_of_expanded))
+        print("Generated nodes: {}".format(self.num_of_generated))
@@ -0,0 +1,80 @@
+import heapq
+import time as timer
+
+from a_star_class import A_Star, get_path
+
+
+class PEA_Star(A_Star):
+    """Partial Expansion A* (PEA*) with the same interface as A_Star.
+
+    Every node in the open list carries a stored value F (initially its f value). When a node
+    is expanded only the children with f == F are put into the open list; the node itself goes
+    back into the open list with F = the smallest f > F among the remaining children. Children
+    whose f is above the current bound are never stored, which keeps the open list small for
+    meta-agents with a lot of joint moves.
+    """
+
+    resumable = False # partially expanded nodes can't be put back by timestep
+
+    def push_node(self, node, F_val=None):
+        if F_val is None:
+            F_val = node.g_val + node.h_val
+
+        heapq.heappush(self.open_list, (F_val, node.conflicts, node.h_val, node.cells, self.num_generated, node))
+        self.num_generated += 1
+
+    def pop_node(self):
+        F_val,_,_,_, id, curr = heapq.heappop(self.open_list)
+
+        self.num_expanded += 1
+        return F_val, curr
+
+    def select_children(self, curr, F_val):
+        """children of curr with f == F_val and the next F value of curr (None if no child is left)"""
+        children_with_F = []
+        next_F = None
+        for child in self.generate_child_nodes(curr):
+            child_f = child.g_val + child.h_val
+            if child_f == F_val:
+                children_with_F.append(child)
+            elif child_f > F_val:
+                next_F = child_f if next_F is None else min(next_F, child_f)
+
+        return children_with_F, next_F
+
+    def find_paths(self):
+
+        self.start_time = timer.time()
+
+        root = self.init_search()
+        if self.start_blocked():
+            print('no solution')
+            return None
+
+        self.push_node(root)
+        self.closed_list[self.closed_key(root)] = root
+
+        while len(self.open_list) > 0:
+
+            F_val, curr = self.pop_node()
+
+            if self.is_solution(curr):
+                return get_path(curr,self.agents,self.locs)
+
+            children, next_F = self.select_children(curr, F_val)
+
+            for child in children:
+
+                key = self.closed_key(child)
+                existing = self.closed_list.get(key)
+                if existing is None or self.replaces(child, existing):
+                    self.closed_list[key] = child
+                    self.push_node(child)
+
+            # push curr back into open list with best f_val > F_val
+            if next_F is not None:
+                self.push_node(curr, next_F)
+
+        print('no solution')
+
+        return None
@@ -1,14 +1,103 @@
 import time as timer
-from single_agent_planner import compute_heuristics, a_star, get_sum_of_cost
+import heapq
+from single_agent_planner import a_star, get_sum_of_cost, move
+from heuristics import compute_all_heuristics
+
+
+class Reservations(object):
+    """Space-time cells of the paths planned so far; agents wait at their goal after their path ends."""
+
+    def __init__(self):
+        self.vertex = set() # (timestep, loc)
+        self.edge = set() # (timestep, from_loc, to_loc)
+        self.goal = dict() # loc -> timestep from which an agent waits there
+        self.last = dict() # loc -> last timestep a path is at loc
+        self.makespan = 0
+
+    def add(self, path):
+        for t, loc in enumerate(path):
+            self.vertex.add((t, loc))
+            self.last[loc] = max(self.last.get(loc, -1), t)
+            if t > 0:
+                self.edge.add((t, path[t - 1], loc))
+        self.goal[path[-1]] = len(path) - 1
+        self.makespan = max(self.makespan, len(path) - 1)
+
+    def blocks(self, curr_loc, next_loc, timestep):
+        """whether moving curr_loc -> next_loc arriving at timestep collides with a reserved path"""
+        if (timestep, next_loc) in self.vertex or (timestep, next_loc, curr_loc) in self.edge:
+            return True
+        arrival = self.goal.get(next_loc)
+        return arrival is not None and timestep >= arrival
+
+    def can_stay(self, loc, timestep):
+        """whether an agent can wait at loc forever from timestep on"""
+        return loc not in self.goal and self.last.get(loc, -1) < timestep
+
+
+def space_time_a_star(my_map, start, goal, h_values, reservations, horizon, delay=0):
+    """shortest path from start to goal around the reservations, None if there is none within horizon
+
+    delay       - the agent stays at start for its first delay timesteps (as apply_delay_constraint)
+    """
+    h_value = h_values.get(start)
+    if h_value is None:
+        return None
+    parents = {(start, 0): None} # every path to (loc, t) costs t, so the first one found is kept
+    open_list = [(h_value, h_value, 0, start)]
+    while open_list:
+        _, _, t, loc = heapq.heappop(open_list)
+        if loc == goal and reservations.can_stay(goal, t):
+            path = []
+            node = (loc, t)
+            while node is not None:
+                path.append(node[0])
+                node = parents[node]
+            path.reverse()
+            return path
+        if t >= horizon:
+            continue
+        for dir in range(5):
+            next_loc = move(loc, dir)
+            if t + 1 < delay and next_loc != start:
+                continue
+            h_value = h_values.get(next_loc)
+            if h_value is None or (next_loc, t + 1) in parents or reservations.blocks(loc, next_loc, t + 1):
+                continue
+            parents[(next_loc, t + 1)] = (loc, t)
+            heapq.heappush(open_list, (t + 1 + h_value, h_value, t + 1, next_loc))
+    return None
+
+
+def prioritized_paths(my_map, starts, goals, heuristics, delays=None):
+    """collision-free paths planned one agent after another in index order, None if an agent is stuck
+
+    Each agent avoids the paths of the agents before it, including their goals once they arrived.
+    Quick but neither optimal nor complete; used as the fallback of a high-level search that runs
+    out of its budget (see budget.solve).
+    """
+    # once all earlier agents have arrived the map doesn't change any more
+    num_cells = len(my_map) * len(my_map[0])
+    reservations = Reservations()
+    paths = []
+    for i in range(len(starts)):
+        path = space_time_a_star(my_map, tuple(starts[i]), tuple(goals[i]), heuristics[i], reservations,
+                                 reservations.makespan + num_cells, delays[i] if delays else 0)
+        if path is None:
+            return None
+        reservations.add(path)
+        paths.append(path)
+    return paths
 
 
 class PrioritizedPlanningSolver(object):
     """A planner that plans for each robot sequentially."""
 
-    def __init__(self, my_map, starts, goals):
+    def __init__(self, my_map, starts, goals, heuristics=None):
         """my_map   - list of lists specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        heuristics  - precomputed heuristic tables, one per goal (e.g. from a heuristic cache); computed if None
         """
 
         self.my_map = my_map
@@ -19,9 +108,9 @@ class PrioritizedPlanningSolver(object):
         self.CPU_time = 0
 
         # compute heuristics for the low-level search
-        self.heuristics = []
-        for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+        if heuristics is None:
+            heuristics = compute_all_heuristics(my_map, self.goals)
+        self.heuristics = heuristics
 
     def find_solution(self):
         """ Finds paths for all agents from their start locations to their goal locations."""
@@ -0,0 +1,116 @@
+from collections import deque
+from types import SimpleNamespace
+
+from a_star_class import A_Star
+from heuristics import compute_all_heuristics
+from pbs import PBSSolver
+from budget import Budget, solve
+from rotation_a_star import rotation_llsolver
+
+WINDOW = 10
+REPLAN_PERIOD = 5
+
+
+class RollingHorizonPlanner(object):
+    """Lifelong MAPF by rolling-horizon collision resolution (RHCR).
+
+    Agents get a new goal whenever they reach their current one. Every replan_period timesteps the
+    planner plans paths for all agents from where they are with windowed PBS: collisions are only
+    resolved in the first window timesteps, the rest of each path is kept as guidance towards the
+    goal. The agents execute the first replan_period steps, then the planner is called again.
+    Each call only looks window timesteps ahead, so its cost grows with the fleet, not the horizon.
+    """
+
+    def __init__(self, my_map, window=WINDOW, replan_period=REPLAN_PERIOD, new_goal=None, heuristics=None,
+                 time_limit=None):
+        """my_map       - list of lists specifying obstacle positions
+        window          - timesteps in which collisions are resolved (>= replan_period)
+        replan_period   - timesteps executed between two calls of plan
+        new_goal        - new_goal(agent_id, loc) gives the next goal of an agent without one, None to
+                          let it wait
+        heuristics      - heuristics(goals) returns the heuristic tables of goals (e.g. from a heuristic
+                          cache); computed and kept per goal if None
+        time_limit      - seconds for a windowed search; the agents wait for a period if it runs out
+        """
+        if window < replan_period:
+            raise ValueError("window ({}) must be at least the replan period ({})".format(window, replan_period))
+        self.my_map = my_map
+        self.window = window
+        self.replan_period = replan_period
+        self.new_goal = new_goal
+        self.heuristics = heuristics
+        self.heuristic_tables = dict() # goal -> heuristic table, if heuristics is None
+        self.time_limit = time_limit
+
+        self.goals = dict() # agent id -> queue of goals, the first one is the current goal
+        self.segments = dict() # agent id -> locations of the agent's last planned period
+        self.paths = dict() # agent id -> last windowed path
+
+        self.timestep = 0
+        self.num_of_finished_tasks = 0
+
+    def add_goal(self, agent_id, goal):
+        """queue a goal of an agent, after the goals it already has"""
+        self.goals.setdefault(agent_id, deque()).append(tuple(goal))
+
+    def current_goal(self, agent_id):
+        goals = self.goals.get(agent_id)
+        return goals[0] if goals else None
+
+    def get_heuristics(self, goals):
+        if self.heuristics is not None:
+            return self.heuristics(goals)
+        missing = [goal for goal in dict.fromkeys(goals) if goal not in self.heuristic_tables]
+        if missing:
+            self.heuristic_tables.update(zip(missing, compute_all_heuristics(self.my_map, missing)))
+        return [self.heuristic_tables[goal] for goal in goals]
+
+    def update_goals(self, agent_id, loc):
+        """drop the goal the agent reached in its last period and get a new one if it has none left"""
+        goal = self.current_goal(agent_id)
+        if goal is not None and (goal == loc or goal in self.segments.get(agent_id, ())):
+            self.goals[agent_id].popleft()
+            self.num_of_finished_tasks += 1
+        if self.current_goal(agent_id) is None and self.new_goal is not None:
+            goal = self.new_goal(agent_id, loc)
+            if goal is not None:
+                self.add_goal(agent_id, goal)
+
+    def plan(self, locations, headings=None):
+        """paths of the next replan_period timesteps
+
+        locations   - {agent id: current location}
+        headings    - {agent id: current heading}: plan with Rotation_A_Star, where turns take time
+        returns {agent id: [location at each timestep of the period]}; agents without a goal wait
+        """
+        agent_ids = sorted(locations)
+        starts = [tuple(locations[agent_id]) for agent_id in agent_ids]
+        for agent_id, start in zip(agent_ids, starts):
+            self.update_goals(agent_id, start)
+        goals = [self.current_goal(agent_id) or start for agent_id, start in zip(agent_ids, starts)]
+
+        agents = [SimpleNamespace(id=i, start=starts[i], goal=goals[i], delay=0) for i in range(len(agent_ids))]
+        llsolver = A_Star
+        if headings is not None:
+            llsolver = rotation_llsolver([headings.get(agent_id) for agent_id in agent_ids])
+        solver = PBSSolver(self.my_map, agents, heuristics=self.get_heuristics(goals), llsolver=llsolver,
+                           window=self.window, budget=Budget(time_limit=self.time_limit))
+        result = solve(solver, False, fallback=False)
+        if result.paths is None:
+            # nothing collides if nobody moves
+            print("Rolling horizon: no windowed plan ({}), waiting".format(result.status))
+            paths = [[start] for start in starts]
+        else:
+            paths = result.paths
+
+        segments = dict()
+        for agent_id, path in zip(agent_ids, paths):
+            self.paths[agent_id] = path
+            segments[agent_id] = path[:self.replan_period + 1]
+        self.segments = segments
+        self.timestep += self.replan_period
+        return segments
+
+    def throughput(self):
+        """finished tasks per timestep so far"""
+        return self.num_of_finished_tasks / self.timestep if self.timestep else 0
@@ -0,0 +1,180 @@
+import heapq
+import time as timer
+from functools import partial
+
+from a_star_class import A_Star, UNREACHABLE
+
+# headings in clockwise order, the same names as CommandSet in the robot code
+HEADINGS = ('north', 'east', 'south', 'west')
+# (row, col) step of a forward move per heading
+FORWARD = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+def heading_index(heading):
+    """index into HEADINGS of a heading name or index; None is north (the default of CommandSet)"""
+    if heading is None:
+        return 0
+    if isinstance(heading, str):
+        return HEADINGS.index(heading)
+    return heading % 4
+
+
+def num_turns(heading, next_heading):
+    """90 degree rotations from heading to next_heading (0, 1 or 2)"""
+    delta = (next_heading - heading) % 4
+    return min(delta, 4 - delta)
+
+
+class RotationNode(object):
+    __slots__ = ('cell', 'heading', 'g_val', 'h_val', 'parent', 'conflicts')
+
+    def __init__(self, cell, heading, g_val, h_val, parent, conflicts=0):
+        self.cell = cell
+        self.heading = heading # index into HEADINGS
+        self.g_val = g_val # timestep
+        self.h_val = h_val
+        self.parent = parent
+        self.conflicts = conflicts
+
+
+class Rotation_A_Star(A_Star):
+    """A_Star for differential-drive robots, with the same interface.
+
+    A search state is (cell, heading, timestep). Each timestep the agent either waits, rotates by
+    90 degrees in place or moves one cell forward in its heading, so a 90 degree turn takes one
+    timestep and a 180 degree turn two, as on the robots. The path is still one location per
+    timestep (rotations are timesteps in the same cell), so CBS detects collisions on the timed
+    schedule the robots actually execute. The heading at the goal doesn't matter.
+
+    The heuristic is the distance to the goal, plus one if no neighbour on a shortest path lies
+    ahead of the agent (it has to turn or take a longer way); it stays consistent.
+    Meta-agents (more than one agent) fall back to A_Star.
+    """
+
+    resumable = False # resume() rebuilds the search without the headings
+
+    def __init__(self,my_map,starts,goals,heuristics,agents,contraints,cat=None,reservations=None,headings=None):
+        """headings - initial heading of each agent (name in HEADINGS or index), indexed like starts;
+                      north for all agents if None
+        """
+        super().__init__(my_map,starts,goals,heuristics,agents,contraints,cat,reservations)
+        self.start_headings = [heading_index(headings[a] if headings is not None else None) for a in self.agents]
+        self.rotation_open_list = []
+
+    def forward_cell(self, cell, heading):
+        """cell ahead of cell in heading, None if it is off the map or an obstacle"""
+        r, c = self.locs[cell]
+        r, c = r + FORWARD[heading][0], c + FORWARD[heading][1]
+        if r < 0 or r >= self.rows or c < 0 or c >= self.cols or self.my_map[r][c]:
+            return None
+        return r * self.cols + c
+
+    def heuristic(self, cell, heading):
+        h_flat = self.h_flat[0]
+        h_value = h_flat[cell]
+        if h_value <= 0:
+            return h_value
+        ahead = self.forward_cell(cell, heading)
+        if ahead is None or h_flat[ahead] != h_value - 1:
+            return h_value + 1
+        return h_value
+
+    def push_node(self, node):
+        f_value = node.g_val + node.h_val
+
+        heapq.heappush(self.rotation_open_list,
+                       (f_value, node.conflicts, node.h_val, node.cell, node.heading, self.num_generated, node))
+        self.num_generated += 1
+
+    def pop_node(self):
+        curr = heapq.heappop(self.rotation_open_list)[-1]
+
+        self.num_expanded += 1
+        return curr
+
+    def state_key(self, node):
+        # after the last constraint the timestep no longer matters: the earlier arrival dominates
+        return (node.cell, node.heading, min(node.g_val, self.max_constraints[0] + 1))
+
+    def generate_child_nodes(self, curr):
+        children = []
+        table = self.c_table[0]
+        timestep = curr.g_val + 1
+        curr_loc = self.locs[curr.cell]
+
+        # wait, rotate left, rotate right, move forward
+        moves = [(curr.cell, curr.heading), (curr.cell, (curr.heading - 1) % 4), (curr.cell, (curr.heading + 1) % 4)]
+        ahead = self.forward_cell(curr.cell, curr.heading)
+        if ahead is not None and self.h_flat[0][ahead] != UNREACHABLE:
+            moves.append((ahead, curr.heading))
+
+        for cell, heading in moves:
+            loc = self.locs[cell]
+            if table.violates(curr_loc, loc, timestep):
+                continue
+            conflicts = curr.conflicts + self.count_conflicts(0, curr.cell, cell, timestep)
+            children.append(RotationNode(cell, heading, timestep, self.heuristic(cell, heading), curr, conflicts))
+        return children
+
+    def get_path(self, goal_node):
+        path = []
+        curr = goal_node
+        while curr is not None:
+            path.append(self.locs[curr.cell])
+            curr = curr.parent
+        path.reverse()
+        # remove trailing duplicates (waits or rotations at the goal)
+        while len(path) > 1 and path[-1] == path[-2]:
+            path.pop()
+        return [path]
+
+    def find_paths(self):
+
+        if len(self.agents) > 1:
+            return super().find_paths()
+
+        self.start_time = timer.time()
+
+        print("> build constraint table")
+        self.c_table.append(self.build_constraint_table(self.agents[0]))
+        self.max_constraints[0] = self.c_table[0].max_timestep
+
+        start_cell = self.start_cells[0]
+        if self.h_flat[0][start_cell] == UNREACHABLE or self.start_blocked():
+            print('no solution')
+            return None
+
+        heading = self.start_headings[0]
+        root = RotationNode(start_cell, heading, 0, self.heuristic(start_cell, heading), None)
+        self.push_node(root)
+        best = {self.state_key(root): root}
+
+        closed = set()
+        while len(self.rotation_open_list) > 0:
+            curr = self.pop_node()
+            key = self.state_key(curr)
+            if key in closed:
+                continue
+            closed.add(key)
+
+            if self.goal_reached(0, curr.cell, curr.g_val):
+                self.solution = curr
+                return self.get_path(curr)
+
+            for child in self.generate_child_nodes(curr):
+                child_key = self.state_key(child)
+                if child_key in closed:
+                    continue
+                existing = best.get(child_key)
+                if existing is not None and (existing.g_val, existing.conflicts) <= (child.g_val, child.conflicts):
+                    continue
+                best[child_key] = child
+                self.push_node(child)
+
+        print('no solution')
+        return None
+
+
+def rotation_llsolver(headings):
+    """Rotation_A_Star with the initial headings of the agents, usable as the llsolver of CBS or PBS"""
+    return partial(Rotation_A_Star, headings=headings)
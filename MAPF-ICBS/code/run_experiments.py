@@ -2,13 +2,19 @@
 import argparse
 import glob
 from pathlib import Path
+from types import SimpleNamespace
 from cbs_basic import CBSSolver # original cbs with standard/disjoint splitting
 
 # cbs with different improvements
 from icbs_cardinal_bypass import ICBS_CB_Solver # only cardinal dectection and bypass
 from icbs_complete import ICBS_Solver # all improvements including MA-CBS
+from ecbs import ECBSSolver, SUBOPTIMALITY # bounded-suboptimal cbs with focal search
+from pbs import PBSSolver # priority-based search, fast but not optimal
 
 
+from low_level_solvers import get_llsolver, LLSOLVERS
+from hl_heuristics import HL_HEURISTICS
+
 from independent import IndependentSolver
 from prioritized import PrioritizedPlanningSolver
 from visualize import Animation
@@ -18,6 +24,15 @@ HLSOLVER = "CBS"
 
 LLSOLVER = "a_star"
 
+HLHEURISTIC = "none"
+
+def node_reduction(nodes_exp, baseline_exp):
+    """share of the baseline's expanded nodes saved, n/a if the baseline expanded none"""
+    if baseline_exp == 0:
+        return "n/a"
+    return "{:.0%} fewer".format(1 - nodes_exp / baseline_exp)
+
+
 def print_mapf_instance(my_map, starts, goals):
     print('Start locations')
     print_locations(my_map, starts)
@@ -86,11 +101,39 @@ if __name__ == '__main__':
     parser.add_argument('--disjoint', action='store_true', default=False,
                         help='Use the disjoint splitting')
     parser.add_argument('--hlsolver', type=str, default=HLSOLVER,
-                        help='The solver to use (one of: {CBS,ICBS_CB,ICBS}), defaults to ' + str(HLSOLVER))
-    # parser.add_argument('--llsolver', type=str, default=LLSOLVER,
-    #                     help='The solver to use (one of: {a_star,pea_star,epea_star}), defaults to ' + str(LLSOLVER))
+                        help='The solver to use (one of: {CBS,ICBS_CB,ICBS,ECBS,PBS}), defaults to ' + str(HLSOLVER))
+    parser.add_argument('--nocat', action='store_true', default=False,
+                        help='Disable the conflict avoidance table tie-breaking of CBS')
+    parser.add_argument('--llsolver', type=str, default=LLSOLVER,
+                        help='The low-level solver to use (one of: {' + ','.join(LLSOLVERS) + '}), defaults to ' + str(LLSOLVER))
+    parser.add_argument('--hlheuristic', type=str, default=HLHEURISTIC,
+                        help='The high-level heuristic of ICBS (one of: {' + ','.join(HL_HEURISTICS) + '}), defaults to '
+                             + str(HLHEURISTIC) + '; reports the node reduction against a run without it')
+    parser.add_argument('--w', type=float, default=SUBOPTIMALITY,
+                        help='The suboptimality factor of ECBS (>= 1), defaults to ' + str(SUBOPTIMALITY))
+    parser.add_argument('--workers', type=int, default=0,
+                        help='The number of processes for the low-level searches of CBS child nodes (0 for none)')
+    parser.add_argument('--lookahead', type=int, default=1,
+                        help='With --workers, also start the child searches of the next open nodes of CBS, defaults to 1')
+    parser.add_argument('--k', type=int, default=0,
+                        help='k-robustness of CBS and ICBS: paths that stay collision-free with delays of up to k timesteps, defaults to 0')
+    parser.add_argument('--incremental', action='store_true', default=False,
+                        help='Continue the parent CT node\'s low-level search when CBS or ICBS replans an agent')
     args = parser.parse_args()
 
+    llsolver = get_llsolver(args.llsolver)
+    if args.hlheuristic != HLHEURISTIC and args.hlsolver != "ICBS":
+        raise RuntimeError("High-level heuristics are only supported by ICBS")
+    if args.workers and args.hlsolver != "CBS":
+        raise RuntimeError("Worker processes are only supported by CBS")
+    if args.k and args.hlsolver not in ("CBS", "ICBS"):
+        raise RuntimeError("k-robustness is only supported by CBS and ICBS")
+    if args.incremental and args.hlsolver not in ("CBS", "ICBS"):
+        raise RuntimeError("Incremental low-level searches are only supported by CBS and ICBS")
+    if args.incremental and args.workers:
+        raise RuntimeError("Incremental low-level searches can't run in worker processes")
+    reductions = [] # (file, nodes expanded with the heuristic, without it)
+
 
     result_file = open("results.csv", "w", buffering=1)
 
@@ -117,7 +160,9 @@ if __name__ == '__main__':
 
         if args.hlsolver == "CBS":
             print("***Run CBS***")
-            cbs = CBSSolver(my_map, starts, goals)
+            agents = [SimpleNamespace(id=i, start=starts[i], goal=goals[i], delay=0) for i in range(len(starts))]
+            cbs = CBSSolver(my_map, agents, llsolver=llsolver, use_cat=not args.nocat, workers=args.workers,
+                            lookahead=args.lookahead, k=args.k, incremental=args.incremental)
             # solution = cbs.find_solution(args.disjoint)
 
             # if solution is not None:
@@ -130,12 +175,15 @@ if __name__ == '__main__':
 
         elif args.hlsolver == "ICBS_CB":
             print("***Run ICBS with CB***")
+            if args.llsolver != LLSOLVER:
+                raise RuntimeError("ICBS_CB only supports the " + LLSOLVER + " low-level solver")
             cbs = ICBS_CB_Solver(my_map, starts, goals)
  
 
         elif args.hlsolver == "ICBS":
             print("***Run ICBS***")
-            cbs = ICBS_Solver(my_map, starts, goals)
+            cbs = ICBS_Solver(my_map, starts, goals, llsolver=llsolver, hl_heuristic=args.hlheuristic, k=args.k,
+                              incremental=args.incremental)
             # solution = cbs.find_solution(args.disjoint)
 
             # if solution is not None:
@@ -148,6 +196,18 @@ if __name__ == '__main__':
 
 
 
+        elif args.hlsolver == "ECBS":
+            print("***Run ECBS with w = {}***".format(args.w))
+            if args.llsolver != LLSOLVER:
+                raise RuntimeError("ECBS only supports its own focal " + LLSOLVER + " low-level solver")
+            agents = [SimpleNamespace(id=i, start=starts[i], goal=goals[i], delay=0) for i in range(len(starts))]
+            cbs = ECBSSolver(my_map, agents, w=args.w)
+
+        elif args.hlsolver == "PBS":
+            print("***Run PBS***")
+            agents = [SimpleNamespace(id=i, start=starts[i], goal=goals[i], delay=0) for i in range(len(starts))]
+            cbs = PBSSolver(my_map, agents, llsolver=llsolver, use_cat=not args.nocat)
+
         # elif args.solver == "Independent":
         #     print("***Run Independent***")
         #     solver = IndependentSolver(my_map, starts, goals)
@@ -178,6 +238,10 @@ if __name__ == '__main__':
         nodes_gen_file.write("{},{}\n".format(file, nodes_gen))
         nodes_exp_file.write("{},{}\n".format(file, nodes_exp))
 
+        if args.hlheuristic != HLHEURISTIC:
+            print("***Run ICBS without the high-level heuristic***")
+            baseline = ICBS_Solver(my_map, starts, goals, llsolver=llsolver, k=args.k).find_solution(args.disjoint)
+            reductions.append((file, nodes_exp, baseline[2]))
 
 
         if not args.batch:
@@ -188,3 +252,13 @@ if __name__ == '__main__':
             # animation.save('demo/fig.gif', 1)
 
     result_file.close()
+
+    if reductions:
+        print("***Node reduction of the {} heuristic***".format(args.hlheuristic))
+        for file, nodes_exp, baseline_exp in reductions:
+            print("{}: {} expanded nodes, {} without ({})".format(
+                file, nodes_exp, baseline_exp, node_reduction(nodes_exp, baseline_exp)))
+        total_exp = sum(nodes_exp for _, nodes_exp, _ in reductions)
+        total_baseline = sum(baseline_exp for _, _, baseline_exp in reductions)
+        print("total: {} expanded nodes, {} without ({})".format(
+            total_exp, total_baseline, node_reduction(total_exp, total_baseline)))
@@ -1,5 +1,8 @@
 import heapq
 
+from heuristics import compute_all_heuristics
+from constraint_index import ConstraintIndex
+
 def move(loc, dir):
     directions = [(0, -1), (1, 0), (0, 1), (-1, 0), (0, 0)]
     return loc[0] + directions[dir][0], loc[1] + directions[dir][1]
@@ -15,75 +18,17 @@ def get_sum_of_cost(agents):
 
 
 def compute_heuristics(my_map, goal):
-    # Use Dijkstra to build a shortest-path tree rooted at the goal location
-    open_list = []
-    closed_list = dict()
-    root = {'loc': goal, 'cost': 0}
-    heapq.heappush(open_list, (root['cost'], goal, root))
-    closed_list[goal] = root
-    while len(open_list) > 0:
-        (cost, loc, curr) = heapq.heappop(open_list)
-        for dir in range(4):
-            child_loc = move(loc, dir)
-            child_cost = cost + 1
-            if child_loc[0] < 0 or child_loc[0] >= len(my_map) \
-               or child_loc[1] < 0 or child_loc[1] >= len(my_map[0]):
-               continue
-            if my_map[child_loc[0]][child_loc[1]]:
-                continue
-            child = {'loc': child_loc, 'cost': child_cost}
-            if child_loc in closed_list:
-                existing_node = closed_list[child_loc]
-                if existing_node['cost'] > child_cost:
-                    closed_list[child_loc] = child
-                    # open_list.delete((existing_node['cost'], existing_node['loc'], existing_node))
-                    heapq.heappush(open_list, (child_cost, child_loc, child))
-            else:
-                closed_list[child_loc] = child
-                heapq.heappush(open_list, (child_cost, child_loc, child))
-
-    # build the heuristics table
-    h_values = dict()
-    for loc, node in closed_list.items():
-        h_values[loc] = node['cost']
-    return h_values
+    # BFS wavefront over the occupancy array; see heuristics.compute_all_heuristics for all goals at once
+    return compute_all_heuristics(my_map, [goal])[0]
 
 
 def build_constraint_table(constraints, agent):
     ##############################
-    # Task 1.2/1.3: Return a table that constains the list of constraints of
-    #               the given agent for each time step. The table can be used
-    #               for a more efficient constraint violation check in the 
-    #               is_constrained function.
-    table =dict()
-    for constraint in constraints:
-        if constraint['agent'] == agent:
-            if constraint['timestep'] not in table:
-                table[constraint['timestep']] = [constraint]
-            else:
-                table[constraint['timestep']].append(constraint)
-        # task 4
-        if constraint['agent'] != agent and constraint['positive'] ==True:
-            if len(constraint['loc'])>1:
-                cons_i = {'agent':agent,
-                            'loc':[constraint['loc'][1],constraint['loc'][0]],
-                            'timestep':constraint['timestep'],
-                            'positive':False
-                            }
-          
-            else:
-                cons_i = {'agent':agent,
-                        'loc':constraint['loc'],
-                        'timestep':constraint['timestep'],
-                        'positive':False
-                        }
-            if cons_i['timestep'] not in table:
-                table[cons_i['timestep']] = [cons_i]
-            else:
-                table[cons_i['timestep']].append(cons_i)
-
-    return table
-    # pass
+    # Task 1.2/1.3: Return a table that constains the constraints of
+    #               the given agent, indexed by time step and location so that
+    #               is_constrained is a couple of hash lookups.
+    #               Positive constraints of other agents become negative ones (task 4).
+    return ConstraintIndex(constraints, agent)
 
 
 def get_location(path, time):
@@ -109,23 +54,13 @@ def is_constrained(curr_loc, next_loc, next_time, constraint_table):
     ##############################
     # Task 1.2/1.3: Check if a move from curr_loc to next_loc at time step next_time violates
     #               any given constraint. For efficiency the constraints are indexed in a constraint_table
-    #               by time step, see build_constraint_table.
-    if next_time in constraint_table:  
-        for constraint in constraint_table[next_time]:
-            if len(constraint['loc']) ==1:
-                if constraint['loc'] == [next_loc]:
-                    if constraint['positive']==True:
-                        return 1
-                    else:
-                        return 0
-            else:
-                if constraint['loc'] ==[curr_loc,next_loc]:
-                    if constraint['positive']==True:
-                        return 1
-                    else:
-                        return 0
-    return -1   
-    pass
+    #               by time step and location, see build_constraint_table.
+    # 0: forbidden by a negative constraint, 1: enforced by a positive one, -1: unconstrained
+    if constraint_table.is_forbidden(curr_loc, next_loc, next_time):
+        return 0
+    if constraint_table.is_required(curr_loc, next_loc, next_time):
+        return 1
+    return -1
 
 
 def push_node(open_list, node):
@@ -168,13 +103,7 @@ def a_star(my_map, start_loc, goal_loc, h_values, agent, constraints):
         #############################
         # Task 1.4: Adjust the goal test condition to handle goal constraints
         if curr['loc'] == goal_loc:
-            no_future_goalConstraint = True
-            for timestep in table:
-                if timestep >curr['timestep']:
-                    for cons in table[timestep]:
-                        if cons['loc'] == [goal_loc] and cons['positive']==False:
-                            no_future_goalConstraint =False
-            if no_future_goalConstraint:
+            if not table.vertex_blocked_after(goal_loc, curr['timestep']):
                 return get_path(curr)
             
         continue_flag = False
@@ -0,0 +1,191 @@
+import heapq
+import time as timer
+from bisect import bisect_right
+
+from a_star_class import A_Star, UNREACHABLE
+
+INF = float('inf')
+
+
+class SIPPNode(object):
+    __slots__ = ('cell', 'interval', 'g_val', 'h_val', 'parent')
+
+    def __init__(self, cell, interval, g_val, h_val, parent):
+        self.cell = cell
+        self.interval = interval # index into the safe intervals of cell
+        self.g_val = g_val # arrival time at cell
+        self.h_val = h_val
+        self.parent = parent
+
+
+class SIPP(A_Star):
+    """Safe Interval Path Planning with the same interface as A_Star.
+
+    A search state is (cell, safe interval) instead of (cell, timestep). The safe intervals of a
+    cell are the maximal timestep ranges without a vertex constraint on it; they are compiled
+    lazily from the constraint index of the agent:
+        - negative vertex constraints block their cell at their timestep
+        - positive constraints (e.g. the delay constraints of CBSSolver) pin the agent to one cell,
+          so they block every other cell at their timestep
+        - reserved paths (see ReservationTable) block their cells, a reserved goal up to the horizon
+    Waiting inside an interval is free for the search, so the number of expanded states no longer
+    depends on how long the agent has to wait. Meta-agents (more than one agent) fall back to A_Star.
+    The conflict avoidance table is only used by that fallback; a SIPP state covers many timesteps.
+    """
+
+    resumable = False # a state covers many timesteps
+
+    def __init__(self,my_map,starts,goals,heuristics,agents,contraints,cat=None,reservations=None):
+        super().__init__(my_map,starts,goals,heuristics,agents,contraints,cat,reservations)
+        self.intervals = dict() # cell -> [(start, end), ...] sorted safe intervals
+        self.sipp_open_list = []
+
+    def compile_constraints(self):
+        """per cell timesteps of negative vertex constraints and the timesteps of positive constraints"""
+        table = self.c_table[0]
+        self.neg_times = dict() # cell -> [timestep, ...]
+        for timestep, loc in table.neg_vertex:
+            self.neg_times.setdefault(self.cell(loc), []).append(timestep)
+
+        self.neg_ranges = dict() # cell -> [(first, last), ...] timesteps of reserved goals
+        reservations = table.reservations
+        if reservations is not None:
+            for timestep, loc in reservations.vertex:
+                self.neg_times.setdefault(self.cell(loc), []).append(timestep)
+            for loc, arrival in reservations.goal.items():
+                self.neg_ranges.setdefault(self.cell(loc), []).append((arrival, reservations.horizon))
+
+        # timestep -> cells the agent has to be at
+        required = dict()
+        for timestep, moves in enumerate(table.positive):
+            for from_loc, to_loc in moves:
+                required.setdefault(timestep, set()).add(self.cell(to_loc))
+                if from_loc is not None and timestep > 0:
+                    # a positive edge constraint also pins the agent to from_loc one timestep earlier
+                    required.setdefault(timestep - 1, set()).add(self.cell(from_loc))
+        self.required = required
+
+    def get_intervals(self, cell):
+        intervals = self.intervals.get(cell)
+        if intervals is None:
+            unsafe = set(self.neg_times.get(cell, ()))
+            for timestep, cells in self.required.items():
+                if cells != {cell}:
+                    unsafe.add(timestep)
+
+            intervals = []
+            start = 0
+            for first, last in sorted([(timestep, timestep) for timestep in unsafe] + self.neg_ranges.get(cell, [])):
+                if first > start:
+                    intervals.append((start, first - 1))
+                start = max(start, last + 1)
+            intervals.append((start, INF))
+            self.intervals[cell] = intervals
+        return intervals
+
+    def push_node(self, node):
+        f_value = node.g_val + node.h_val
+
+        heapq.heappush(self.sipp_open_list, (f_value, node.h_val, node.cell, node.interval, self.num_generated, node))
+        self.num_generated += 1
+
+    def pop_node(self):
+        _,_,_,_, id, curr = heapq.heappop(self.sipp_open_list)
+
+        self.num_expanded += 1
+        return curr
+
+    def generate_child_nodes(self, curr):
+        children = []
+        table = self.c_table[0]
+        h_flat = self.h_flat[0]
+        curr_loc = self.locs[curr.cell]
+        # the agent can leave curr.cell at any timestep of its interval (from its arrival on)
+        leave_end = self.get_intervals(curr.cell)[curr.interval][1]
+
+        for next_cell in self.get_neighbours(curr.cell):
+            if next_cell == curr.cell or h_flat[next_cell] == UNREACHABLE:
+                continue
+            next_loc = self.locs[next_cell]
+            intervals = self.get_intervals(next_cell)
+
+            # first interval that can contain the arrival time
+            k = max(bisect_right(intervals, (curr.g_val + 1, INF)) - 1, 0)
+            for k in range(k, len(intervals)):
+                start, end = intervals[k]
+                if start > leave_end + 1:
+                    break
+                if end < curr.g_val + 1:
+                    continue
+                # earliest arrival inside the interval that doesn't use a constrained edge
+                arrival = max(curr.g_val + 1, start)
+                last_arrival = min(end, leave_end + 1)
+                while arrival <= last_arrival and table.is_forbidden(curr_loc, next_loc, arrival):
+                    arrival += 1
+                if arrival > last_arrival:
+                    continue
+                children.append(SIPPNode(next_cell, k, arrival, h_flat[next_cell], curr))
+
+        return children
+
+    def get_path(self, goal_node):
+        # expand the (cell, interval) chain to one location per timestep
+        nodes = []
+        curr = goal_node
+        while curr is not None:
+            nodes.append(curr)
+            curr = curr.parent
+        nodes.reverse()
+
+        path = [self.locs[nodes[0].cell]]
+        for node in nodes[1:]:
+            # wait at the previous cell until one timestep before the arrival
+            while len(path) < node.g_val:
+                path.append(path[-1])
+            path.append(self.locs[node.cell])
+        return [path]
+
+    def find_paths(self):
+
+        if len(self.agents) > 1:
+            return super().find_paths()
+
+        self.start_time = timer.time()
+
+        print("> build constraint table")
+        self.c_table.append(self.build_constraint_table(self.agents[0]))
+        self.max_constraints[0] = self.c_table[0].max_timestep
+        self.compile_constraints()
+
+        start_cell = self.start_cells[0]
+        goal_cell = self.goal_cells[0]
+        start_intervals = self.get_intervals(start_cell)
+        if start_intervals[0][0] != 0:
+            print('no solution')
+            return None
+
+        root = SIPPNode(start_cell, 0, 0, self.h_flat[0][start_cell], None)
+        self.push_node(root)
+        best_g = {(root.cell, root.interval): 0} # earliest known arrival per state
+
+        closed = set()
+        while len(self.sipp_open_list) > 0:
+            curr = self.pop_node()
+            key = (curr.cell, curr.interval)
+            if key in closed:
+                continue
+            closed.add(key)
+
+            # the agent can stay at its goal forever only in the last (unbounded) interval
+            if curr.cell == goal_cell and self.get_intervals(curr.cell)[curr.interval][1] == INF:
+                return self.get_path(curr)
+
+            for child in self.generate_child_nodes(curr):
+                child_key = (child.cell, child.interval)
+                if child_key in closed or best_g.get(child_key, INF) <= child.g_val:
+                    continue
+                best_g[child_key] = child.g_val
+                self.push_node(child)
+
+        print('no solution')
+        return None
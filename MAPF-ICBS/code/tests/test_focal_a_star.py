@@ -0,0 +1,11 @@
+from focal_a_star_class import Focal_A_Star
+from heuristics import compute_all_heuristics
+
+
+def test_blocked_start_has_no_path():
+    my_map = [[False] * 4 for _ in range(4)]
+    heuristics = compute_all_heuristics(my_map, [(3, 3)])
+    constraints = [{'agent': 0, 'loc': [(0, 0)], 'timestep': 0, 'end': 1, 'positive': False}]
+    search = Focal_A_Star(my_map, [(0, 0)], [(3, 3)], heuristics, 0, constraints, w=1.5)
+    assert search.find_paths() is None
+    assert search.num_expanded == 0
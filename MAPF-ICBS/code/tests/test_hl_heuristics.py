@@ -0,0 +1,39 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from run_experiments import import_mapf_instance
+from a_star_class import A_Star, get_sum_of_cost
+from cbs_basic import CBSSolver
+from icbs_complete import ICBS_Solver
+from hl_heuristics import pair_cost
+
+INSTANCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instances')
+
+# instances on which the joint-search edge weights used to overestimate
+REGRESSIONS = ['test_16.txt', 'test_18.txt', 'test_32.txt', 'test_43.txt']
+
+
+def load(name):
+    return import_mapf_instance(os.path.join(INSTANCES, name))
+
+
+def cbs_cost(my_map, starts, goals):
+    agents = [SimpleNamespace(id=i, start=starts[i], goal=goals[i], delay=0) for i in range(len(starts))]
+    paths, _, _ = CBSSolver(my_map, agents).find_solution(False)
+    return get_sum_of_cost(paths)
+
+
+@pytest.mark.parametrize('name', REGRESSIONS)
+@pytest.mark.parametrize('hl_heuristic', ['dg', 'wdg'])
+def test_dependency_graph_heuristics_keep_cbs_cost(name, hl_heuristic):
+    my_map, starts, goals = load(name)
+    paths, _, _ = ICBS_Solver(my_map, starts, goals, hl_heuristic=hl_heuristic).find_solution(False)
+    assert get_sum_of_cost(paths) == cbs_cost(my_map, starts, goals)
+
+
+def test_pair_cost_charges_goal_waits():
+    my_map, starts, goals = load('test_16.txt')
+    solver = ICBS_Solver(my_map, starts, goals)
+    assert pair_cost(solver, A_Star, [3, 4], []) == cbs_cost(my_map, [starts[3], starts[4]], [goals[3], goals[4]])
@@ -0,0 +1,29 @@
+from multi_agent_planner import build_constraint_table, future_constraint_exists
+
+
+def test_own_negative_vertex_blocks_goal_wait():
+    table = build_constraint_table([{'agent': 0, 'loc': [(1, 1)], 'timestep': 4, 'positive': False}], [0, 1])
+    assert future_constraint_exists(0, [0, 1], (1, 1), 2, table)
+    assert not future_constraint_exists(0, [0, 1], (1, 1), 4, table)
+    assert not future_constraint_exists(1, [0, 1], (1, 1), 2, table)
+
+
+def test_own_negative_edge_blocks_goal_wait_at_destination():
+    table = build_constraint_table([{'agent': 0, 'loc': [(1, 1), (1, 2)], 'timestep': 3, 'positive': False}], [0])
+    assert future_constraint_exists(0, [0], (1, 2), 1, table)
+    assert not future_constraint_exists(0, [0], (1, 1), 1, table)
+
+
+def test_other_positive_vertex_blocks_goal_wait():
+    table = build_constraint_table([{'agent': 1, 'loc': [(2, 2)], 'timestep': 5, 'positive': True}], [0, 1])
+    assert future_constraint_exists(0, [0, 1], (2, 2), 3, table)
+    assert not future_constraint_exists(1, [0, 1], (2, 2), 3, table)
+
+
+def test_other_positive_edge_blocks_goal_wait_at_both_ends():
+    # agent 1 must move (2, 2) -> (2, 3) at timestep 5: agent 0 can't wait at either end
+    table = build_constraint_table([{'agent': 1, 'loc': [(2, 2), (2, 3)], 'timestep': 5, 'positive': True}], [0, 1])
+    assert future_constraint_exists(0, [0, 1], (2, 3), 3, table)
+    assert future_constraint_exists(0, [0, 1], (2, 2), 3, table)
+    assert not future_constraint_exists(0, [0, 1], (2, 3), 5, table)
+    assert not future_constraint_exists(1, [0, 1], (2, 3), 3, table)
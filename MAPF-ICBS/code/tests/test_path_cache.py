@@ -0,0 +1,21 @@
+from path_cache import PathCache, constraint_signature
+
+
+def test_other_positive_edge_differs_from_own_reversed_negative():
+    # both forbid agent 0 to move (2, 3) -> (2, 2) at timestep 5, but only the positive one blocks waiting at (2, 3)
+    own = [{'agent': 0, 'loc': [(2, 3), (2, 2)], 'timestep': 5, 'positive': False}]
+    other = [{'agent': 1, 'loc': [(2, 2), (2, 3)], 'timestep': 5, 'positive': True}]
+    assert constraint_signature(0, own) != constraint_signature(0, other)
+    assert PathCache.key(0, own) != PathCache.key(0, other)
+
+
+def test_unrelated_constraints_are_left_out():
+    constraints = [{'agent': 0, 'loc': [(1, 1)], 'timestep': 2, 'positive': False}]
+    unrelated = [{'agent': 1, 'loc': [(3, 3)], 'timestep': 4, 'positive': False}]
+    assert constraint_signature(0, constraints) == constraint_signature(0, constraints + unrelated)
+
+
+def test_range_constraint_matches_one_constraint_per_timestep():
+    ranged = [{'agent': 0, 'loc': [(1, 1)], 'timestep': 2, 'end': 4, 'positive': False}]
+    split = [{'agent': 0, 'loc': [(1, 1)], 'timestep': t, 'positive': False} for t in range(2, 5)]
+    assert constraint_signature(0, ranged) == constraint_signature(0, split)
@@ -0,0 +1,39 @@
+import os
+from types import SimpleNamespace
+
+from run_experiments import import_mapf_instance
+from a_star_class import A_Star
+from collision_table import CollisionTable, ReservationTable
+from heuristics import compute_all_heuristics
+from pbs import PBSSolver
+
+INSTANCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instances')
+
+
+def test_reservations_block_path_edges_and_goal_until_horizon():
+    reservations = ReservationTable(horizon=6)
+    reservations.add([(0, 0), (0, 1), (0, 2)])
+    assert reservations.blocks((1, 1), (0, 1), 1)  # vertex
+    assert reservations.blocks((0, 1), (0, 0), 1)  # swap
+    assert not reservations.blocks((0, 0), (0, 1), 2)
+    assert reservations.blocks((1, 2), (0, 2), 6)  # goal wait
+    assert not reservations.blocks((1, 2), (0, 2), 7)
+    assert reservations.vertex_reserved_after((0, 2), 5)
+    assert not reservations.vertex_reserved_after((0, 2), 6)
+
+
+def test_low_level_waits_for_reserved_goal_to_clear():
+    my_map = [[False] * 3]
+    reservations = ReservationTable(horizon=4)
+    reservations.add([(0, 1)])
+    heuristics = compute_all_heuristics(my_map, [(0, 1)])
+    search = A_Star(my_map, [(0, 0)], [(0, 1)], heuristics, 0, [], reservations=reservations)
+    assert search.find_paths() == [[(0, 0)] * 5 + [(0, 1)]]
+
+
+def test_pbs_paths_are_collision_free():
+    my_map, starts, goals = import_mapf_instance(os.path.join(INSTANCES, 'test_50.txt'))
+    agents = [SimpleNamespace(id=i, start=starts[i], goal=goals[i], delay=0) for i in range(len(starts))]
+    paths, _, _ = PBSSolver(my_map, agents).find_solution()
+    assert [path[0] for path in paths] == starts and [path[-1] for path in paths] == goals
+    assert not CollisionTable(paths).pairs
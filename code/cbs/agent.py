@@ -6,7 +6,7 @@ class Agent:
         self.delay = delay
         self.path = []
         self._final_path = None
-        self.direction = None
+        self.direction = None  # 초기 방향 (north, east, south, west): rotation_a_star 계획에 사용, None이면 north
 
     def set_path(self, path):
         self.path = path
@@ -2,45 +2,136 @@
 from cbs_basic import CBSSolver
 from icbs_cardinal_bypass import ICBS_CB_Solver
 from icbs_complete import ICBS_Solver
+from ecbs import ECBSSolver, SUBOPTIMALITY
+from pbs import PBSSolver
+from cbs.portfolio import Portfolio
+from budget import Budget, solve, TIMED_OUT
+from lns import LNS
+from low_level_solvers import get_llsolver
+from rotation_a_star import rotation_llsolver
 from visualize import Animation
 from single_agent_planner import get_sum_of_cost
 
 class CBSManager:
-    def __init__(self, solver_type="ICBS", disjoint=False, visualize_result=True):
+    def __init__(self, solver_type="ICBS", disjoint=False, visualize_result=True, llsolver="a_star",
+                 w=SUBOPTIMALITY, hl_heuristic="none", deadline=None, time_limit=None, node_limit=None,
+                 memory_limit=None, k=0, incremental=False):
         self.solver_type = solver_type
+        # 저수준 탐색: a_star, od_a_star, pea_star, epea_star, sipp, rotation_a_star
+        # rotation_a_star는 회전에도 시간이 걸리는 계획 (초기 방향은 agent.direction, CBS/PBS만 지원)
+        self.llsolver = llsolver
+        self.w = w  # ECBS suboptimality 계수: 해의 비용 <= w * 최적 비용
+        self.hl_heuristic = hl_heuristic  # ICBS 고수준 휴리스틱: none, cg, dg, wdg
+        self.deadline = deadline  # PORTFOLIO: None이면 처음 나온 해, 초 단위 값이면 그때까지 나온 가장 좋은 해
+        # 고수준 탐색 제한 (초, CT 노드 수, MB); 초과하면 prioritized fallback 경로를 사용
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.memory_limit = memory_limit
+        # k-robust 계획 (CBS, ICBS만 지원): 다른 로봇이 k 스텝 안에 있었거나 있을 칸에는 들어가지 않으므로
+        # 로봇이 k 스텝까지 늦어져도 충돌하지 않음 (makespan이 조금 늘어나는 대신 재계획이 줄어듦)
+        self.k = k
+        # 증분 저수준 탐색 (CBS, ICBS만 지원): 자식 CT 노드의 재계획이 부모 노드의 탐색을 이어서 진행
+        self.incremental = incremental
+        self.result = None  # 마지막 run()의 SolverResult
         self.disjoint = disjoint
         self.visualize_result = visualize_result
         self.agents = []
+        self.heuristics = None
+        self.initial_paths = None
 
-    def load_instance(self, my_map, agents):
+    def load_instance(self, my_map, agents, heuristics=None, initial_paths=None):
         self.my_map = my_map
         self.agents = agents
+        self.heuristics = heuristics  # None이면 solver가 직접 계산
+        # {에이전트 index: 경로}: CT 루트에서 그대로 쓸 경로 (실행 중인 계획의 남은 부분, CBS만 지원)
+        self.initial_paths = initial_paths
+
+    def create_budget(self):
+        """제한이 하나도 없으면 None (solver의 기본값 사용)"""
+        if self.time_limit is None and self.node_limit is None and self.memory_limit is None:
+            return None
+        return Budget(self.time_limit, self.node_limit, self.memory_limit)
+
+    def get_llsolver(self):
+        if self.llsolver == "rotation_a_star":
+            if self.solver_type not in ("CBS", "PBS"):
+                # meta-agent, MDD 등은 회전을 모르므로 단일 에이전트 저수준 탐색만 쓰는 solver만 지원
+                raise ValueError(f"{self.solver_type} does not support llsolver: {self.llsolver}")
+            return rotation_llsolver([agent.direction for agent in self.agents])
+        return get_llsolver(self.llsolver)
 
     def create_solver(self):
+        starts = [agent.start for agent in self.agents]
+        goals = [agent.goal for agent in self.agents]
+        llsolver = self.get_llsolver()
+        budget = self.create_budget()
+        if self.k and self.solver_type not in ("CBS", "ICBS"):
+            raise ValueError(f"{self.solver_type} does not support k-robust planning (k={self.k})")
+        if self.incremental and self.solver_type not in ("CBS", "ICBS"):
+            raise ValueError(f"{self.solver_type} does not support incremental low-level searches")
         if self.solver_type == "CBS":
-            return CBSSolver(self.my_map, self.agents)
+            return CBSSolver(self.my_map, self.agents, heuristics=self.heuristics, llsolver=llsolver, budget=budget,
+                             initial_paths=self.initial_paths, k=self.k, incremental=self.incremental)
         elif self.solver_type == "ICBS_CB":
-            return ICBS_CB_Solver(self.my_map, self.agents)
+            # ICBS_CB는 single_agent_planner의 a_star 함수만 사용
+            if self.llsolver != "a_star":
+                raise ValueError(f"ICBS_CB does not support llsolver: {self.llsolver}")
+            return ICBS_CB_Solver(self.my_map, starts, goals, heuristics=self.heuristics, budget=budget)
         elif self.solver_type == "ICBS":
-            return ICBS_Solver(self.my_map, self.agents)
+            return ICBS_Solver(self.my_map, starts, goals, heuristics=self.heuristics, llsolver=llsolver,
+                               hl_heuristic=self.hl_heuristic, budget=budget, k=self.k, incremental=self.incremental)
+        elif self.solver_type == "ECBS":
+            # ECBS는 자체 focal 저수준 탐색(Focal_A_Star)을 사용
+            if self.llsolver != "a_star":
+                raise ValueError(f"ECBS does not support llsolver: {self.llsolver}")
+            return ECBSSolver(self.my_map, self.agents, w=self.w, heuristics=self.heuristics, budget=budget)
+        elif self.solver_type == "PBS":
+            # 우선순위 탐색: 최적은 아니지만 에이전트가 많을 때 CBS보다 훨씬 빠름
+            return PBSSolver(self.my_map, self.agents, heuristics=self.heuristics, llsolver=llsolver, budget=budget)
         else:
             raise ValueError(f"Unknown solver type: {self.solver_type}")
 
     def run(self):
-        solver = self.create_solver()
-        result = solver.find_solution(self.disjoint)
+        if self.initial_paths and self.solver_type != "CBS":
+            raise ValueError(f"initial_paths is only supported by CBS, not {self.solver_type}")
+        if self.solver_type == "PORTFOLIO":
+            if self.k:
+                raise ValueError(f"PORTFOLIO does not support k-robust planning (k={self.k})")
+            if self.incremental:
+                raise ValueError("PORTFOLIO does not support incremental low-level searches")
+            # 여러 solver를 별도 프로세스에서 동시에 실행
+            solver = None
+            portfolio = Portfolio(deadline=self.deadline, budget=self.create_budget())
+            winner = portfolio.run(self.my_map, self.agents, self.heuristics, self.disjoint,
+                                   self.get_llsolver())
+            self.result = None
+            if winner is not None:
+                solver_name, self.result = winner
+                print(f"Portfolio solver: {solver_name}")
+        else:
+            solver = self.create_solver()
+            # prioritized fallback 경로는 회전 시간도, k-robust 충돌도 모르므로 그때는 쓰지 않음
+            self.result = solve(solver, self.disjoint, fallback=self.llsolver != "rotation_a_star" and not self.k)
 
-        if result is None:
-            print("No solution found.")
+        if self.result is None or self.result.paths is None:
+            status = f" ({self.result.status})" if self.result is not None else ""
+            print(f"No solution found{status}.")
             return None
 
-        paths, nodes_generated, nodes_expanded = result
+        if self.result.status == TIMED_OUT:
+            # 제한 안에 최적해를 찾지 못함: 충돌 없는 fallback 경로 사용
+            print(f"Budget exceeded ({self.result.reason}), using fallback paths.")
+        paths = self.result.paths
+        nodes_generated, nodes_expanded = self.result.generated, self.result.expanded
 
         for agent, path in zip(self.agents, paths):
             agent.set_path(path)
 
         print(f"Total cost: {get_sum_of_cost(paths)}")
         print(f"Nodes generated: {nodes_generated}, Nodes expanded: {nodes_expanded}")
+        path_cache = getattr(solver, "path_cache", None)
+        if path_cache is not None:
+            print(f"Path cache hits: {path_cache.hits}, misses: {path_cache.misses}")
 
         if self.visualize_result:
             animation = Animation(self.my_map,
@@ -51,5 +142,22 @@ class CBSManager:
 
         return [agent.path for agent in self.agents]
 
+    def improve(self, time_limit, neighborhood="adaptive", max_stalls=None):
+        """
+        run()으로 찾은 경로를 LNS로 개선 (time_limit초 동안)
+        max_stalls: 연속으로 이만큼 개선이 없으면 time_limit 전이라도 중단 (None이면 time_limit까지)
+        더 좋은 해가 나올 때마다 에이전트 경로를 바꾸고 (비용, 경과 시간)을 yield
+        """
+        if self.result is None or self.result.paths is None:
+            return
+        lns = LNS(self.my_map, [agent.start for agent in self.agents], [agent.goal for agent in self.agents],
+                  [agent.path for agent in self.agents], heuristics=self.heuristics,
+                  delays=[agent.delay for agent in self.agents], neighborhood=neighborhood)
+        for paths, cost, elapsed in lns.improve(time_limit, max_stalls=max_stalls):
+            for agent, path in zip(self.agents, paths):
+                agent.set_path(path)
+            print(f"LNS: cost {cost} ({elapsed:.2f}s)")
+            yield cost, elapsed
+
     def get_agents(self):
         return self.agents
\ No newline at end of file
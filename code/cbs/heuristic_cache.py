@@ -0,0 +1,103 @@
+import hashlib
+import os
+
+import numpy as np
+
+from heuristics import compute_heuristic_tables, HeuristicTable
+
+# grid/*.json 옆에 저장되는 휴리스틱 캐시 폴더
+DEFAULT_CACHE_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "grid", "cache"))
+
+
+def grid_digest(grid_array):
+    """그리드 내용(장애물 배치 + 크기)의 해시"""
+    grid = np.ascontiguousarray(grid_array, dtype=np.int8)
+    h = hashlib.sha1()
+    h.update(str(grid.shape).encode())
+    h.update(grid.tobytes())
+    return h.hexdigest()[:16]
+
+
+def cache_prefix(rows, cols):
+    # grid.py의 파일 이름 규칙(RRCCgrid.json)과 같은 접두어
+    return f"{rows:02d}{cols:02d}grid_"
+
+
+def clear_cache(rows, cols, cache_dir=DEFAULT_CACHE_FOLDER):
+    """해당 크기 그리드의 캐시 파일 전부 삭제 (그리드 저장 시 호출)"""
+    if not os.path.isdir(cache_dir):
+        return 0
+    prefix = cache_prefix(rows, cols)
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith(".npy"):
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+
+class HeuristicCache:
+    """
+    goal 셀별 휴리스틱(거리) 테이블을 grid 내용 해시로 디스크에 캐싱.
+    테이블은 .npy로 저장하고 memory-map으로 필요할 때만 불러옴.
+    """
+    def __init__(self, grid_array, cache_dir=DEFAULT_CACHE_FOLDER):
+        self.map_array = np.asarray(grid_array).astype(bool)
+        self.rows, self.cols = self.map_array.shape
+        self.cache_dir = cache_dir
+        self.digest = grid_digest(grid_array)
+        self._tables = {}  # goal → HeuristicTable (메모리 캐시)
+        self.hits = 0
+        self.misses = 0
+
+    def table_path(self, goal):
+        r, c = goal
+        return os.path.join(self.cache_dir, f"{cache_prefix(self.rows, self.cols)}{self.digest}_{r}_{c}.npy")
+
+    def _load(self, goal):
+        path = self.table_path(goal)
+        if not os.path.exists(path):
+            return None
+        try:
+            table = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if table.shape != (self.rows, self.cols):
+            return None
+        return HeuristicTable(table)
+
+    def _store(self, goal, table):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.table_path(goal)
+        # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, table)
+        os.replace(tmp_path, path)
+
+    def get_heuristics(self, goals):
+        """goals 순서대로 HeuristicTable 리스트 반환, 캐시에 없는 goal만 한 번에 계산"""
+        missing = []
+        for goal in goals:
+            goal = tuple(goal)
+            if goal in self._tables:
+                self.hits += 1
+                continue
+            table = self._load(goal)
+            if table is not None:
+                self._tables[goal] = table
+                self.hits += 1
+            elif goal not in missing:
+                missing.append(goal)
+
+        if missing:
+            self.misses += len(missing)
+            tables = compute_heuristic_tables(self.map_array, missing)
+            for goal, table in zip(missing, tables):
+                try:
+                    self._store(goal, table)
+                except OSError as e:
+                    print(f"(경고) 휴리스틱 캐시 저장 실패: {e}")
+                self._tables[goal] = HeuristicTable(table)
+
+        return [self._tables[tuple(goal)] for goal in goals]
@@ -1,19 +1,83 @@
 from cbs.cbs_manager import CBSManager
 from cbs.agent import Agent
+from cbs.heuristic_cache import HeuristicCache
+from rolling_horizon import RollingHorizonPlanner, WINDOW, REPLAN_PERIOD
 
 import numpy as np
 import random
+import time
+
+# 고수준 탐색 시간 제한 (초): 넘으면 prioritized fallback 경로를 사용해 UI가 멈추지 않게 함
+TIME_LIMIT = 10
+# 실행 전 LNS 개선 시간 (초)
+LNS_TIME_LIMIT = 2
+# LNS 반복이 이만큼 연속으로 개선하지 못하면 LNS_TIME_LIMIT 전이라도 중단
+LNS_MAX_STALLS = 1
+
+
+def remaining_path(path, position, goal):
+    """
+    실행 중인 경로에서 현재 위치부터 남은 부분 (위치는 경로에서 처음 나오는 곳으로 봄)
+    경로가 goal로 끝나지 않거나 위치가 경로에 없으면 None
+    """
+    path = [tuple(loc) for loc in path]
+    if not path or goal is None or path[-1] != tuple(goal) or tuple(position) not in path:
+        return None
+    rest = path[path.index(tuple(position)):]
+    while len(rest) > 1 and rest[-1] == rest[-2]:  # goal에서 기다리는 부분은 경로에 넣지 않음
+        rest.pop()
+    return rest
+
 
 class PathFinder:
-    def __init__(self, grid_array: np.ndarray):
+    def __init__(self, grid_array: np.ndarray, lifelong=False, window=WINDOW, replan_period=REPLAN_PERIOD,
+                 new_goal=None, rotation_aware=False, portfolio=False):
+        """
+        lifelong: 새 goal을 계속 받는 모드 (RHCR). compute_paths를 replan_period 스텝마다 호출하면
+                  window 스텝 안의 충돌만 풀고 다음 replan_period 스텝의 경로를 돌려줌
+        new_goal: lifelong 모드에서 goal을 마친 에이전트의 다음 goal, new_goal(agent_id, 위치) (None이면 대기)
+        rotation_aware: 회전에도 시간이 걸리는 경로 (초기 방향은 agent.direction)
+                        경로의 회전 스텝은 제자리 대기로 나오므로 CommandSet(rotation_aware=True)로 명령을 만들어야 함
+        portfolio: 여러 solver를 별도 프로세스로 동시에 실행하고 먼저 나온 해를 사용 (PORTFOLIO)
+                   계획마다 프로세스 6개를 새로 띄우므로, 실행 스크립트의 카메라·broker 초기화가
+                   if __name__ == "__main__": 아래에 있어야 함 (Windows의 spawn은 __main__을 다시 import)
+        """
         self.grid = grid_array
         self.map_array = self.grid.astype(bool)
         self.rows, self.cols = self.grid.shape
         self.valid_cells = [
             (r, c) for r in range(self.rows) for c in range(self.cols) if self.grid[r, c] == 0
         ]
-        self.manager = CBSManager(solver_type="CBS", disjoint=True, visualize_result=False)
-
+        self.rotation_aware = rotation_aware
+        if rotation_aware:
+            # 회전 저수준 탐색은 CBS, PBS만 지원: 빠르게 첫 해를 내는 PBS 사용
+            self.manager = CBSManager(solver_type="PBS", visualize_result=False, llsolver="rotation_a_star",
+                                      time_limit=TIME_LIMIT)
+        elif portfolio:
+            # 인스턴스마다 가장 빠른 solver가 다르므로 여러 solver를 동시에 실행하고 먼저 나온 해를 사용
+            self.manager = CBSManager(solver_type="PORTFOLIO", disjoint=True, visualize_result=False,
+                                      time_limit=TIME_LIMIT)
+        else:
+            self.manager = CBSManager(solver_type="CBS", disjoint=True, visualize_result=False,
+                                      time_limit=TIME_LIMIT)
+        # 실행 중 재계획: 남은 경로를 CT 루트로 쓰는 CBS
+        self.replanner = CBSManager(solver_type="CBS", visualize_result=False, time_limit=TIME_LIMIT,
+                                    llsolver="rotation_a_star" if rotation_aware else "a_star")
+        self.heuristic_cache = None  # 첫 compute_paths 호출 때 생성
+        self.lifelong = None
+        if lifelong:
+            self.lifelong = RollingHorizonPlanner(self.map_array, window, replan_period, new_goal=new_goal,
+                                                  heuristics=self.get_goal_heuristics, time_limit=TIME_LIMIT)
+        self.lifelong_start = None  # 첫 lifelong 계획 시각 (처리량 계산용)
+
+    def get_goal_heuristics(self, goals):
+        """goal별 휴리스틱 테이블을 디스크 캐시에서 불러오고, 없으면 계산 후 저장"""
+        if self.heuristic_cache is None:
+            self.heuristic_cache = HeuristicCache(self.grid)
+        return self.heuristic_cache.get_heuristics(goals)
+
+    def get_heuristics(self, agents: list[Agent]):
+        return self.get_goal_heuristics([agent.goal for agent in agents])
 
     def compute_paths(self, agents: list[Agent]) -> list[Agent]:
         """
@@ -21,10 +85,79 @@ class PathFinder:
         Returns:
             List[Agent] with computed paths.
         """
-        self.manager.load_instance(self.map_array, agents)
+        if self.lifelong is not None:
+            return self.compute_lifelong_paths(agents)
+        self.manager.load_instance(self.map_array, agents, heuristics=self.get_heuristics(agents))
         self.manager.run()
         return self.manager.get_agents()
 
+    def replan(self, agents: list[Agent], changed) -> list[Agent] | None:
+        """
+        실행 중인 계획을 이어서 재계획 (warm start)
+        agents: 현재 계획(get_final_path), 현재 위치(start), goal이 설정된 에이전트
+        changed: goal이 바뀐 에이전트 id들
+        goal이 그대로인 에이전트는 남은 경로를 초기 해로 쓰므로 CBS는 바뀐 에이전트가 만드는 충돌만 풂
+        Returns: 경로가 바뀐 에이전트 (이들에게만 명령을 다시 보내면 됨), 해가 없으면 None
+        """
+        initial_paths = dict()
+        for i, agent in enumerate(agents):
+            if agent.id not in changed:
+                rest = remaining_path(agent.get_final_path(), agent.start, agent.goal)
+                if rest is not None:  # 계획을 벗어난 로봇은 새로 계획
+                    initial_paths[i] = rest
+        for agent in agents:
+            agent.delay = 0  # 이미 실행 중이므로 출발 delay는 지났음
+
+        self.replanner.load_instance(self.map_array, agents, heuristics=self.get_heuristics(agents),
+                                     initial_paths=initial_paths)
+        if self.replanner.run() is None:
+            return None
+        return [agent for i, agent in enumerate(agents)
+                if [tuple(loc) for loc in agent.path] != initial_paths.get(i)]
+
+    def improve_paths(self, agents: list[Agent], time_limit: float = LNS_TIME_LIMIT, max_stalls=LNS_MAX_STALLS):
+        """
+        compute_paths 이후 LNS로 경로 개선
+        더 좋은 경로가 나올 때마다 agents를 yield하므로 실행 전에 경로를 교체할 수 있음
+        하한에 닿거나 max_stalls번 연속으로 개선이 없으면 time_limit 전에 끝남
+        rotation_aware이면 개선하지 않음 (LNS의 재계획은 회전 시간을 모름)
+        """
+        if self.rotation_aware:
+            return
+        for _ in self.manager.improve(time_limit, max_stalls=max_stalls):
+            yield agents
+
+    def add_goal(self, agent: Agent, goal):
+        """lifelong 모드: 에이전트가 지금 goal들을 마친 뒤 갈 goal 추가"""
+        self.lifelong.add_goal(agent.id, goal)
+
+    def compute_lifelong_paths(self, agents: list[Agent]) -> list[Agent]:
+        """
+        lifelong 모드: agent.start(현재 위치)에서 다음 replan_period 스텝의 경로
+        agent.goal은 planner의 현재 goal로 바뀜 (goal이 없으면 None)
+        """
+        if self.lifelong_start is None:
+            self.lifelong_start = time.time()
+        for agent in agents:
+            # 처음 보는 에이전트의 goal은 첫 작업으로 등록
+            if agent.id not in self.lifelong.goals and agent.goal is not None:
+                self.lifelong.add_goal(agent.id, agent.goal)
+        headings = {agent.id: agent.direction for agent in agents} if self.rotation_aware else None
+        segments = self.lifelong.plan({agent.id: agent.start for agent in agents}, headings)
+        for agent in agents:
+            agent.delay = 0  # lifelong 모드는 delay를 계획하지 않으므로 경로 앞에 대기를 붙이지 않음
+            agent.set_path(segments[agent.id])
+            agent.goal = self.lifelong.current_goal(agent.id)
+        print(f"Lifelong: {self.lifelong.num_of_finished_tasks} tasks done, {self.tasks_per_hour():.0f} tasks/h")
+        return agents
+
+    def tasks_per_hour(self):
+        """lifelong 모드 처리량: 첫 계획 이후 끝낸 작업 수 / 시간"""
+        if self.lifelong_start is None:
+            return 0.0
+        hours = max(time.time() - self.lifelong_start, 1e-9) / 3600
+        return self.lifelong.num_of_finished_tasks / hours
+
 
 
 
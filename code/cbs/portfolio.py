@@ -0,0 +1,154 @@
+import contextlib
+import multiprocessing
+import os
+import queue
+import time
+
+from a_star_class import A_Star
+from cbs_basic import CBSSolver
+from icbs_cardinal_bypass import ICBS_CB_Solver
+from icbs_complete import ICBS_Solver
+from prioritized import PrioritizedPlanningSolver
+from pbs import PBSSolver
+from collision_table import CollisionTable
+from budget import solve, SolverResult, SOLVED, INFEASIBLE
+from single_agent_planner import get_sum_of_cost
+
+# 동시에 실행할 solver: (solver_type, disjoint); disjoint가 None이면 CBSManager의 설정을 따름
+PORTFOLIO_SOLVERS = (
+    ("CBS", None),
+    ("ICBS_CB", None),
+    ("ICBS", False),
+    ("ICBS", True),
+    ("PRIORITIZED", False),
+    ("PBS", False),
+)
+
+
+def is_optimal_member(solver_type, disjoint):
+    """최적해를 내는 solver: 이 해보다 좋은 해는 없으므로 deadline까지 기다리지 않음"""
+    # ICBS_CB, ICBS는 disjoint splitting에서 비용이 더 큰 해를 내는 경우가 있음 (예: test_1, test_47)
+    return solver_type == "CBS" or (solver_type in ("ICBS_CB", "ICBS") and not disjoint)
+
+
+def create_member(solver_type, my_map, agents, heuristics, llsolver, budget=None):
+    starts = [agent.start for agent in agents]
+    goals = [agent.goal for agent in agents]
+    if solver_type == "CBS":
+        return CBSSolver(my_map, agents, heuristics=heuristics, llsolver=llsolver, budget=budget)
+    elif solver_type == "ICBS_CB":
+        return ICBS_CB_Solver(my_map, starts, goals, heuristics=heuristics, budget=budget)
+    elif solver_type == "ICBS":
+        return ICBS_Solver(my_map, starts, goals, heuristics=heuristics, llsolver=llsolver, budget=budget)
+    elif solver_type == "PBS":
+        return PBSSolver(my_map, agents, heuristics=heuristics, llsolver=llsolver, budget=budget)
+    elif solver_type == "PRIORITIZED":
+        return PrioritizedPlanningSolver(my_map, starts, goals, heuristics=heuristics)
+    raise ValueError(f"Unknown portfolio solver type: {solver_type}")
+
+
+def solve_member(index, solver_type, disjoint, my_map, agents, heuristics, llsolver, budget, results):
+    """자식 프로세스에서 solver 하나를 budget 안에서 실행하고 (index, SolverResult 또는 None, 시간)을 results에 넣음"""
+    start_time = time.time()
+    result = None
+    try:
+        # solver들의 탐색 로그는 버림
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            solver = create_member(solver_type, my_map, agents, heuristics, llsolver, budget)
+            if solver_type == "PRIORITIZED":
+                paths = solver.find_solution()  # CT 노드 없음
+                result = SolverResult(SOLVED if paths is not None else INFEASIBLE, paths, 0, 0,
+                                      time.time() - start_time)
+            else:
+                result = solve(solver, disjoint)
+    except BaseException:  # PrioritizedPlanningSolver는 해가 없으면 BaseException('No solutions')을 던짐
+        result = None
+    results.put((index, result, time.time() - start_time))
+
+
+def is_valid_solution(my_map, agents, paths):
+    """출발/도착, delay 동안 출발지 대기, 인접 칸 이동, 장애물, 충돌을 모두 확인"""
+    if paths is None or len(paths) != len(agents):
+        return False
+    for agent, path in zip(agents, paths):
+        if not path or tuple(path[0]) != tuple(agent.start) or tuple(path[-1]) != tuple(agent.goal):
+            return False
+        if any(tuple(loc) != tuple(agent.start) for loc in path[:agent.delay]):
+            return False
+        for prev, loc in zip(path, path[1:]):
+            if abs(prev[0] - loc[0]) + abs(prev[1] - loc[1]) > 1:
+                return False
+        for r, c in path:
+            if r < 0 or r >= len(my_map) or c < 0 or c >= len(my_map[0]) or my_map[r][c]:
+                return False
+    return not CollisionTable(paths).pairs
+
+
+def member_name(solver_type, disjoint):
+    return f"{solver_type} (disjoint)" if disjoint else solver_type
+
+
+class Portfolio:
+    """
+    여러 solver를 별도 프로세스에서 동시에 실행 (인스턴스마다 가장 빠른 solver가 다르기 때문)
+    - deadline이 None이면 처음 나온 유효한 해를 사용
+    - deadline(초)이 있으면 그때까지 나온 해 중 비용이 가장 작은 해를 사용
+      (최적 solver가 끝나면 바로, deadline까지 해가 없으면 처음 나오는 해)
+    - budget이 있으면 각 solver가 그 안에서 탐색하고, 초과하면 prioritized fallback 해를 냄
+      (fallback 해는 최적이 아니므로 deadline까지 기다림)
+    사용하지 않는 solver 프로세스는 바로 종료
+    """
+
+    def __init__(self, solvers=PORTFOLIO_SOLVERS, deadline=None, budget=None):
+        self.solvers = solvers
+        self.deadline = deadline
+        self.budget = budget
+
+    def run(self, my_map, agents, heuristics, disjoint=False, llsolver=A_Star):
+        """(solver 이름, SolverResult), 유효한 해가 없으면 None
+
+        llsolver: CBS, ICBS, PBS의 저수준 탐색 (ICBS_CB, PRIORITIZED는 single_agent_planner의 a_star만 사용)
+        """
+        members = [(solver_type, disjoint if member_disjoint is None else member_disjoint)
+                   for solver_type, member_disjoint in self.solvers]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=solve_member, daemon=True,
+                                             args=(index, solver_type, member_disjoint, my_map, agents, heuristics,
+                                                   llsolver, self.budget, results))
+                     for index, (solver_type, member_disjoint) in enumerate(members)]
+        for process in processes:
+            process.start()
+
+        end_time = None if self.deadline is None else time.time() + self.deadline
+        best = None  # (비용, index, result)
+        try:
+            for _ in processes:
+                timeout = None
+                if end_time is not None and best is not None:
+                    timeout = max(end_time - time.time(), 0)
+                try:
+                    index, result, elapsed = results.get(timeout=timeout)
+                except queue.Empty:
+                    break  # deadline
+                solver_type, member_disjoint = members[index]
+                if result is None or not is_valid_solution(my_map, agents, result.paths):
+                    print(f"Portfolio: {member_name(solver_type, member_disjoint)} found no valid solution ({elapsed:.2f}s)")
+                    continue
+                cost = get_sum_of_cost(result.paths)
+                fallback = " (fallback)" if result.fallback else ""
+                print(f"Portfolio: {member_name(solver_type, member_disjoint)} cost {cost}{fallback} ({elapsed:.2f}s)")
+                if best is None or cost < best[0]:
+                    best = (cost, index, result)
+                optimal = is_optimal_member(solver_type, member_disjoint) and not result.fallback
+                if end_time is None or optimal or time.time() >= end_time:
+                    break
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+        if best is None:
+            return None
+        _, index, result = best
+        return member_name(*members[index]), result
@@ -24,7 +24,7 @@ import json
 agents = []
 paths = []
 sim = None
-broker = FakeMQTTBroker()
+broker = None  # main()에서 생성 (solver 프로세스가 spawn으로 이 모듈을 다시 import해도 broker를 또 만들지 않도록)
 pathfinder = None
 grid_array = None
 selected_robot_id = None # 생성할 때 선택된 로봇 ID
@@ -33,6 +33,12 @@ delay_input_mode = False
 delay_input_buffer = ""
 
 random_mode_enabled = False
+# 랜덤 모드에서 rolling-horizon lifelong 계획 사용: 도착할 때마다 전체 경로를 다시 풀지 않고
+# 모든 로봇이 구간을 마칠 때마다 다음 구간만 계획
+LIFELONG_MODE = True
+lifelong_pathfinder = None
+# 회전 시간을 포함한 계획: 로봇의 현재 방향에서 시작하고 회전도 한 스텝씩 차지하므로 계획과 실제 움직임의 시간이 맞음
+ROTATION_AWARE = False
 
 # 사용할 ID 목록
 PRESET_IDS = [0,1,2,3,4,5,6,7,8,9]  # 예시: 1~12까지의 ID 사용
@@ -113,6 +119,7 @@ def mouse_event(event, x, y, flags, param):
                     break
 
         # 2‑D. 둘 다 없으면 새 agent 생성 (goal‑only)
+        changed_goal_id = None
         if not updated:
             used_ids = {a.id for a in agents}
             if selected_robot_id in used_ids:
@@ -121,6 +128,7 @@ def mouse_event(event, x, y, flags, param):
                     if agent.id == selected_robot_id:
                         agent.goal = (row, col)
                         updated = True
+                        changed_goal_id = agent.id
                         print(f"Agent {agent.id}의 도착지를 ({row}, {col})로 변경")
                         break
             else:
@@ -132,6 +140,9 @@ def mouse_event(event, x, y, flags, param):
                 updated = True
 
         selected_robot_id = None
+        # 실행 중인 계획이 있으면 이 로봇만 바뀐 것으로 보고 재계획
+        if changed_goal_id is not None and paths:
+            replan_cbs({changed_goal_id})
         return
 
 
@@ -177,16 +188,47 @@ def get_direction_from_robot():
                 expected_dir = robot.direction
 
             agent.initial_dir = expected_dir  # CommandSet 생성 시 참조할 수 있게 저장
+            agent.direction = expected_dir  # 회전 계획(ROTATION_AWARE)의 초기 방향
 
 
 
+# 랜덤 목표: pos를 뺀 빈 칸 중 하나 (없으면 None)
+def random_goal(robot_id, pos):
+    empty_cells = [(r, c) for r in range(grid_array.shape[0])
+                             for c in range(grid_array.shape[1])
+                             if grid_array[r, c] == 0 and (r, c) != pos]
+    if not empty_cells:
+        print(f"[경고] 도착지 후보가 없음 (로봇 {robot_id})")
+        return None
+    return random.choice(empty_cells)
+
+# lifelong 모드: 모든 로봇이 보낸 구간의 끝에서 멈춰 있는지
+def robots_finished_segment():
+    for agent in agents:
+        if agent.id not in sim.robots:
+            continue
+        robot = sim.robots[agent.id]
+        if robot.moving or robot.rotating or robot.stopping or robot.current_command or robot.command_queue:
+            return False
+        path = sim.robot_info[agent.id]['path']
+        if path and tuple(map(int, robot.get_position())) != tuple(path[-1]):
+            return False
+    return True
+
 #CBS 계산
 def compute_cbs():
-    global paths, pathfinder, grid_array
+    global paths, pathfinder, lifelong_pathfinder, grid_array
 
     grid_array = load_grid(grid_row, grid_col)
     get_start_from_robot()
-    if random_mode_enabled:
+    get_direction_from_robot()
+    lifelong = random_mode_enabled and LIFELONG_MODE
+    if lifelong:
+        # goal은 lifelong planner가 관리 (goal을 마치면 random_goal로 새 goal)
+        if lifelong_pathfinder is None:
+            lifelong_pathfinder = PathFinder(grid_array, lifelong=True, new_goal=random_goal,
+                                             rotation_aware=ROTATION_AWARE)
+    elif random_mode_enabled:
         assigned = False
         for agent in agents:
             if agent.start and agent.goal is None:
@@ -199,7 +241,7 @@ def compute_cbs():
                     assigned = True
 
     if pathfinder is None:
-        pathfinder = PathFinder(grid_array)
+        pathfinder = PathFinder(grid_array, rotation_aware=ROTATION_AWARE)
 
     # # CBS 계산 전 모든 delay를 1회용으로 처리
     # for agent in agents:
@@ -212,7 +254,10 @@ def compute_cbs():
     #             delay = 0
     #         agent._applied_delay = delay  # 내부 추적용, 없어도 됨
 
-    new_agents = pathfinder.compute_paths(agents)
+    if lifelong:
+        new_agents = lifelong_pathfinder.compute_paths([agent for agent in agents if agent.start])
+    else:
+        new_agents = pathfinder.compute_paths(agents)
     new_paths = [agent.get_final_path() for agent in new_agents]
 
     if not new_paths:
@@ -227,7 +272,32 @@ def compute_cbs():
     for agent in agents:
         agent.delay = 0
 
-    # 로봇 명령 전송
+    send_commands(new_agents)
+
+# 실행 중 재계획: 남은 경로를 그대로 두고 goal이 바뀐 로봇(changed_ids)이 만드는 충돌만 풀고,
+# 경로가 바뀐 로봇에게만 명령 전송
+def replan_cbs(changed_ids):
+    global paths
+
+    planned = [agent for agent in agents if agent.start and agent.goal]
+    if pathfinder is None or not paths or any(not agent.path for agent in planned if agent.id not in changed_ids):
+        compute_cbs()  # 실행 중인 계획이 없으면 처음부터 계산
+        return
+
+    get_start_from_robot()
+    get_direction_from_robot()
+    replanned = pathfinder.replan(planned, changed_ids)
+    if replanned is None:
+        print("No solution found.")
+        return
+
+    paths.clear()
+    paths.extend(agent.get_final_path() for agent in planned)
+    print(f"Paths replanned via PathFinder: robots {[agent.id for agent in replanned]}")
+    send_commands(replanned)
+
+# 로봇 명령 전송
+def send_commands(new_agents):
     command_sets = []
     for agent in new_agents:
         print(f"[DEBUG] Agent {agent.id}: delay={agent.delay}, path={agent.get_final_path()}")
@@ -245,7 +315,8 @@ def compute_cbs():
                 expected_dir = robot.direction
 
             
-            command_sets.append(CommandSet(str(agent.id), agent.get_final_path(), initial_dir=expected_dir))
+            command_sets.append(CommandSet(str(agent.id), agent.get_final_path(), initial_dir=expected_dir,
+                                           rotation_aware=ROTATION_AWARE))
 
 
 # 전송할 JSON 문자열을 미리 출력
@@ -300,15 +371,15 @@ def on_robot_arrival(robot_id, pos):
     if not random_mode_enabled:
         return
 
-    empty_cells = [(r, c) for r in range(grid_array.shape[0])
-                             for c in range(grid_array.shape[1])
-                             if grid_array[r, c] == 0 and (r, c) != pos]
-
-    if not empty_cells:
-        print(f"[경고] 도착지 후보가 없음 (로봇 {robot_id})")
+    if LIFELONG_MODE:
+        # 다음 구간은 모든 로봇이 이번 구간을 마친 뒤 한 번에 계획
+        if robots_finished_segment():
+            compute_cbs()
         return
 
-    new_goal = random.choice(empty_cells)
+    new_goal = random_goal(robot_id, pos)
+    if new_goal is None:
+        return
     print(f"[랜덤 모드] 로봇 {robot_id} 새 목표 {new_goal}")
 
     for agent in agents:
@@ -317,10 +388,12 @@ def on_robot_arrival(robot_id, pos):
             agent.goal = new_goal
             break
 
-    compute_cbs()
+    # 도착한 로봇만 goal이 바뀌었으므로 나머지 로봇의 남은 경로는 유지
+    replan_cbs({robot_id})
 
 def main():
-    global agents, paths, grid_array, selected_robot_id, sim, delay_input_buffer, delay_input_mode, random_mode_enabled
+    global agents, paths, grid_array, selected_robot_id, sim, delay_input_buffer, delay_input_mode, random_mode_enabled, broker
+    broker = FakeMQTTBroker()
     grid_array = load_grid(grid_row, grid_col)
     cv2.namedWindow("CBS Grid")
     cv2.setMouseCallback("CBS Grid", mouse_event)
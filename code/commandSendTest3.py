@@ -8,15 +8,18 @@ TRANSFER_TOPIC = "command/transfer"
 
 # 명령세트를 체계적으로 관리하기 위한 클래스 정의
 class CommandSet:
-    def __init__(self, robot_id, path, initial_dir="north"):
+    def __init__(self, robot_id, path, initial_dir="north", rotation_aware=False):
         """
         robot_id: 제어할 로봇의 ID (문자열)
         path: 로봇의 경로 (예: [(0, 0), (0, 1), (1, 1)])
         initial_dir: 로봇의 초기 방향 (예: "north")
+        rotation_aware: 회전 시간을 포함한 경로 (rotation_a_star)인지 여부
+                        True이면 방향을 바꾸기 전의 제자리 스텝은 정지(D0)가 아니라 회전 (90도에 1스텝)
         """
         self.robot_id = robot_id
         self.path = path
         self.initial_dir = initial_dir
+        self.rotation_aware = rotation_aware
         self.commands = self.path_to_commands()
         self.command_count = len(self.commands)
 
@@ -35,6 +38,9 @@ class CommandSet:
 
             # 먼저 정지 판단
             if pos1 == pos2:
+                if self.rotation_aware:
+                    i, current_dir = self.wait_or_turn(commands, i, current_dir)
+                    continue
                 commands.append("D0")
                 i += 1
                 continue
@@ -63,6 +69,33 @@ class CommandSet:
 
         return commands
 
+    def wait_or_turn(self, commands, i, current_dir):
+        """
+        rotation_aware 경로에서 i부터 이어지는 제자리 스텝을 명령으로 변환
+        다음 이동 방향으로의 회전에 필요한 스텝(90도에 1스텝)은 회전, 나머지는 정지(D0)
+        Returns: (다음 이동의 인덱스, 회전 후 방향)
+        """
+        N = len(self.path)
+        end = i
+        while end < N - 1 and self.path[end] == self.path[end + 1]:
+            end += 1
+        waits = end - i
+        if end == N - 1:  # 더 이동하지 않음
+            commands.extend(["D0"] * waits)
+            return end, current_dir
+
+        next_dir = self.direction_between(self.path[end], self.path[end + 1])
+        turn = self.turn_command(current_dir, next_dir)
+        turn_steps = abs(int(turn[1:])) // 90
+        if turn_steps > waits:  # 회전 시간이 없는 경로: 이동할 때 회전 (기존 방식)
+            commands.extend(["D0"] * waits)
+            return end, current_dir
+
+        commands.extend(["D0"] * (waits - turn_steps))
+        if turn_steps > 0:
+            commands.append(turn)
+        return end, next_dir
+
     def direction_between(self, pos1, pos2):
         """
         두 좌표 간의 방향을 계산합니다.
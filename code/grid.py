@@ -1,9 +1,17 @@
+import sys
 import cv2
 import numpy as np
 import os
 import json
+
+# 그리드 편집기 단독 실행 시에도 MAPF-ICBS\code 모듈(휴리스틱 캐시)을 쓸 수 있게 경로 추가
+ICBS_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MAPF-ICBS', 'code'))
+if ICBS_PATH not in sys.path:
+    sys.path.append(ICBS_PATH)
+
 from interface import mouse_callback, grid_visual
 from config import grid_row, grid_col
+from cbs.heuristic_cache import clear_cache
 
 GRID_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "grid"))
 
@@ -29,6 +37,10 @@ def save_grid(grid, grid_row, grid_col):
     with open(path, "w") as f:
         json.dump(data, f, indent=4)
     print(f"저장 완료: {path}")
+    # 맵이 바뀌었으므로 이 크기 그리드의 휴리스틱 캐시 무효화
+    removed = clear_cache(grid_row, grid_col)
+    if removed:
+        print(f"휴리스틱 캐시 {removed}개 삭제")
 
 # grid 편집기
 def main():
@@ -28,19 +28,26 @@ manager = None
 pathfinder = None
 grid_array = None
 visualize = True
+# 명령 전송 전에 LNS로 경로 개선 (켜면 개선이 멈출 때까지 로봇 출발이 늦어짐)
+LNS_ENABLED = False
 
-# 비전 시스템 초기화
+# 비전 시스템: main()에서 초기화 (solver 프로세스가 spawn으로 이 모듈을 다시 import해도 카메라를 열지 않도록)
 video_path = r"C:/img/test2.mp4"
-cap, fps = camera_open(source=None) # 특정 카메라나 영상을 쓰고 싶을 시 source=0(원하는 카메라 번호) 또는 source=video_path로 설정, 아니면 None으로 두기
+cap, fps = None, None
+vision = None
 
-undistorter = Undistorter(
-    camera_cfg['type'],
-    camera_cfg['matrix'],
-    camera_cfg['dist'],
-    camera_cfg['size']
-)
+def init_vision():
+    global cap, fps, vision
+    cap, fps = camera_open(source=None) # 특정 카메라나 영상을 쓰고 싶을 시 source=0(원하는 카메라 번호) 또는 source=video_path로 설정, 아니면 None으로 두기
 
-vision = VisionSystem(undistorter=undistorter, visualize=True)
+    undistorter = Undistorter(
+        camera_cfg['type'],
+        camera_cfg['matrix'],
+        camera_cfg['dist'],
+        camera_cfg['size']
+    )
+
+    vision = VisionSystem(undistorter=undistorter, visualize=True)
 
 # 사용할 ID 목록
 PRESET_IDS = [1,2,3,4,5,6,7,8,9,10,11]  # 예시: 1~12까지의 ID 사용
@@ -186,6 +193,10 @@ def compute_cbs():
         pathfinder = PathFinder(load_grid())
 
     solved_agents = pathfinder.compute_paths(ready_agents)
+    # 명령 전송 전까지 LNS로 개선된 경로로 교체
+    if LNS_ENABLED:
+        for solved_agents in pathfinder.improve_paths(solved_agents):
+            pass
     new_paths = [agent.get_final_path() for agent in solved_agents]
 
     if not new_paths:
@@ -228,6 +239,8 @@ def main():
     # 초기 설정
     global agents, paths, manager, visualize
 
+    init_vision()
+
     # 그리드 불러오기
     base_grid = load_grid(grid_row, grid_col)
     grid_array = base_grid.copy()